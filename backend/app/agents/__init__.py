@@ -1 +1,3 @@
-from .agent_creator import create_agent
\ No newline at end of file
+from .agent_creator import create_agent
+from .agent_cache import AgentCache, agent_cache
+from .planner import Planner, planner
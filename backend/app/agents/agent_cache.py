@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+from app.llm import llm_config_key
+from app.agents.agent_creator import create_agent
+from app.utils.session_registry import session_registry
+
+log = logging.getLogger(__name__)
+
+# Maximum number of compiled agents kept across all sessions (four agent types per active session)
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "128"))
+
+_Key = Tuple[str, str, Tuple[str, ...]]
+
+
+class AgentCache:
+    """
+    Keeps compiled ReAct agents by (session, agent type, LLM configuration), so a chat turn
+    reuses the LLM client, tools and graph built on an earlier turn instead of rebuilding
+    them for every node. The agents hold no conversation state, so one compiled agent
+    serves concurrent turns. Entries are dropped least recently used first, and all
+    entries of a session when the session is deleted.
+
+    Agents are built outside the global lock, under a per-key lock, so parallel nodes
+    that need the same agent build it once.
+    """
+    def __init__(self, max_entries: int = AGENT_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._agents: "OrderedDict[_Key, Any]" = OrderedDict()
+        self._build_locks: Dict[_Key, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evicted": 0, "invalidated": 0}
+        self._build_seconds = 0.0
+
+    def get(self, session_id: str, agent_type: str):
+        """
+        Returns the compiled agent of a type for a session, building it on a miss.
+
+        Raises:
+            FileNotFoundError: If the session has no vector store (from create_agent).
+            ValueError: If the agent type or LLM configuration is invalid (from create_agent).
+        """
+        key = (session_id, agent_type, llm_config_key())
+        with self._lock:
+            agent = self._touch(key)
+            if agent is not None:
+                self._counters["hits"] += 1
+                return agent
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                # Another node may have built the agent while this one waited
+                agent = self._touch(key)
+                if agent is not None:
+                    self._counters["hits"] += 1
+                    return agent
+                self._counters["misses"] += 1
+
+            started = time.perf_counter()
+            agent = create_agent(session_id, agent_type)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._build_seconds += elapsed
+                self._agents[key] = agent
+                while len(self._agents) > self.max_entries:
+                    evicted, _ = self._agents.popitem(last=False)
+                    self._build_locks.pop(evicted, None)
+                    self._counters["evicted"] += 1
+            log.info(f"Built agent '{agent_type}' for session '{session_id}' in {elapsed * 1000:.0f} ms.")
+            return agent
+
+    async def aget(self, session_id: str, agent_type: str):
+        """Asynchronous version of get(); a miss builds the agent in a worker thread, since building loads the session's indexes."""
+        key = (session_id, agent_type, llm_config_key())
+        with self._lock:
+            agent = self._touch(key)
+            if agent is not None:
+                self._counters["hits"] += 1
+                return agent
+        return await asyncio.to_thread(self.get, session_id, agent_type)
+
+    def invalidate_session(self, session_id: str) -> int:
+        """Drops every agent of a session. Returns the number dropped."""
+        with self._lock:
+            keys = [key for key in self._agents if key[0] == session_id]
+            for key in keys:
+                del self._agents[key]
+                self._build_locks.pop(key, None)
+            self._counters["invalidated"] += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._agents.clear()
+            self._build_locks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the number of cached agents, hit/miss counters and the time spent building agents."""
+        with self._lock:
+            builds = self._counters["misses"]
+            return {
+                "cached_agents": len(self._agents),
+                **self._counters,
+                "build_seconds_total": round(self._build_seconds, 3),
+                "build_ms_average": round(self._build_seconds / builds * 1000, 1) if builds else 0.0,
+            }
+
+    def _touch(self, key: _Key):
+        agent = self._agents.get(key)
+        if agent is not None:
+            self._agents.move_to_end(key)
+        return agent
+
+
+# Process-wide cache shared by all graph runs
+agent_cache = AgentCache()
+session_registry.add_deletion_listener(agent_cache.invalidate_session)
@@ -6,7 +6,7 @@ from langchain_core.tools import BaseTool
 from langchain_core.messages import SystemMessage
 
 from app.llm import get_llm
-from app.tools import ReadFileTool, get_retriever_tool, ListFilesTool
+from app.tools import ReadFileTool, ReadFilesTool, get_retriever_tool, ListFilesTool, FindSymbolTool, SearchCodeTool
 
 log = logging.getLogger(__name__)
 
@@ -23,11 +23,20 @@ def create_agent(session_id: str, agent_type: str) -> AgentExecutor:
     # Common tools for exploration
     list_tool = ListFilesTool(session_id=session_id)
     read_tool = ReadFileTool(session_id=session_id)
+    read_many_tool = ReadFilesTool(session_id=session_id)
+    symbol_tool = FindSymbolTool(session_id=session_id)
+    search_tool = SearchCodeTool(session_id=session_id)
 
     tool_usage_instructions = (
-        "To find the correct file path, you MUST use the 'list_files' tool first. "
+        "When you know the name of a function, class or method, use the 'find_symbol' tool first: "
+        "it returns the file, line range and code of the definition and where it is used in a single call. "
+        "To find text, usages, strings or patterns across the whole codebase, use the 'search_code' tool. "
+        "Otherwise, to find the correct file path, you MUST use the 'list_files' tool first; "
+        "list a whole subtree in one call with 'recursive' or find files by name with 'glob' instead of listing one directory at a time. "
         "Examine the output of 'list_files' to determine the full, correct path to a file. "
-        "When you use 'read_file', you MUST provide the complete, relative path you discovered."
+        "When you use 'read_file', you MUST provide the complete, relative path you discovered. "
+        "To read only part of a file, such as a definition found with 'find_symbol', pass its 'start_line' and 'end_line'. "
+        "When you need several files, read them all in one 'read_files' call instead of one 'read_file' call each."
     )
 
     if agent_type == "QA_Agent":
@@ -37,7 +46,7 @@ def create_agent(session_id: str, agent_type: str) -> AgentExecutor:
             f"{tool_usage_instructions} After exploring the files, use the 'codebase_retriever' "
             "tool to find relevant code snippets to answer the user's question."
         )
-        tools.extend([list_tool, get_retriever_tool(session_id)])
+        tools.extend([symbol_tool, search_tool, list_tool, get_retriever_tool(session_id)])
 
     elif agent_type == "Debug_Agent":
         instructions = (
@@ -46,7 +55,7 @@ def create_agent(session_id: str, agent_type: str) -> AgentExecutor:
             "This report will be passed to the Refactor_Agent. "
             f"{tool_usage_instructions}"
         )
-        tools.extend([list_tool, read_tool])
+        tools.extend([symbol_tool, search_tool, list_tool, read_tool, read_many_tool])
 
     elif agent_type == "Refactor_Agent":
         instructions = (
@@ -54,7 +63,7 @@ def create_agent(session_id: str, agent_type: str) -> AgentExecutor:
             "Your ONLY job is to rewrite and improve the code based on the provided report. "
             f"{tool_usage_instructions} Present the complete, refactored code for the file."
         )
-        tools.extend([list_tool, read_tool])
+        tools.extend([symbol_tool, search_tool, list_tool, read_tool, read_many_tool])
     
     elif agent_type == "Diagram_Agent":
         instructions = (
@@ -62,7 +71,7 @@ def create_agent(session_id: str, agent_type: str) -> AgentExecutor:
             f"{tool_usage_instructions} After reading files to understand the logic, "
             "your output MUST ONLY be the Mermaid.js code block for the diagram. Do not add any other explanation."
         )
-        tools.extend([list_tool, read_tool])
+        tools.extend([symbol_tool, search_tool, list_tool, read_tool, read_many_tool])
 
     else:
         raise ValueError(f"Unknown agent type: {agent_type}")
@@ -0,0 +1,299 @@
+import os
+import re
+import ast
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from pydantic import BaseModel, Field, ValidationError
+from app.llm import get_llm
+from app.agents.prompts import SUPERVISOR_PROMPT
+
+log = logging.getLogger(__name__)
+
+# Number of normalized queries whose plans are remembered (LRU)
+PLANNER_CACHE_SIZE = int(os.getenv("PLANNER_CACHE_SIZE", "1024"))
+# Rule-based plans below this confidence are sent to the supervisor LLM instead
+PLANNER_MIN_CONFIDENCE = float(os.getenv("PLANNER_MIN_CONFIDENCE", "0.75"))
+
+AGENT_NAMES = ["QA_Agent", "Debug_Agent", "Refactor_Agent", "Diagram_Agent"]
+
+AgentName = Literal["QA_Agent", "Debug_Agent", "Refactor_Agent", "Diagram_Agent"]
+Plan = List[List[str]]
+
+class SupervisorPlan(BaseModel):
+    """An execution plan: steps run in order, the agents within a step run in parallel."""
+    plan: List[List[AgentName]] = Field(
+        description="The steps of the plan in order; each step lists the agents that run in parallel. Empty if no agent is needed."
+    )
+
+# Queries that need no agent at all
+_SMALL_TALK = re.compile(
+    r"^(?:hi|hello|hey|thanks?|thank you|thx|ok|okay|great|cool|nice|bye|goodbye)"
+    r"(?: (?:you|so much|a lot|again|there))*[.!]*$"
+)
+# Words that signal each agent's task
+_INTENTS = {
+    "Debug_Agent": re.compile(
+        r"\b(?:bugs?|buggy|debug\w*|errors?|exceptions?|tracebacks?|stack ?traces?|crash\w*|vulnerab\w*|security|"
+        r"insecure|exploits?|fix\w*|broken|fails?|failing|leaks?|race conditions?|deadlocks?)\b"
+    ),
+    "Refactor_Agent": re.compile(
+        r"\b(?:refactor\w*|rewrit\w+|clean ?up|cleaner|improve\w*|optimi[sz]\w*|simplif\w*|restructur\w*|"
+        r"moderni[sz]\w*|rename|readab\w+|maintainab\w+)\b"
+    ),
+    "Diagram_Agent": re.compile(
+        r"\b(?:diagrams?|flowcharts?|flow charts?|uml|mermaid|visuali[sz]\w*|draw|charts?)\b"
+    ),
+    # Explicit requests for an explanation; these add QA_Agent next to other agents
+    "QA_Agent": re.compile(
+        r"\b(?:explain\w*|summar\w*|describe|overview|walk me through|tell me about|document\w*)\b"
+    ),
+}
+# Question words: on their own they make a question for QA_Agent, but they are too common to add it to other tasks
+_QUESTION = re.compile(r"^(?:what|how|why|where|which|who|when|does|do|is|are|can|list|show|find)\b|\?$")
+# Words that make the order of the tasks matter
+_SEQUENCE = re.compile(r"\b(?:then|after|afterwards|before|first|finally|once|next)\b")
+_NEGATION = re.compile(r"\b(?:don'?t|do not|no|not|without|never|skip)\b")
+
+
+def normalize_query(query: str) -> str:
+    """Lower-cases a query and collapses whitespace, so trivially different phrasings share a plan."""
+    return " ".join(query.lower().split()).strip(" ")
+
+
+def classify(query: str) -> Tuple[Optional[Plan], float]:
+    """
+    Plans a query from keywords alone.
+
+    Returns:
+        The plan (None if no task was recognised) and a confidence between 0 and 1. Single
+        tasks and pairs of independent tasks are confident; ordering words, negations or
+        three or more agents make the plan a guess for the LLM to confirm.
+    """
+    text = normalize_query(query)
+    if _SMALL_TALK.match(text):
+        return [], 1.0
+
+    mentions = {}
+    for agent, pattern in _INTENTS.items():
+        match = pattern.search(text)
+        if match:
+            mentions[agent] = match.start()
+    if not mentions:
+        if _QUESTION.search(text):
+            return [["QA_Agent"]], 0.8
+        return None, 0.0
+
+    agents = sorted(mentions, key=mentions.get)
+    if len(agents) == 1:
+        plan, confidence = [agents], 0.9
+    elif _SEQUENCE.search(text):
+        # One step per task in the order they are mentioned, keeping Debug_Agent ahead of Refactor_Agent
+        if "Debug_Agent" in mentions and "Refactor_Agent" in mentions and mentions["Refactor_Agent"] < mentions["Debug_Agent"]:
+            agents.remove("Debug_Agent")
+            agents.insert(agents.index("Refactor_Agent"), "Debug_Agent")
+        plan, confidence = [[agent] for agent in agents], 0.8
+    else:
+        # Independent tasks run together; Refactor_Agent waits for the agents that inspect the code
+        first = [agent for agent in AGENT_NAMES if agent in mentions and agent != "Refactor_Agent"]
+        if "Refactor_Agent" not in mentions:
+            plan = [first]
+        elif {"Debug_Agent", "QA_Agent"} & set(mentions):
+            plan = [first, ["Refactor_Agent"]]
+        else:
+            plan = [["Refactor_Agent"] + first]
+        confidence = 0.8
+    if len(agents) > 2:
+        confidence = 0.6
+    if _NEGATION.search(text):
+        confidence = min(confidence, 0.4)
+    return plan, confidence
+
+
+def parse_plan(text: str) -> Plan:
+    """
+    Validates a plan written as text by an LLM that cannot produce structured output.
+
+    Raises:
+        ValueError: If the text contains no valid plan.
+    """
+    match = re.search(r"\[.*\]", text, re.DOTALL)
+    if not match:
+        raise ValueError(f"No plan found in: {text!r}")
+    try:
+        raw = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        try:
+            raw = ast.literal_eval(match.group(0))
+        except (ValueError, SyntaxError) as e:
+            raise ValueError(f"Unparseable plan: {text!r}") from e
+    return _validated(raw)
+
+
+def _structured_plan(result: Any) -> Plan:
+    """Validates the structured output of the supervisor LLM."""
+    if not isinstance(result, SupervisorPlan):
+        raise ValueError(f"Unexpected structured output: {result!r}")
+    return _validated(result.plan)
+
+
+def _validated(raw: Any) -> Plan:
+    """Checks a plan against SupervisorPlan and drops empty steps and repeated agents."""
+    try:
+        plan = SupervisorPlan.model_validate({"plan": raw}).plan
+    except ValidationError as e:
+        raise ValueError(f"Invalid plan {raw!r}: {e.error_count()} error(s)") from e
+    return [list(dict.fromkeys(step)) for step in plan if step]
+
+
+class Planner:
+    """
+    Plans the agents for a query in tiers, cheapest first: an LRU of normalized queries,
+    then the keyword classifier, and only when it is not confident the supervisor LLM
+    with structured output. Plans from every tier are cached. Returned plans are copies,
+    since the graph consumes them step by step.
+    """
+    def __init__(self, max_entries: int = PLANNER_CACHE_SIZE, min_confidence: float = PLANNER_MIN_CONFIDENCE):
+        self.max_entries = max(1, max_entries)
+        self.min_confidence = min_confidence
+        self._plans: "OrderedDict[str, Plan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"queries": 0, "cache_hits": 0, "rule_hits": 0, "llm_calls": 0, "llm_failures": 0}
+        self._llm_seconds = 0.0
+
+    def plan(self, query: str) -> Plan:
+        """Returns the execution plan of a query; an empty plan means no agent should run."""
+        started = time.perf_counter()
+        key, plan, source, guess = self._plan_fast(query)
+        if source is None:
+            plan = self._plan_with_llm(query)
+        return self._finish(key, plan, source, guess, started)
+
+    async def aplan(self, query: str) -> Plan:
+        """Asynchronous version of plan(); the supervisor LLM, when needed, is awaited without blocking the event loop."""
+        started = time.perf_counter()
+        key, plan, source, guess = self._plan_fast(query)
+        if source is None:
+            plan = await self._aplan_with_llm(query)
+        return self._finish(key, plan, source, guess, started)
+
+    def _plan_fast(self, query: str) -> Tuple[str, Optional[Plan], Optional[str], Optional[Plan]]:
+        """
+        Plans a query from the cache or the classifier. Returns the cache key, the plan and its
+        source ("cache" or "rules"), or no plan and no source plus the classifier's guess when
+        the LLM has to decide.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            self._counters["queries"] += 1
+            cached = self._plans.get(key)
+            if cached is not None:
+                self._plans.move_to_end(key)
+                self._counters["cache_hits"] += 1
+                return key, cached, "cache", None
+
+        plan, confidence = classify(query)
+        if plan is not None and confidence >= self.min_confidence:
+            with self._lock:
+                self._counters["rule_hits"] += 1
+            return key, plan, "rules", None
+        return key, None, None, plan
+
+    def _finish(self, key: str, plan: Optional[Plan], source: Optional[str], guess: Optional[Plan], started: float) -> Plan:
+        """Caches a new plan, logs it and returns a copy of it."""
+        if source is None:
+            if plan is None:
+                # Keep the classifier's guess, if it had one, rather than dropping the query
+                self._log(guess or [], "rules (LLM failed)", started)
+                return guess or []
+            source = "llm"
+        if source != "cache":
+            with self._lock:
+                self._plans[key] = plan
+                self._plans.move_to_end(key)
+                while len(self._plans) > self.max_entries:
+                    self._plans.popitem(last=False)
+        self._log(plan, source, started)
+        return [list(step) for step in plan]
+
+    def _plan_with_llm(self, query: str) -> Optional[Plan]:
+        """Asks the supervisor LLM for a plan, as structured output where the model supports it."""
+        prompt = SUPERVISOR_PROMPT.format(messages=query)
+        llm = get_llm()
+        started = time.perf_counter()
+        plan = None
+        try:
+            try:
+                plan = _structured_plan(llm.with_structured_output(SupervisorPlan).invoke(prompt))
+            except Exception as e:
+                log.info(f"Structured planning failed ({e}); falling back to a text plan.")
+                response = llm.invoke(prompt)
+                log.info(f"Raw supervisor plan response: '{response.content}'")
+                plan = parse_plan(response.content)
+        except Exception as e:
+            log.warning(f"Supervisor did not produce a valid plan: {e}")
+        self._record_llm_call(plan, time.perf_counter() - started)
+        return plan
+
+    async def _aplan_with_llm(self, query: str) -> Optional[Plan]:
+        """Asynchronous version of _plan_with_llm()."""
+        prompt = SUPERVISOR_PROMPT.format(messages=query)
+        llm = get_llm()
+        started = time.perf_counter()
+        plan = None
+        try:
+            try:
+                plan = _structured_plan(await llm.with_structured_output(SupervisorPlan).ainvoke(prompt))
+            except Exception as e:
+                log.info(f"Structured planning failed ({e}); falling back to a text plan.")
+                response = await llm.ainvoke(prompt)
+                log.info(f"Raw supervisor plan response: '{response.content}'")
+                plan = parse_plan(response.content)
+        except Exception as e:
+            log.warning(f"Supervisor did not produce a valid plan: {e}")
+        self._record_llm_call(plan, time.perf_counter() - started)
+        return plan
+
+    def _record_llm_call(self, plan: Optional[Plan], elapsed: float) -> None:
+        with self._lock:
+            self._counters["llm_calls"] += 1
+            self._llm_seconds += elapsed
+            if plan is None:
+                self._counters["llm_failures"] += 1
+
+    def _log(self, plan: Plan, source: str, started: float) -> None:
+        stats = self.stats()
+        log.info(
+            f"Planned {plan} from {source} in {(time.perf_counter() - started) * 1000:.1f} ms "
+            f"(fast-path rate {stats['fast_path_rate']:.0%}, ~{stats['saved_seconds_estimate']:.1f} s of LLM planning saved)"
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the planner's counters. The time saved is estimated as the number of queries
+        planned without the LLM times the average LLM planning latency measured so far.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            llm_seconds = self._llm_seconds
+            cached_plans = len(self._plans)
+        fast = counters["cache_hits"] + counters["rule_hits"]
+        average = llm_seconds / counters["llm_calls"] if counters["llm_calls"] else 0.0
+        return {
+            "cached_plans": cached_plans,
+            **counters,
+            "fast_path_rate": round(fast / counters["queries"], 3) if counters["queries"] else 0.0,
+            "llm_ms_average": round(average * 1000, 1),
+            "saved_seconds_estimate": round(fast * average, 3),
+        }
+
+
+# Process-wide planner used by the supervisor node
+planner = Planner()
@@ -1 +1,2 @@
-from .llm_provider import get_llm
+from .llm_provider import get_llm, llm_config_key, llm_client_stats, close_llm_clients
+from .embedding_provider import get_embeddings
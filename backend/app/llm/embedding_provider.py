@@ -0,0 +1,61 @@
+import os
+import asyncio
+import logging
+from typing import NamedTuple, Tuple
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from app.llm.local_embeddings import HashingEmbeddings
+
+load_dotenv()
+log = logging.getLogger(__name__)
+
+class EmbeddingBackend(NamedTuple):
+    """The configured embedding model, its cache/metrics name, and whether it runs in-process."""
+    embeddings: Embeddings
+    model_name: str
+    is_local: bool
+
+def embedding_config_key() -> Tuple[str, ...]:
+    """Returns the settings that determine which embedding backend get_embeddings() builds."""
+    provider = os.getenv("EMBEDDING_PROVIDER", "GEMINI").upper()
+    if provider == "LOCAL":
+        return provider, os.getenv("LOCAL_EMBEDDING_DIM", "512")
+    return (provider,)
+
+def get_embeddings() -> EmbeddingBackend:
+    """
+    Reads the environment variables and returns the configured embedding backend.
+    EMBEDDING_PROVIDER is GEMINI (default) or LOCAL, a CPU-only model that needs no network.
+    """
+    provider = os.getenv("EMBEDDING_PROVIDER", "GEMINI").upper()
+    log.info(f"Attempting to initialize embedding provider: {provider}")
+
+    if provider == "GEMINI":
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY is not set. It is required for embeddings.")
+
+        # --- THE DEFINITIVE FIX FOR PARALLELISM ---
+        # The GoogleGenerativeAIEmbeddings client requires an asyncio event loop to initialize,
+        # but LangGraph runs parallel nodes in standard threads which don't have one.
+        # This code block ensures an event loop is available in the current thread.
+        try:
+            # Check if an event loop is already running in this thread
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # If not, create a new one
+            asyncio.set_event_loop(asyncio.new_event_loop())
+
+        # Now that an event loop is guaranteed to exist, we can safely initialize the client.
+        model = "models/embedding-001"
+        return EmbeddingBackend(GoogleGenerativeAIEmbeddings(model=model, google_api_key=api_key), model, False)
+
+    elif provider == "LOCAL":
+        dim = int(os.getenv("LOCAL_EMBEDDING_DIM", "512"))
+        return EmbeddingBackend(HashingEmbeddings(dim=dim), f"local-hashing-{dim}", True)
+
+    else:
+        log.error(f"Unsupported embedding provider: {provider}")
+        raise ValueError(f"Unsupported embedding provider: {provider}")
@@ -1,5 +1,9 @@
 import os
+import hashlib
 import logging
+import threading
+from typing import Any, Dict, List, Tuple
+import httpx
 from dotenv import load_dotenv
 
 from langchain_deepseek import ChatDeepSeek
@@ -11,49 +15,158 @@ from langchain_groq import ChatGroq
 load_dotenv()
 log = logging.getLogger(__name__)
 
+# Connection pool of each shared LLM client: open connections, idle connections kept alive and their lifetime
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "64"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "16"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+# Seconds to open a connection and to wait for a whole LLM response, and retries of failed requests
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# API key variable of each provider
+_API_KEY_VARIABLES = {
+    "DEEPSEEK": "DEEPSEEK_API_KEY",
+    "GEMINI": "GOOGLE_API_KEY",
+    "OPENAI": "OPENAI_API_KEY",
+    "ANTHROPIC": "ANTHROPIC_API_KEY",
+    "GROQ": "GROQ_API_KEY",
+}
+
+def llm_config_key() -> Tuple[str, ...]:
+    """
+    Returns the settings that determine which client get_llm() builds. The API key is
+    included as a short digest, so anything cached per key picks up a rotated key.
+    """
+    provider = (os.getenv("LLM_PROVIDER") or "").upper()
+    api_key = os.getenv(_API_KEY_VARIABLES.get(provider, ""), "")
+    return provider, hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+class _LLMRegistry:
+    """
+    Process-wide LLM clients, one per llm_config_key(). Chat models are stateless between
+    calls and their HTTP clients are thread-safe, so the supervisor and every agent, in
+    LangGraph's parallel nodes too, share one client and its keep-alive connection pool
+    instead of opening new connections (and TLS handshakes) each turn.
+    """
+    def __init__(self):
+        self._clients: Dict[Tuple[str, ...], Any] = {}
+        self._http_clients: List[Any] = []
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "builds": 0}
+
+    def get(self):
+        key = llm_config_key()
+        with self._lock:
+            llm = self._clients.get(key)
+            if llm is not None:
+                self._counters["hits"] += 1
+                return llm
+            # Built under the lock: construction only configures the client, it does not connect
+            llm = self._build(key[0])
+            self._clients[key] = llm
+            self._counters["builds"] += 1
+            log.info(f"Created shared LLM client for provider '{key[0]}'.")
+            return llm
+
+    def _pool(self) -> Dict[str, Any]:
+        """Returns sync and async HTTP clients with the configured pool limits and timeouts."""
+        limits = httpx.Limits(
+            max_connections=LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        http_client = httpx.Client(limits=limits, timeout=timeout)
+        http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        self._http_clients += [http_client, http_async_client]
+        return {"http_client": http_client, "http_async_client": http_async_client}
+
+    def _build(self, provider: str):
+        """Creates the chat model of a provider."""
+        log.info(f"Attempting to initialize LLM provider: {provider}")
+
+        if not provider:
+            log.error("LLM_PROVIDER environment variable not set.")
+            raise ValueError("LLM_PROVIDER environment variable is not set.")
+
+        if provider == "DEEPSEEK":
+            api_key = os.getenv("DEEPSEEK_API_KEY")
+            if not api_key:
+                raise ValueError("DEEPSEEK_API_KEY is not set in the environment.")
+            return ChatDeepSeek(
+                api_key=api_key, model="deepseek-chat", temperature=0.7,
+                max_retries=LLM_MAX_RETRIES, **self._pool(),
+            )
+
+        elif provider == "GEMINI":
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                raise ValueError("GOOGLE_API_KEY is not set in the environment.")
+            # The Gemini client manages its own (gRPC) connections; sharing the instance reuses them
+            return ChatGoogleGenerativeAI(
+                model="gemini-pro", google_api_key=api_key, timeout=LLM_REQUEST_TIMEOUT, max_retries=LLM_MAX_RETRIES,
+            )
+
+        elif provider == "OPENAI":
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY is not set in the environment.")
+            return ChatOpenAI(api_key=api_key, model="gpt-4-turbo", max_retries=LLM_MAX_RETRIES, **self._pool())
+
+        elif provider == "ANTHROPIC":
+            api_key = os.getenv("ANTHROPIC_API_KEY")
+            if not api_key:
+                raise ValueError("ANTHROPIC_API_KEY is not set in the environment.")
+            # ChatAnthropic takes no HTTP client; the shared instance reuses the pool of its SDK client
+            return ChatAnthropic(
+                api_key=api_key, model="claude-3-sonnet-20240229",
+                default_request_timeout=LLM_REQUEST_TIMEOUT, max_retries=LLM_MAX_RETRIES,
+            )
+
+        elif provider == "GROQ":
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise ValueError("GROQ_API_KEY is not set in the environment.")
+            return ChatGroq(api_key=api_key, model_name="llama3-8b-8192", max_retries=LLM_MAX_RETRIES, **self._pool())
+
+        else:
+            log.error(f"Unsupported LLM provider: {provider}")
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"clients": len(self._clients), **self._counters}
+
+    async def close(self) -> None:
+        """Closes every connection pool; later calls to get() create new clients."""
+        with self._lock:
+            http_clients, self._http_clients = self._http_clients, []
+            self._clients.clear()
+        for client in http_clients:
+            if isinstance(client, httpx.AsyncClient):
+                await client.aclose()
+            else:
+                client.close()
+
+
+_registry = _LLMRegistry()
+
 def get_llm():
     """
     Reads the environment variables and returns the configured LLM provider instance.
+    The instance is shared by the whole process (per provider and API key), along with
+    its pooled keep-alive HTTP connections.
+
+    Raises:
+        ValueError: If LLM_PROVIDER is unset or unsupported, or its API key is missing.
     """
-    provider = os.getenv("LLM_PROVIDER")
-    log.info(f"Attempting to initialize LLM provider: {provider}")
-
-    if not provider:
-        log.error("LLM_PROVIDER environment variable not set.")
-        raise ValueError("LLM_PROVIDER environment variable is not set.")
-
-    provider = provider.upper()
-
-    if provider == "DEEPSEEK":
-        api_key = os.getenv("DEEPSEEK_API_KEY")
-        if not api_key:
-            raise ValueError("DEEPSEEK_API_KEY is not set in the environment.")
-        return ChatDeepSeek(api_key=api_key, model="deepseek-chat" , temperature=0.7)
-
-    elif provider == "GEMINI":
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY is not set in the environment.")
-        return ChatGoogleGenerativeAI(model="gemini-pro", google_api_key=api_key)
-
-    elif provider == "OPENAI":
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY is not set in the environment.")
-        return ChatOpenAI(api_key=api_key, model="gpt-4-turbo")
-
-    elif provider == "ANTHROPIC":
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY is not set in the environment.")
-        return ChatAnthropic(api_key=api_key, model="claude-3-sonnet-20240229")
-        
-    elif provider == "GROQ":
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY is not set in the environment.")
-        return ChatGroq(api_key=api_key, model_name="llama3-8b-8192")
-
-    else:
-        log.error(f"Unsupported LLM provider: {provider}")
-        raise ValueError(f"Unsupported LLM provider: {provider}")
\ No newline at end of file
+    return _registry.get()
+
+def llm_client_stats() -> Dict[str, Any]:
+    """Returns the number of shared LLM clients and how often they were reused."""
+    return _registry.stats()
+
+async def close_llm_clients() -> None:
+    """Closes the connection pools of the shared LLM clients."""
+    await _registry.close()
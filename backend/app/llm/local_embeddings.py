@@ -0,0 +1,89 @@
+import re
+import zlib
+import logging
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+log = logging.getLogger(__name__)
+
+# Identifiers and numbers; identifiers are further split into camelCase / snake_case parts
+_TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_SUBTOKEN_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# Tokens so common in code and prose that they carry almost no signal
+_STOP_WORDS = frozenset(
+    "a an and are as be by for from if in is it of on or the to this that with "
+    "def class return self import none true false var let const function new public private static void int"
+    .split()
+)
+
+# Relative weights of the feature families
+_WORD_WEIGHT = 1.0
+_SUBTOKEN_WEIGHT = 0.5
+_BIGRAM_WEIGHT = 0.5
+_TRIGRAM_WEIGHT = 0.25
+
+
+@lru_cache(maxsize=1 << 18)
+def _hash_feature(feature: str, dim: int) -> Tuple[int, float]:
+    """Maps a feature to a (column, sign) pair. crc32 is stable across processes, unlike hash()."""
+    digest = zlib.crc32(feature.encode("utf-8"))
+    return digest % dim, 1.0 if digest & 0x80000000 else -1.0
+
+
+def _features(text: str) -> List[Tuple[str, float]]:
+    """Extracts weighted word, sub-token, word-bigram and character-trigram features from a text."""
+    words = [w for w in _TOKEN_PATTERN.findall(text) if w.lower() not in _STOP_WORDS]
+    features = []
+    previous = None
+    for word in words:
+        lowered = word.lower()
+        features.append(("w:" + lowered, _WORD_WEIGHT))
+        parts = _SUBTOKEN_PATTERN.findall(word)
+        if len(parts) > 1:
+            features.extend(("s:" + part.lower(), _SUBTOKEN_WEIGHT) for part in parts)
+        if previous is not None:
+            features.append(("b:" + previous + " " + lowered, _BIGRAM_WEIGHT))
+        padded = f"^{lowered}$"
+        features.extend(("c:" + padded[i:i + 3], _TRIGRAM_WEIGHT) for i in range(len(padded) - 2))
+        previous = lowered
+    return features
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    A fully local, CPU-only embedding model. Texts are projected into a fixed-size space
+    with signed feature hashing of identifier, sub-token, bigram and character-trigram
+    features, then sublinear term-frequency scaling and L2 normalisation are applied to the
+    whole batch at once with NumPy. No network access, no model download, no fitting:
+    the same text always maps to the same vector, in any process.
+    """
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        rows, columns, weights = [], [], []
+        for row, text in enumerate(texts):
+            for feature, weight in _features(text):
+                column, sign = _hash_feature(feature, self.dim)
+                rows.append(row)
+                columns.append(column)
+                weights.append(sign * weight)
+
+        flat_index = np.asarray(rows, dtype=np.int64) * self.dim + np.asarray(columns, dtype=np.int64)
+        matrix = np.bincount(flat_index, weights=np.asarray(weights), minlength=len(texts) * self.dim)
+        matrix = matrix.reshape(len(texts), self.dim)
+        # Sublinear scaling keeps frequent identifiers from dominating, like TF-IDF's log(tf)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
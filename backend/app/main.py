@@ -1,10 +1,15 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 from app.utils.logging_config import setup_logging
 from app.routes.chat import router as chat_router
+from app.routes.admin import router as admin_router
+from app.utils import session_registry, vector_store_cache
+from app.utils.shared_chroma import close_shared_client
+from app.llm import close_llm_clients
 
 # --- Application Setup ---
 
@@ -17,11 +22,22 @@ setup_logging()
 # Get a logger for the main application
 log = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Runs the session garbage collector while the server is up and closes open stores and LLM connections on shutdown."""
+    session_registry.start()
+    yield
+    session_registry.stop()
+    vector_store_cache.clear()
+    close_shared_client()
+    await close_llm_clients()
+
 # Create the FastAPI application instance
 app = FastAPI(
     title="Codebase Copilot Backend",
     description="API for the multi-agent Codebase Copilot application.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- Middleware Configuration ---
@@ -40,6 +56,8 @@ app.add_middleware(
 
 # Include the chat router, which contains our /upload and /chat endpoints
 app.include_router(chat_router, prefix="/api")
+# Session administration: list, purge and garbage collect sessions
+app.include_router(admin_router, prefix="/api")
 
 # --- Root Endpoint ---
 
@@ -0,0 +1,77 @@
+import os
+import hmac
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.utils import session_registry, vector_store_cache
+from app.utils.context_packer import packing_stats
+from app.utils.file_cache import file_cache
+from app.agents import agent_cache, planner
+from app.llm import llm_client_stats
+
+log = logging.getLogger(__name__)
+
+# Token required in the X-Admin-Token header of admin requests (empty disables the admin endpoints)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Rejects admin requests without the configured token. The endpoints list every session id,
+    which is all it takes to read or chat with a session, so without a configured token they
+    answer as if they did not exist.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/sessions")
+async def list_sessions():
+    """
+    Lists every session with its creation time, last access, size on disk and active leases,
+    plus the registry's totals, quotas and garbage collection counters.
+    """
+    sessions = await run_in_threadpool(session_registry.list)
+    return {"sessions": sessions, "stats": session_registry.stats()}
+
+
+@router.delete("/sessions/{session_id}")
+async def purge_session(session_id: str):
+    """
+    Deletes a session's vector store, indexes and code. A session that is in use is
+    deleted as soon as its running requests finish.
+    """
+    status = await run_in_threadpool(session_registry.delete, session_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    log.info(f"Admin purge of session '{session_id}': {status}.")
+    return {"session_id": session_id, "status": status}
+
+
+@router.post("/sessions/gc")
+async def collect_sessions():
+    """Runs a garbage collection pass now and returns the deleted sessions by reason."""
+    deleted = await run_in_threadpool(session_registry.collect)
+    return {"deleted": deleted, "stats": session_registry.stats()}
+
+
+@router.get("/cache")
+async def cache_stats():
+    """Reports the open vector stores, file cache entries, compiled agents, shared LLM clients and planner with their counters."""
+    return {
+        "vector_stores": vector_store_cache.stats(), "files": file_cache.stats(),
+        "agents": agent_cache.stats(), "llm_clients": llm_client_stats(), "planner": planner.stats(),
+    }
+
+
+@router.get("/context")
+async def context_stats():
+    """Reports how many tokens packing retrieved chunks into spans has saved since startup."""
+    return packing_stats.to_dict()
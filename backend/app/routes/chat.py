@@ -1,20 +1,31 @@
 import os
+import json
+import time
 import uuid
 import logging
-import shutil
-from typing import Optional
+import zipfile
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 from pydantic import BaseModel
 from fastapi import APIRouter, UploadFile, File, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
+from langchain_core.documents import Document
 
 # Import everything we need
 from app.utils import (
-    extract_zip, 
-    load_and_chunk_codebase, 
+    extract_zip_stream, 
+    iter_codebase_chunks, 
     VectorStoreManager,
-    clone_github_repo
+    clone_github_repo,
+    ArchiveLimitError,
+    FilterStats,
+    SessionIndexes,
+    FileManifest,
+    IngestionJob,
+    job_manager,
+    session_registry
 )
-from langgraph_graph import stream_graph
-from fastapi.responses import Response
+from langgraph_graph import stream_graph, stream_graph_events
+from fastapi.responses import Response, StreamingResponse
 
 log = logging.getLogger(__name__)
 router = APIRouter()
@@ -27,19 +38,66 @@ SESSIONS_CODE_DIR = "sessions_code"
 class RepoURLRequest(BaseModel):
     repo_url: str
     token: Optional[str] = None
+    ref: Optional[str] = None
 
 
-# --- Internal Helper Function to Process a Repo ---
-def _process_repository(session_code_path: str, session_id: str):
-    """Internal function to run the chunking and vector store creation."""
-    documents = load_and_chunk_codebase(session_code_path)
-    if documents:
-        vsm = VectorStoreManager(session_id)
-        vsm.create_vector_store(documents)
-    else:
+# --- Internal Helper Functions to Process a Repo ---
+def _process_repository(chunks: Iterator[Document], session_id: str, job: IngestionJob, indexes: SessionIndexes):
+    """
+    Internal function to stream the chunks through embedding and vector store creation.
+    `indexes` is filled while the chunks are produced and saved next to the vector store.
+    """
+    job.set_stage("indexing")
+
+    def tracked_chunks() -> Iterator[Document]:
+        for chunk in chunks:
+            job.record_chunk(chunk.metadata["source"])
+            yield chunk
+
+    vsm = VectorStoreManager(session_id)
+    vsm.create_vector_store(tracked_chunks(), on_progress=job.record_indexed)
+    indexes.save(os.path.join(SESSIONS_DIR, session_id))
+    # Lists every file of the checkout for list_files, including those that were not indexed
+    FileManifest.build(os.path.join(SESSIONS_CODE_DIR, session_id)).save(os.path.join(SESSIONS_DIR, session_id))
+    session_registry.check_quota(session_id)
+    if not job.chunks_processed:
         log.warning(f"No documents were found to process for session {session_id}.")
 
 
+def _clone_and_process(job: IngestionJob, request: RepoURLRequest, session_code_path: str):
+    """Background job: clones a GitHub repository and indexes it."""
+    try:
+        job.set_stage("cloning")
+        clone_github_repo(request.repo_url, session_code_path, token=request.token, ref=request.ref)
+        indexes = SessionIndexes()
+        chunks = iter_codebase_chunks(session_code_path, stats=job.filter_stats, indexes=indexes)
+        _process_repository(chunks, job.session_id, job, indexes)
+    except Exception:
+        # The job still holds its lease, so the delete happens on release below, through the registry:
+        # it closes the store cached for the session and clears the file and agent caches too
+        session_registry.delete(job.session_id)
+        raise
+    finally:
+        session_registry.release(job.session_id)
+
+
+def _chunk_and_process(job: IngestionJob, session_code_path: str, filter_stats: FilterStats):
+    """Background job: chunks the files extracted from an uploaded ZIP and indexes them."""
+    try:
+        # Ignored members were already skipped while extracting, so keep reporting into those statistics
+        job.filter_stats = filter_stats
+        indexes = SessionIndexes()
+        chunks = iter_codebase_chunks(session_code_path, stats=filter_stats, indexes=indexes)
+        _process_repository(chunks, job.session_id, job, indexes)
+    except Exception:
+        # The job still holds its lease, so the delete happens on release below, through the registry:
+        # it closes the store cached for the session and clears the file and agent caches too
+        session_registry.delete(job.session_id)
+        raise
+    finally:
+        session_registry.release(job.session_id)
+
+
 @router.get("/repo/{session_id}/files")
 async def get_file_tree(session_id: str):
     """
@@ -51,6 +109,7 @@ async def get_file_tree(session_id: str):
     if not os.path.isdir(session_code_path):
         log.error(f"Session code directory not found for session_id: {session_id}")
         raise HTTPException(status_code=404, detail="Session not found or repository not processed.")
+    session_registry.touch(session_id)
 
     file_paths = []
     for root, _, files in os.walk(session_code_path):
@@ -65,55 +124,76 @@ async def get_file_tree(session_id: str):
     
     return {"files": file_paths}
 
+@router.get("/repo/{session_id}/status")
+async def get_ingestion_status(session_id: str):
+    """
+    Reports the progress of a session's background ingestion job.
+    """
+    job = job_manager.get(session_id)
+    if job:
+        return job.to_dict()
+    # Sessions ingested before the last restart have no job, but their vector store is on disk
+    if os.path.isdir(os.path.join(SESSIONS_DIR, session_id)):
+        return {"session_id": session_id, "stage": IngestionJob.COMPLETED}
+    raise HTTPException(status_code=404, detail="Session not found.")
+
 # --- Endpoint 1: For GitHub URL ---
-@router.post("/repo/clone")
+@router.post("/repo/clone", status_code=202)
 async def clone_repo_from_url(request: RepoURLRequest):
-    """Handles codebase processing from a GitHub URL, with optional token for private repos."""
+    """
+    Starts codebase processing from a GitHub URL, with optional token for private repos.
+    Ingestion runs in the background; poll /repo/{session_id}/status for progress.
+    """
     session_id = str(uuid.uuid4())
     # IMPORTANT: We will NOT log the token for security reasons.
-    log.info(f"Starting new session from URL: {request.repo_url} (token provided: {'yes' if request.token else 'no'})")
+    log.info(f"Starting new session from URL: {request.repo_url} (ref: {request.ref or 'default'}, token provided: {'yes' if request.token else 'no'})")
     session_code_path = os.path.join(SESSIONS_CODE_DIR, session_id)
     os.makedirs(session_code_path, exist_ok=True)
+    # The session is leased until its ingestion job finishes, so it cannot be garbage collected halfway
+    session_registry.create(session_id)
 
-    try:
-        # Pass the token to the cloning utility
-        clone_github_repo(request.repo_url, session_code_path, token=request.token)
-        _process_repository(session_code_path, session_id)
-        return {"session_id": session_id, "message": "Repository cloned and processed successfully."}
-    except Exception as e:
-        log.error(f"Error processing git repo for session {session_id}: {e}", exc_info=True)
-        if os.path.exists(session_code_path):
-            shutil.rmtree(session_code_path)
-        raise HTTPException(status_code=500, detail=str(e))
+    job = job_manager.submit(
+        session_id,
+        lambda job: _clone_and_process(job, request, session_code_path)
+    )
+    return {"session_id": session_id, "stage": job.stage, "message": "Repository ingestion started."}
 
 # --- Endpoint 2: For ZIP File Upload ---
-@router.post("/repo/upload_zip")
+@router.post("/repo/upload_zip", status_code=202)
 async def upload_repo_from_zip(file: UploadFile = File(...)):
-    """Handles codebase processing from a ZIP file upload."""
+    """
+    Starts codebase processing from a ZIP file upload.
+    Ingestion runs in the background; poll /repo/{session_id}/status for progress.
+    """
     session_id = str(uuid.uuid4())
     log.info(f"Starting new session from ZIP: {session_id}")
-    session_path = os.path.join(SESSIONS_DIR, session_id)
     session_code_path = os.path.join(SESSIONS_CODE_DIR, session_id)
-    os.makedirs(session_path, exist_ok=True)
     os.makedirs(session_code_path, exist_ok=True)
-    zip_path = os.path.join(session_path, file.filename)
+    session_registry.create(session_id)
 
     try:
-        with open(zip_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # The upload is only readable during this request, so it is extracted here;
+        # chunking and embedding happen in the background job.
+        filter_stats = FilterStats()
+        await run_in_threadpool(extract_zip_stream, file.file, session_code_path, filter_stats)
         await file.close()
-        
-        extract_zip(zip_path, session_code_path)
-        _process_repository(session_code_path, session_id)
-        return {"session_id": session_id, "message": "ZIP file uploaded and processed successfully."}
+    except (ArchiveLimitError, zipfile.BadZipFile) as e:
+        log.warning(f"Rejected ZIP file for session {session_id}: {e}")
+        session_registry.delete(session_id)
+        session_registry.release(session_id)
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        log.error(f"Error processing ZIP file for session {session_id}: {e}", exc_info=True)
-        if os.path.exists(session_path):
-            shutil.rmtree(session_path)
-        if os.path.exists(session_code_path):
-            shutil.rmtree(session_code_path)
+        log.error(f"Error reading ZIP file for session {session_id}: {e}", exc_info=True)
+        session_registry.delete(session_id)
+        session_registry.release(session_id)
         raise HTTPException(status_code=500, detail=str(e))
 
+    job = job_manager.submit(
+        session_id,
+        lambda job: _chunk_and_process(job, session_code_path, filter_stats)
+    )
+    return {"session_id": session_id, "stage": job.stage, "message": "ZIP file uploaded. Ingestion started."}
+
 
 # --- The Chat Endpoint remains the same ---
 @router.post("/chat/{session_id}")
@@ -121,12 +201,75 @@ async def chat_with_agent(session_id: str, query: str = Body(..., embed=True)):
     if not session_id:
         raise HTTPException(status_code=400, detail="Session ID is required.")
     log.info(f"Received chat request for session '{session_id}': '{query}'")
+    job = job_manager.get(session_id)
+    if job and not job.is_finished:
+        raise HTTPException(status_code=409, detail=f"Session is still being ingested (stage: {job.stage}).")
     try:
-        full_response = "".join(list(stream_graph(session_id=session_id, query=query)))
+        # The lease keeps the session from being garbage collected or purged while the agents use it
+        with session_registry.lease(session_id):
+            full_response = "".join([chunk async for chunk in stream_graph(session_id=session_id, query=query)])
         return Response(content=full_response, media_type="text/plain")
     except FileNotFoundError:
         log.error(f"Chat failed for session '{session_id}': Vector store not found.")
         raise HTTPException(status_code=404, detail="Session not found or vector store is missing.")
     except Exception as e:
         log.error(f"An unexpected error occurred during chat for session '{session_id}': {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="An internal error occurred.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+
+@router.post("/chat/{session_id}/stream")
+async def chat_with_agent_stream(session_id: str, query: str = Body(..., embed=True)):
+    """
+    Streams a chat turn as Server-Sent Events while the agents work: the plan, agent start/end,
+    tool calls and LLM tokens (see stream_graph_events), then a final 'done' event with the
+    time to the first token. Failures after the stream has started arrive as an 'error' event.
+    """
+    if not session_id:
+        raise HTTPException(status_code=400, detail="Session ID is required.")
+    log.info(f"Received streaming chat request for session '{session_id}': '{query}'")
+    job = job_manager.get(session_id)
+    if job and not job.is_finished:
+        raise HTTPException(status_code=409, detail=f"Session is still being ingested (stage: {job.stage}).")
+    # The lease is taken by the event generator itself: a response that is never iterated,
+    # e.g. because the client disconnected first, must not hold the session
+    if not session_registry.exists(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or vector store is missing.")
+    return StreamingResponse(
+        _chat_events(session_id, query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _chat_events(session_id: str, query: str) -> AsyncIterator[str]:
+    """Leases the session, runs the graph on the event loop and formats its events for SSE."""
+    started = time.perf_counter()
+    first_token_ms = None
+    try:
+        session_registry.acquire(session_id)
+    except FileNotFoundError:
+        # Deleted between the request and the start of the stream
+        yield _sse({"event": "error", "detail": "Session not found or vector store is missing."})
+        return
+    try:
+        async for event in stream_graph_events(session_id=session_id, query=query):
+            if first_token_ms is None and event["event"] == "token":
+                first_token_ms = round((time.perf_counter() - started) * 1000)
+                log.info(f"First token for session '{session_id}' after {first_token_ms} ms.")
+            yield _sse(event)
+    except FileNotFoundError:
+        log.error(f"Chat failed for session '{session_id}': Vector store not found.")
+        yield _sse({"event": "error", "detail": "Session not found or vector store is missing."})
+    except Exception as e:
+        log.error(f"An unexpected error occurred during chat for session '{session_id}': {e}", exc_info=True)
+        yield _sse({"event": "error", "detail": "An internal error occurred."})
+    finally:
+        session_registry.release(session_id)
+    total_ms = round((time.perf_counter() - started) * 1000)
+    log.info(f"Streamed chat for session '{session_id}' in {total_ms} ms (first token: {first_token_ms} ms).")
+    yield _sse({"event": "done", "first_token_ms": first_token_ms, "total_ms": total_ms})
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    payload = {key: value for key, value in event.items() if key != "event"}
+    return f"event: {event['event']}\ndata: {json.dumps(payload, default=str)}\n\n"
@@ -1,3 +1,6 @@
 from .file_reader import ReadFileTool
+from .read_files import ReadFilesTool
 from .retrieval import get_retriever_tool
-from .list_files import ListFilesTool 
\ No newline at end of file
+from .list_files import ListFilesTool 
+from .find_symbol import FindSymbolTool
+from .search_code import SearchCodeTool
@@ -1,55 +1,133 @@
 import os
+import asyncio
 import logging
-from typing import Type
+from typing import List, Optional, Type
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
+from app.utils.file_cache import CachedFile, file_cache
+from app.utils.symbol_index import Symbol, extract_symbols, load_symbol_index
 
 log = logging.getLogger(__name__)
 
 # Base directory for all user sessions and their extracted code
+SESSIONS_DIR = "sessions"
 SESSIONS_CODE_DIR = "sessions_code"
+# Files larger than this are returned as an outline plus their first lines unless a line range is given
+READ_FILE_MAX_BYTES = int(os.getenv("READ_FILE_MAX_BYTES", "100000"))
+# Number of lines shown after the outline of an oversized file
+READ_FILE_HEAD_LINES = 150
+# Maximum number of lines returned for one line range
+READ_FILE_MAX_LINES = 1000
+# Maximum number of definitions listed in an outline
+MAX_OUTLINE_ENTRIES = 200
+# Oversized files are parsed for an outline only up to this size when the symbol index lacks them
+MAX_OUTLINE_PARSE_BYTES = 4 * 1024 * 1024
+
+def resolve_path(session_id: str, file_path: str) -> Optional[str]:
+    """Returns the absolute path of a file of a session, or None if it points outside the session's code."""
+    session_code_path = os.path.realpath(os.path.join(SESSIONS_CODE_DIR, session_id))
+    # Security: Resolve the path (including symlinks) and ensure it's within the session's directory.
+    full_path = os.path.realpath(os.path.join(session_code_path, file_path))
+    if full_path != session_code_path and not full_path.startswith(session_code_path + os.sep):
+        return None
+    return full_path
 
 class ReadFileToolInput(BaseModel):
     """Input schema for the ReadFileTool."""
     file_path: str = Field(description="The relative path to the file within the codebase.")
+    start_line: Optional[int] = Field(default=None, description="First line to read (1-based). Omit to read from the start.")
+    end_line: Optional[int] = Field(default=None, description="Last line to read (inclusive). Omit to read to the end.")
 
 class ReadFileTool(BaseTool):
     """
     A tool to read the content of a specific file from the codebase.
     This tool is sandboxed to the session's code directory for security.
+    Files are read through the shared memory-mapped file cache.
     """
     name: str = "read_file"
     description: str = (
-        "Reads the entire content of a specified file. "
-        "Use this to get the code from a file before debugging, refactoring, or analyzing it."
+        "Reads the content of a specified file, or only lines 'start_line' to 'end_line' of it (numbered). "
+        "Use this to get the code from a file before debugging, refactoring, or analyzing it. "
+        "Very large files return an outline of their definitions with line numbers plus their first lines; "
+        "read the part you need with a line range."
     )
     args_schema: Type[BaseModel] = ReadFileToolInput
     session_id: str
 
-    def _run(self, file_path: str) -> str:
+    def resolve_path(self, file_path: str) -> Optional[str]:
+        """Returns the absolute path of a file of the session, or None if it points outside the session's code."""
+        return resolve_path(self.session_id, file_path)
+
+    def _run(self, file_path: str, start_line: Optional[int] = None, end_line: Optional[int] = None) -> str:
         """Executes the tool to read the file content."""
-        session_code_path = os.path.join(SESSIONS_CODE_DIR, self.session_id)
-        
-        # Security: Create the absolute path and ensure it's within the session's directory.
-        full_path = os.path.abspath(os.path.join(session_code_path, file_path))
-        
-        if not full_path.startswith(os.path.abspath(session_code_path)):
+        full_path = self.resolve_path(file_path)
+        if full_path is None:
             log.warning(f"Attempted path traversal attack by agent: {file_path}")
             return "Error: Access denied. You can only access files within the codebase."
 
-        log.info(f"Agent reading file: '{full_path}' for session '{self.session_id}'")
+        log.info(f"Agent reading file: '{full_path}' (lines {start_line or 1}-{end_line or 'end'}) for session '{self.session_id}'")
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return content
-        except FileNotFoundError:
+            cached = file_cache.get(self.session_id, full_path)
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
             log.error(f"File not found by agent: {full_path}")
             return f"Error: File '{file_path}' not found."
         except Exception as e:
             log.error(f"Error reading file {full_path}: {e}", exc_info=True)
             return f"Error: Could not read file '{file_path}'."
 
-    async def _arun(self, file_path: str) -> str:
-        """Asynchronous version of the tool's execution."""
-        # For this I/O bound operation, we can reuse the synchronous implementation
-        return self._run(file_path)
\ No newline at end of file
+        if start_line is not None or end_line is not None:
+            return self.read_range(file_path, cached, start_line or 1, end_line or cached.line_count)
+        if cached.size > READ_FILE_MAX_BYTES:
+            return self._outline(file_path, cached)
+        return cached.text()
+
+    def read_range(self, file_path: str, cached: CachedFile, start_line: int, end_line: int) -> str:
+        """Returns a range of lines, numbered, capped at READ_FILE_MAX_LINES."""
+        if not cached.line_count:
+            # Any range of an empty file is empty, not an error
+            return f"'{file_path}' is empty (0 lines)."
+        if start_line > cached.line_count or start_line > end_line:
+            return f"Error: Invalid line range {start_line}-{end_line}; '{file_path}' has {cached.line_count} lines."
+        start_line = max(1, start_line)
+        end_line = min(end_line, cached.line_count, start_line + READ_FILE_MAX_LINES - 1)
+        output = f"Lines {start_line}-{end_line} of {cached.line_count} in '{file_path}':\n"
+        output += _numbered(cached.lines(start_line, end_line), start_line)
+        if end_line < cached.line_count:
+            output += f"\n... ({cached.line_count - end_line} more lines; continue from start_line={end_line + 1})"
+        return output
+
+    def _outline(self, file_path: str, cached: CachedFile) -> str:
+        """Describes an oversized file by its definitions and its first lines."""
+        sections = [
+            f"'{file_path}' is too large to read at once ({cached.line_count} lines, {cached.size // 1024} KB). "
+            "Read a specific part with 'start_line' and 'end_line'."
+        ]
+        symbols = self._file_symbols(file_path, cached)
+        if symbols:
+            entries = [
+                f"  {symbol.start_line}-{symbol.end_line}  {symbol.kind} {symbol.qualified_name}"
+                for symbol in symbols[:MAX_OUTLINE_ENTRIES]
+            ]
+            if len(symbols) > MAX_OUTLINE_ENTRIES:
+                entries.append(f"  ... ({len(symbols) - MAX_OUTLINE_ENTRIES} more definitions)")
+            sections.append("Outline:\n" + "\n".join(entries))
+        head_end = min(READ_FILE_HEAD_LINES, cached.line_count)
+        sections.append(f"First {head_end} lines:\n" + _numbered(cached.lines(1, head_end), 1))
+        return "\n\n".join(sections)
+
+    def _file_symbols(self, file_path: str, cached: CachedFile) -> List[Symbol]:
+        """Returns the file's definitions from the session's symbol index, or parses them if it lacks the file."""
+        relative_path = os.path.relpath(self.resolve_path(file_path), os.path.realpath(os.path.join(SESSIONS_CODE_DIR, self.session_id)))
+        index = load_symbol_index(os.path.join(SESSIONS_DIR, self.session_id))
+        symbols = index.file_symbols(relative_path) if index is not None else []
+        if not symbols and cached.size <= MAX_OUTLINE_PARSE_BYTES:
+            symbols = sorted(extract_symbols(relative_path, cached.text()).definitions, key=lambda symbol: symbol.start_line)
+        return symbols
+
+    async def _arun(self, file_path: str, start_line: Optional[int] = None, end_line: Optional[int] = None) -> str:
+        """Asynchronous version of the tool's execution, run in a worker thread so file I/O never blocks the event loop."""
+        return await asyncio.to_thread(self._run, file_path, start_line, end_line)
+
+
+def _numbered(lines: List[str], first_line: int) -> str:
+    return "\n".join(f"{number:>5} | {line}" for number, line in enumerate(lines, start=first_line))
@@ -0,0 +1,99 @@
+import os
+import asyncio
+import logging
+from typing import List, Optional, Type
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+from app.tools.file_reader import resolve_path
+from app.utils.file_cache import file_cache
+from app.utils.symbol_index import Symbol, load_symbol_index
+
+log = logging.getLogger(__name__)
+
+# Directories where each session's indexes and extracted code are stored
+SESSIONS_DIR = "sessions"
+# Definitions whose code is included in the output; further matches are only listed
+MAX_DEFINITIONS_WITH_CODE = 3
+# Longest definition body included in the output
+MAX_CODE_LINES = 150
+MAX_LISTED_REFERENCES = 30
+
+class FindSymbolToolInput(BaseModel):
+    """Input schema for the FindSymbolTool."""
+    name: str = Field(description="The function, class, method or variable name, optionally qualified (e.g. 'MyClass.my_method').")
+    kind: Optional[str] = Field(
+        default=None,
+        description="Optionally restrict matches to one kind: function, method, class, variable, interface, struct, enum.",
+    )
+    include_code: bool = Field(default=True, description="Include the source code of the definitions.")
+
+class FindSymbolTool(BaseTool):
+    """
+    A tool to look up where a symbol is defined, referenced and imported, backed by the
+    symbol index built at ingest. It replaces several list_files/read_file round trips
+    with a single call.
+    """
+    name: str = "find_symbol"
+    description: str = (
+        "Finds where a function, class, method or variable is defined (file and line range, with its code), "
+        "where it is referenced, and which files import it. "
+        "Use this FIRST whenever you know the name of the code you are looking for."
+    )
+    args_schema: Type[BaseModel] = FindSymbolToolInput
+    session_id: str
+
+    def _run(self, name: str, kind: Optional[str] = None, include_code: bool = True) -> str:
+        """Executes the tool to look up a symbol."""
+        index = load_symbol_index(os.path.join(SESSIONS_DIR, self.session_id))
+        if index is None:
+            return "Error: No symbol index is available for this codebase. Use 'list_files' and 'read_file' instead."
+
+        log.info(f"Agent looking up symbol '{name}' for session '{self.session_id}'")
+        matches = index.find(name, kind=kind)
+        if not matches:
+            return f"No definition found for '{name}'."
+
+        short_name = name.strip().strip("`").removesuffix("()").rsplit(".", 1)[-1]
+        exact = all(symbol.name == short_name for symbol in matches)
+        heading = f"Found {len(matches)} definition(s) of '{name}':" if exact else f"No exact match for '{name}'. Similar symbols:"
+        sections = [heading]
+        for position, symbol in enumerate(matches):
+            location = f"[{symbol.kind}] {symbol.qualified_name} — {symbol.path}:{symbol.start_line}-{symbol.end_line}"
+            if include_code and exact and position < MAX_DEFINITIONS_WITH_CODE:
+                sections.append(f"{location}\n{self._read_lines(symbol)}")
+            else:
+                sections.append(f"{location}\n    {symbol.signature}")
+
+        references = index.find_references(name)
+        if references:
+            listed = ", ".join(f"{path}:{line}" for path, line in references[:MAX_LISTED_REFERENCES])
+            more = f" (and {len(references) - MAX_LISTED_REFERENCES} more)" if len(references) > MAX_LISTED_REFERENCES else ""
+            sections.append(f"Referenced at: {listed}{more}")
+        importers = index.find_importers(name)
+        if importers:
+            sections.append(f"Imported by: {', '.join(importers[:MAX_LISTED_REFERENCES])}")
+        return "\n\n".join(sections)
+
+    def _read_lines(self, symbol: Symbol) -> str:
+        """Returns the symbol's source lines, numbered, or its signature if the file cannot be read."""
+        full_path = resolve_path(self.session_id, symbol.path)
+        if full_path is None:
+            log.warning(f"Symbol '{symbol.name}' points outside the codebase: {symbol.path}")
+            return f"    {symbol.signature}"
+        try:
+            cached = file_cache.get(self.session_id, full_path)
+        except OSError as e:
+            log.warning(f"Could not read '{full_path}' for symbol '{symbol.name}': {e}")
+            return f"    {symbol.signature}"
+        end_line = min(symbol.end_line, symbol.start_line + MAX_CODE_LINES - 1)
+        lines: List[str] = [
+            f"{number:>5} | {line.rstrip()}"
+            for number, line in enumerate(cached.lines(symbol.start_line, end_line), start=symbol.start_line)
+        ]
+        if end_line < symbol.end_line:
+            lines.append(f"      ... ({symbol.end_line - end_line} more lines, use 'read_file' to see them)")
+        return "\n".join(lines)
+
+    async def _arun(self, name: str, kind: Optional[str] = None, include_code: bool = True) -> str:
+        """Asynchronous version of the tool's execution, run in a worker thread so reading definitions never blocks the event loop."""
+        return await asyncio.to_thread(self._run, name, kind, include_code)
@@ -1,13 +1,18 @@
 import os
+import asyncio
 import logging
-from typing import Type, Optional
+from typing import List, Optional, Tuple, Type
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
+from app.utils.file_manifest import FileManifest, load_file_manifest
 
 log = logging.getLogger(__name__)
 
-# Directory where extracted code for sessions is stored
+# Directories where each session's indexes and extracted code are stored
+SESSIONS_DIR = "sessions"
 SESSIONS_CODE_DIR = "sessions_code"
+# Upper bound on the entries an agent can ask for, to keep tool output within the context window
+MAX_ENTRIES_LIMIT = 1000
 
 class ListFilesToolInput(BaseModel):
     """Input schema for the ListFilesTool."""
@@ -15,46 +20,110 @@ class ListFilesToolInput(BaseModel):
         default=".",
         description="The relative directory path to list files from. Defaults to the root.",
     )
+    recursive: bool = Field(default=False, description="List the files of all subdirectories too.")
+    glob: Optional[str] = Field(
+        default=None, description="Only list files matching this glob, at any depth, e.g. '*.py' or 'tests/**/test_*.py'.",
+    )
+    max_depth: Optional[int] = Field(
+        default=None, description="With recursive listing, how many directory levels to descend; deeper ones are summarised.",
+    )
+    max_entries: int = Field(default=200, description="Maximum number of entries to return.")
 
 class ListFilesTool(BaseTool):
     """
     A tool to list files and directories within the codebase.
-    This provides visibility into the project structure.
+    This provides visibility into the project structure. Listings come from the
+    session's in-memory file manifest, so a whole tree is listed in one call.
     """
     name: str = "list_files"
     description: str = (
-        "Lists all files and directories within a specified path of the codebase. "
-        "Use this to explore the project structure and find correct file paths."
+        "Lists the files and directories within a specified path of the codebase, with file sizes and languages. "
+        "Set 'recursive' to list a whole subtree at once (optionally limited by 'max_depth'), or 'glob' to find "
+        "files by name pattern anywhere below the path. Use this to explore the project structure and find correct file paths."
     )
     args_schema: Type[BaseModel] = ListFilesToolInput
     session_id: str
 
-    def _run(self, directory: str = ".") -> str:
+    def _run(
+        self,
+        directory: str = ".",
+        recursive: bool = False,
+        glob: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        max_entries: int = 200,
+    ) -> str:
         """Executes the tool to list directory contents."""
+        directory = directory or "."
         session_code_path = os.path.join(SESSIONS_CODE_DIR, self.session_id)
-        
+
         # Security: Prevent path traversal attacks
+        root = os.path.abspath(session_code_path)
         target_path = os.path.abspath(os.path.join(session_code_path, directory))
-        if not target_path.startswith(os.path.abspath(session_code_path)):
+        if target_path != root and not target_path.startswith(root + os.sep):
             return "Error: Access denied. Path is outside the allowed project directory."
 
-        log.info(f"Agent listing files in: '{target_path}' for session '{self.session_id}'")
-        
+        log.info(
+            f"Agent listing files in: '{target_path}' (recursive: {recursive}, glob: {glob}, depth: {max_depth}) "
+            f"for session '{self.session_id}'"
+        )
+
         try:
-            if not os.path.isdir(target_path):
+            manifest = self._manifest(session_code_path)
+            if manifest is None or not manifest.is_dir(directory):
+                if os.path.isdir(target_path) and not os.listdir(target_path):
+                    return f"The directory '{directory}' is empty."
                 return f"Error: '{directory}' is not a valid directory."
-            
-            contents = os.listdir(target_path)
-            if not contents:
-                return f"The directory '{directory}' is empty."
-            
-            return "\n".join(contents)
-        except FileNotFoundError:
-            return f"Error: Directory '{directory}' not found."
+
+            if recursive or max_depth:
+                depth = max_depth if max_depth and max_depth > 0 else None
+            else:
+                depth = 1
+            listing = manifest.list(directory, depth=depth, glob=glob)
+            max_entries = max(1, min(max_entries, MAX_ENTRIES_LIMIT))
+            lines: List[Tuple[str, str]] = sorted(
+                [(f"{path}/", f"{path}/ ({count} file{'s' if count != 1 else ''}, {_format_size(size)})") for path, count, size in listing.directories]
+                + [(entry.path, f"{entry.path}  {_format_size(entry.size)}  {entry.language}".rstrip()) for entry in listing.files]
+            )
+            if not lines:
+                return f"No files matching '{glob}' in '{directory}'." if glob else f"The directory '{directory}' is empty."
+
+            total_files = len(listing.files) + sum(count for _, count, _ in listing.directories)
+            output = "\n".join(line for _, line in lines[:max_entries])
+            if len(lines) > max_entries:
+                output += (
+                    f"\n... {len(lines) - max_entries} more entries not shown ({total_files} files in total); "
+                    "narrow the listing with 'glob', 'max_depth' or a subdirectory."
+                )
+            return output
         except Exception as e:
             log.error(f"Error listing files in {target_path}: {e}", exc_info=True)
             return "An unexpected error occurred while listing files."
 
-    async def _arun(self, directory: str = ".") -> str:
+    def _manifest(self, session_code_path: str) -> Optional[FileManifest]:
+        """Returns the session's manifest, building it for sessions indexed before manifests existed."""
+        session_path = os.path.join(SESSIONS_DIR, self.session_id)
+        manifest = load_file_manifest(session_path)
+        if manifest is None and os.path.isdir(session_code_path):
+            manifest = FileManifest.build(session_code_path)
+            if os.path.isdir(session_path):
+                manifest.save(session_path)
+        return manifest
+
+    async def _arun(
+        self,
+        directory: str = ".",
+        recursive: bool = False,
+        glob: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        max_entries: int = 200,
+    ) -> str:
         """Asynchronous version of the tool's execution."""
-        return self._run(directory)
\ No newline at end of file
+        return await asyncio.to_thread(self._run, directory, recursive, glob, max_depth, max_entries)
+
+
+def _format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 ** 2:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 ** 2:.1f} MB"
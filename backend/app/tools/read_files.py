@@ -0,0 +1,109 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Type
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+from app.tools.file_reader import ReadFileTool
+
+log = logging.getLogger(__name__)
+
+# Total characters of file content returned by one call
+READ_FILES_MAX_CHARS = int(os.getenv("READ_FILES_MAX_CHARS", "120000"))
+# Maximum number of files read by one call
+MAX_FILES_PER_CALL = 20
+# Files read at the same time
+READ_FILES_CONCURRENCY = 8
+
+class FileRange(BaseModel):
+    """One file to read, optionally limited to a line range."""
+    file_path: str = Field(description="The relative path to the file within the codebase.")
+    start_line: Optional[int] = Field(default=None, description="First line to read (1-based). Omit to read from the start.")
+    end_line: Optional[int] = Field(default=None, description="Last line to read (inclusive). Omit to read to the end.")
+
+class ReadFilesToolInput(BaseModel):
+    """Input schema for the ReadFilesTool."""
+    files: List[FileRange] = Field(description=f"The files to read, at most {MAX_FILES_PER_CALL}, each optionally with a line range.")
+
+class ReadFilesTool(BaseTool):
+    """
+    Reads several files of the codebase in one call, concurrently, through the same
+    sandboxed reader and file cache as ReadFileTool. The combined output is kept within
+    READ_FILES_MAX_CHARS: files that no longer fit are cut or listed as left out.
+    """
+    name: str = "read_files"
+    description: str = (
+        "Reads several files (or line ranges of them) at once and returns them together, each under a '==== path ====' header. "
+        "Use this instead of repeated 'read_file' calls whenever you already know that you need more than one file."
+    )
+    args_schema: Type[BaseModel] = ReadFilesToolInput
+    session_id: str
+
+    def _run(self, files: List[FileRange]) -> str:
+        """Executes the tool to read the files."""
+        requests = self._requests(files)
+        if not requests:
+            return "Error: No files were given."
+        reader = ReadFileTool(session_id=self.session_id)
+        with ThreadPoolExecutor(max_workers=min(READ_FILES_CONCURRENCY, len(requests), MAX_FILES_PER_CALL)) as pool:
+            contents = list(pool.map(
+                lambda request: reader._run(request.file_path, request.start_line, request.end_line), requests[:MAX_FILES_PER_CALL]
+            ))
+        return self._combine(requests, contents)
+
+    async def _arun(self, files: List[FileRange]) -> str:
+        """Asynchronous version of the tool's execution; the files are read in worker threads without blocking the event loop."""
+        requests = self._requests(files)
+        if not requests:
+            return "Error: No files were given."
+        reader = ReadFileTool(session_id=self.session_id)
+        # Same bound as the thread pool of the sync path, so one call never floods the shared default executor
+        semaphore = asyncio.Semaphore(READ_FILES_CONCURRENCY)
+
+        async def read(request: FileRange) -> str:
+            async with semaphore:
+                return await asyncio.to_thread(reader._run, request.file_path, request.start_line, request.end_line)
+
+        contents = await asyncio.gather(*(read(request) for request in requests[:MAX_FILES_PER_CALL]))
+        return self._combine(requests, list(contents))
+
+    def _requests(self, files: List[FileRange]) -> List[FileRange]:
+        """Validates the requested files and drops duplicates."""
+        requests: List[FileRange] = []
+        seen = set()
+        for request in files:
+            request = FileRange.model_validate(request) if isinstance(request, dict) else request
+            key = (request.file_path, request.start_line, request.end_line)
+            if key not in seen:
+                seen.add(key)
+                requests.append(request)
+        log.info(f"Agent reading {len(requests)} files at once for session '{self.session_id}'")
+        return requests
+
+    def _combine(self, requests: List[FileRange], contents: List[str]) -> str:
+        """Joins the file contents in request order within the character budget; `contents` may cover only the first requests."""
+        sections: List[str] = []
+        left_out: List[str] = []
+        remaining = READ_FILES_MAX_CHARS
+        for request, content in zip(requests, contents):
+            if remaining <= 0:
+                left_out.append(request.file_path)
+                continue
+            if len(content) > remaining:
+                cut = content.rfind("\n", 0, remaining)
+                content = content[:cut if cut > 0 else remaining] + (
+                    f"\n... (cut to fit the response; read the rest of '{request.file_path}' with 'read_file' and a line range)"
+                )
+            sections.append(f"==== {request.file_path} ====\n{content}")
+            remaining -= len(content)
+
+        output = "\n\n".join(sections)
+        if left_out:
+            output += f"\n\nNot included, the response is full; read these separately: {', '.join(left_out)}"
+        if len(requests) > len(contents):
+            output += (
+                f"\n\nOnly {MAX_FILES_PER_CALL} files are read per call; request these in another call: "
+                f"{', '.join(request.file_path for request in requests[len(contents):])}"
+            )
+        return output
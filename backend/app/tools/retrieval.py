@@ -1,7 +1,10 @@
+import asyncio
 import logging
 from langchain.tools import Tool
-from langchain.tools.retriever import create_retriever_tool
+from langchain_core.tools import StructuredTool
+from langchain_core.tools.retriever import RetrieverInput
 from app.utils.vector_store_manager import VectorStoreManager
+from app.utils.context_packer import pack_context
 
 log = logging.getLogger(__name__)
 
@@ -14,7 +17,7 @@ def get_retriever_tool(session_id: str) -> Tool:
         session_id (str): The unique identifier for the user's session.
 
     Returns:
-        Tool: A LangChain tool configured for semantic retrieval.
+        Tool: A LangChain tool configured for hybrid semantic and lexical retrieval.
     """
     log.info(f"Creating retriever tool for session_id: {session_id}")
     
@@ -22,18 +25,40 @@ def get_retriever_tool(session_id: str) -> Tool:
         # Initialize the vector store manager for the given session
         vsm = VectorStoreManager(session_id=session_id)
         
-        # Get the retriever interface from the manager
-        retriever = vsm.get_retriever()
+        # Fail early if the session has no vector store
+        vsm.get_retriever()
         
-        # Create a pre-packaged retriever tool
+        # The retriever is resolved on every call rather than captured here: the tool lives as long as
+        # its cached agent, while the vector store behind it may be closed and reopened by the store cache.
+        # Each call leases the store, so an eviction during the query defers closing it until the query ends.
+        # Retrieved chunks are merged into line-ranged spans per file and packed into the token budget.
+        def retrieve(query: str) -> str:
+            with vsm.lease_retriever() as retriever:
+                documents = retriever.invoke(query)
+            return pack_context(documents).text
+
+        async def aretrieve(query: str) -> str:
+            # Opening the store may read it from disk, so the lease is taken in a worker thread
+            lease = vsm.lease_retriever()
+            retriever = await asyncio.to_thread(lease.__enter__)
+            try:
+                documents = await retriever.ainvoke(query)
+            finally:
+                lease.__exit__(None, None, None)
+            return pack_context(documents).text
+
         # The description is crucial, as it tells the agent *when* to use this tool.
-        tool = create_retriever_tool(
-            retriever,
-            "codebase_retriever",
-            (
+        tool = StructuredTool.from_function(
+            func=retrieve,
+            coroutine=aretrieve,
+            name="codebase_retriever",
+            args_schema=RetrieverInput,
+            description=(
                 "Searches and retrieves relevant code snippets, file contents, or summaries "
-                "from the codebase vector store. Use this to answer questions about "
-                "how the code works, what a specific function does, or where certain logic is located."
+                "from the codebase using both semantic and exact keyword search. Use this to answer questions about "
+                "how the code works, what a specific function does, or where certain logic is located. "
+                "To find where an identifier is defined or used, query just the identifier (e.g. `clone_github_repo`). "
+                "Results are grouped by file, with the line numbers of each snippet."
             ),
         )
         log.info(f"Retriever tool for session '{session_id}' created successfully.")
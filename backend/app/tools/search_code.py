@@ -0,0 +1,97 @@
+import os
+import re
+import asyncio
+import time
+import logging
+from typing import List, Optional, Type
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+from app.utils.trigram_index import load_trigram_index
+
+log = logging.getLogger(__name__)
+
+# Directories where each session's indexes and extracted code are stored
+SESSIONS_DIR = "sessions"
+SESSIONS_CODE_DIR = "sessions_code"
+# Upper bounds on what an agent can ask for, to keep tool output within the context window
+MAX_RESULTS_LIMIT = 200
+MAX_CONTEXT_LINES = 10
+# Matched lines are truncated to this many characters
+MAX_LINE_LENGTH = 300
+
+class SearchCodeToolInput(BaseModel):
+    """Input schema for the SearchCodeTool."""
+    pattern: str = Field(description="A regular expression (Python syntax) or plain substring to search for, matched line by line.")
+    path_glob: Optional[str] = Field(default=None, description="Only search files matching this glob, e.g. 'src/**/*.py' or '*.ts'.")
+    ignore_case: bool = Field(default=False, description="Match case-insensitively.")
+    max_results: int = Field(default=30, description="Maximum number of matching lines to return.")
+    context_lines: int = Field(default=0, description="Number of lines to show before and after each match.")
+
+class SearchCodeTool(BaseTool):
+    """
+    A grep-like tool over the session's code, backed by the trigram index built at ingest,
+    so only files that can contain a match are opened.
+    """
+    name: str = "search_code"
+    description: str = (
+        "Searches the whole codebase for a regular expression or exact text, like grep, and returns "
+        "matching lines as 'path:line: text'. Use this to find every usage of a name, string, error message, "
+        "config key or pattern. Narrow it down with 'path_glob' and show surrounding code with 'context_lines'."
+    )
+    args_schema: Type[BaseModel] = SearchCodeToolInput
+    session_id: str
+
+    def _run(
+        self,
+        pattern: str,
+        path_glob: Optional[str] = None,
+        ignore_case: bool = False,
+        max_results: int = 30,
+        context_lines: int = 0,
+    ) -> str:
+        """Executes the tool to search the code."""
+        index = load_trigram_index(os.path.join(SESSIONS_DIR, self.session_id))
+        if index is None:
+            return "Error: No search index is available for this codebase. Use 'codebase_retriever' or 'read_file' instead."
+
+        max_results = max(1, min(max_results, MAX_RESULTS_LIMIT))
+        context_lines = max(0, min(context_lines, MAX_CONTEXT_LINES))
+        root = os.path.join(SESSIONS_CODE_DIR, self.session_id)
+        started = time.perf_counter()
+        try:
+            matches = list(index.search(root, pattern, ignore_case, path_glob, max_results, context_lines))
+        except re.error as e:
+            return f"Error: Invalid regular expression '{pattern}': {e}. Escape special characters to search for them literally."
+        log.info(
+            f"Agent searched for '{pattern}' in session '{self.session_id}': "
+            f"{len(matches)} matches in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        if not matches:
+            return f"No matches found for '{pattern}'" + (f" in files matching '{path_glob}'." if path_glob else ".")
+
+        blocks: List[str] = []
+        for match in matches:
+            first = match.line_number - len(match.before)
+            lines = [f"{match.path}-{first + i}- {_truncate(line)}" for i, line in enumerate(match.before)]
+            lines.append(f"{match.path}:{match.line_number}: {_truncate(match.line)}")
+            lines.extend(f"{match.path}-{match.line_number + 1 + i}- {_truncate(line)}" for i, line in enumerate(match.after))
+            blocks.append("\n".join(lines))
+        output = ("\n--\n" if context_lines else "\n").join(blocks)
+        if len(matches) == max_results:
+            output += f"\n\n(Stopped after {max_results} matches; narrow the pattern or path_glob to see others.)"
+        return output
+
+    async def _arun(
+        self,
+        pattern: str,
+        path_glob: Optional[str] = None,
+        ignore_case: bool = False,
+        max_results: int = 30,
+        context_lines: int = 0,
+    ) -> str:
+        """Asynchronous version of the tool's execution, run in a worker thread so scanning files never blocks the event loop."""
+        return await asyncio.to_thread(self._run, pattern, path_glob, ignore_case, max_results, context_lines)
+
+
+def _truncate(line: str) -> str:
+    return line if len(line) <= MAX_LINE_LENGTH else line[:MAX_LINE_LENGTH] + "..."
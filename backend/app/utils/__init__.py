@@ -1,3 +1,18 @@
 from .logging_config import setup_logging
-from .file_handler import extract_zip, load_and_chunk_codebase, clone_github_repo
-from .vector_store_manager import VectorStoreManager
\ No newline at end of file
+from .file_handler import (
+    extract_zip, extract_zip_stream, load_and_chunk_codebase, iter_codebase_chunks,
+    clone_github_repo, ArchiveLimitError
+)
+from .file_filters import FileFilter, FilterStats
+from .vector_store_manager import VectorStoreManager
+from .vector_store_cache import VectorStoreCache, vector_store_cache
+from .flat_vector_store import FlatVectorStore, FlatIndexWriter
+from .lexical_index import LexicalIndex, load_lexical_index
+from .hybrid_retriever import HybridRetriever
+from .context_packer import PackedContext, pack_context
+from .symbol_index import Symbol, SymbolIndex, extract_symbols, load_symbol_index
+from .trigram_index import TrigramIndex, load_trigram_index
+from .session_indexes import SessionIndexes
+from .file_manifest import FileManifest, load_file_manifest
+from .ingestion_jobs import IngestionJob, job_manager
+from .session_registry import SessionRegistry, SessionQuotaError, session_registry
@@ -0,0 +1,197 @@
+import os
+import logging
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from langchain_core.documents import Document
+
+log = logging.getLogger(__name__)
+
+# Maximum number of tokens of retrieved code handed to an agent per query
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+# Tokenizer used to measure the budget; counts are estimated from the text length if it cannot be loaded
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+# A span is cut to fit the remaining budget only if at least this many tokens of it fit
+MIN_PARTIAL_SPAN_TOKENS = 64
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """Returns the number of tokens in `text`, with tiktoken if available and ~4 characters per token otherwise."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(CONTEXT_TOKENIZER)
+                except Exception as e:
+                    # tiktoken downloads its encodings on first use, which fails on offline hosts
+                    log.warning(f"Could not load the '{CONTEXT_TOKENIZER}' tokenizer, estimating token counts instead: {e}")
+                    _encoding_failed = True
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+class Span:
+    """A contiguous range of one file, merged from one or more retrieved chunks."""
+    def __init__(self, source: str, text: str, rank: int, start_index: Optional[int], start_line: Optional[int], end_line: Optional[int]):
+        self.source = source
+        self.text = text
+        self.rank = rank
+        self.start_index = start_index
+        self.start_line = start_line
+        self.end_line = end_line
+
+    @property
+    def end_index(self) -> int:
+        return self.start_index + len(self.text)
+
+    @property
+    def header(self) -> str:
+        if self.start_line is None:
+            return f"### {self.source}"
+        return f"### {self.source} (lines {self.start_line}-{self.end_line})"
+
+    def render(self) -> str:
+        return f"{self.header}\n```\n{self.text}\n```"
+
+
+class PackedContext(NamedTuple):
+    """The packed context and how many tokens packing saved compared to the raw chunks."""
+    text: str
+    spans: List[Span]
+    chunks: int
+    raw_tokens: int
+    packed_tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.raw_tokens - self.packed_tokens
+
+
+class _PackingStats:
+    """Process-wide totals of the packing savings, for the admin endpoint."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {"queries": 0, "chunks": 0, "spans": 0, "raw_tokens": 0, "packed_tokens": 0}
+
+    def record(self, packed: PackedContext) -> None:
+        with self._lock:
+            self._totals["queries"] += 1
+            self._totals["chunks"] += packed.chunks
+            self._totals["spans"] += len(packed.spans)
+            self._totals["raw_tokens"] += packed.raw_tokens
+            self._totals["packed_tokens"] += packed.packed_tokens
+
+    def to_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._totals, "saved_tokens": self._totals["raw_tokens"] - self._totals["packed_tokens"]}
+
+
+packing_stats = _PackingStats()
+
+
+def _merge_spans(documents: Sequence[Document]) -> List[Span]:
+    """
+    Turns ranked chunks into spans: duplicate chunks are dropped, and chunks of the same
+    file that overlap or touch (by character offset) are merged into one span, whose rank
+    is that of its best chunk.
+    """
+    by_source: Dict[str, List[Span]] = {}
+    seen = set()
+    for rank, document in enumerate(documents):
+        source = document.metadata.get("source", "unknown")
+        if (source, document.page_content) in seen:
+            continue
+        seen.add((source, document.page_content))
+        by_source.setdefault(source, []).append(Span(
+            source, document.page_content, rank,
+            document.metadata.get("start_index"), document.metadata.get("start_line"), document.metadata.get("end_line"),
+        ))
+
+    spans: List[Span] = []
+    for source, chunks in by_source.items():
+        located = sorted((span for span in chunks if span.start_index is not None), key=lambda span: span.start_index)
+        merged: List[Span] = []
+        for span in located:
+            last = merged[-1] if merged else None
+            # Chunks were stripped of surrounding whitespace when split, so a one character gap still counts as touching
+            if last is not None and span.start_index <= last.end_index + 1:
+                if span.end_index > last.end_index:
+                    separator = "\n" if span.start_index > last.end_index else ""
+                    last.text += separator + span.text[max(0, last.end_index - span.start_index):]
+                    last.end_line = span.end_line
+                last.rank = min(last.rank, span.rank)
+            else:
+                merged.append(span)
+        spans.extend(merged)
+        # Chunks from sessions indexed before offsets were stored cannot be merged, only deduplicated
+        spans.extend(span for span in chunks if span.start_index is None)
+    return spans
+
+
+def _prefix(span: Span, line_count: int) -> Span:
+    """Returns the span cut to its first `line_count` lines."""
+    end_line = span.start_line + line_count - 1 if span.start_line is not None else None
+    return Span(span.source, "\n".join(span.text.split("\n")[:line_count]), span.rank, span.start_index, span.start_line, end_line)
+
+
+def _truncate(span: Span, budget: int) -> Optional[Span]:
+    """Returns the longest prefix of a span, in whole lines, that fits in `budget` tokens with its header."""
+    low, high = 0, span.text.count("\n") + 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(_prefix(span, middle).render()) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return _prefix(span, low) if low else None
+
+
+def pack_context(documents: Sequence[Document], budget: int = CONTEXT_TOKEN_BUDGET) -> PackedContext:
+    """
+    Packs retrieved chunks into a compact context for the agent. Overlapping and adjacent
+    chunks of a file are merged into line-ranged spans; the spans are taken in order of
+    relevance until `budget` tokens are used (cutting the last one to fit), and rendered
+    grouped by file, most relevant file first, in line order, each under a header with its
+    path and line range.
+
+    Args:
+        documents (Sequence[Document]): The retrieved chunks, most relevant first.
+        budget (int): The maximum number of tokens of the packed context (0 disables the budget).
+
+    Returns:
+        PackedContext: The packed text and its token accounting against the raw chunks.
+    """
+    raw_tokens = sum(count_tokens(document.page_content) for document in documents)
+    selected: List[Span] = []
+    remaining = budget
+    for span in sorted(_merge_spans(documents), key=lambda span: span.rank):
+        if budget <= 0:
+            selected.append(span)
+            continue
+        tokens = count_tokens(span.render())
+        if tokens > remaining:
+            span = _truncate(span, remaining) if remaining >= MIN_PARTIAL_SPAN_TOKENS else None
+            if span is None:
+                continue
+            tokens = count_tokens(span.render())
+        selected.append(span)
+        remaining -= tokens
+
+    file_rank = {}
+    for span in selected:
+        file_rank[span.source] = min(file_rank.get(span.source, span.rank), span.rank)
+    selected.sort(key=lambda span: (file_rank[span.source], span.source, span.start_line or 0))
+    text = "\n\n".join(span.render() for span in selected)
+    packed = PackedContext(text, selected, len(documents), raw_tokens, count_tokens(text))
+    packing_stats.record(packed)
+    log.info(
+        f"Packed {packed.chunks} chunks into {len(selected)} spans: {packed.raw_tokens} -> {packed.packed_tokens} tokens "
+        f"({packed.saved_tokens} saved)."
+    )
+    return packed
@@ -0,0 +1,161 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence
+from langchain_core.embeddings import Embeddings
+
+log = logging.getLogger(__name__)
+
+# Directory holding the embedding cache database, shared by all sessions
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+# Upper bound on the size of the cached vectors; 0 disables the cache
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# When the cache is full, least recently used entries are evicted down to this fraction of the limit
+EVICTION_LOW_WATERMARK = 0.9
+
+def _cache_key(model: str, text: str) -> str:
+    """Content address of a text for a given embedding model."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest() + ":" + model
+
+
+class EmbeddingCache:
+    """
+    A persistent, size-bounded LRU cache of embedding vectors keyed by
+    (embedding model, sha256 of the text). Backed by SQLite so it survives
+    restarts and can be shared by several worker processes.
+    """
+    def __init__(self, cache_dir: str = EMBEDDING_CACHE_DIR, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "embeddings.sqlite3")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        log.info(f"Embedding cache opened at '{self.db_path}' ({self._total_bytes} bytes cached).")
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Returns the cached vector for each text, or None where it is not cached."""
+        keys = [_cache_key(model, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters, so look keys up in slices
+            for i in range(0, len(keys), 500):
+                batch = list(set(keys[i:i + 500]))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for r in results if r is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[List[float]]) -> None:
+        """Stores vectors for the given texts, evicting old entries if the cache grows too large."""
+        now = time.time()
+        rows = {}
+        for text, vector in zip(texts, vectors):
+            blob = array("f", vector).tobytes()
+            rows[_cache_key(model, text)] = (blob, len(blob), now)
+        with self._lock:
+            for key, (blob, size, accessed) in rows.items():
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, blob, size, accessed)
+                )
+                if cursor.rowcount:
+                    self._total_bytes += size
+            self._conn.commit()
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the cache is below its low watermark."""
+        # Another process may share the database, so start from the real size
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        target = self.max_bytes * EVICTION_LOW_WATERMARK
+        evicted = 0
+        while self._total_bytes > target:
+            rows = self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_access LIMIT 1000").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._total_bytes <= target:
+                    break
+                self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._total_bytes -= size
+                evicted += 1
+        self._conn.commit()
+        self.evictions += evicted
+        log.info(f"Embedding cache evicted {evicted} entries, {self._total_bytes} bytes remain.")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "bytes": self._total_bytes, "max_bytes": self.max_bytes,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so that texts already embedded by any session
+    are served from the shared EmbeddingCache instead of the provider.
+    """
+    def __init__(self, underlying: Embeddings, model_name: str, cache: Optional[EmbeddingCache] = None):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache = cache or get_embedding_cache()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached = self.cache.get_many(self.model_name, texts)
+        # Embed each distinct missing text once, even if it occurs several times in the batch
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            vectors = self.underlying.embed_documents(missing)
+            self.cache.put_many(self.model_name, missing, vectors)
+            computed = dict(zip(missing, vectors))
+            cached = [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+        log.info(f"Embedded {len(texts)} texts: {len(texts) - len(missing)} from cache, {len(missing)} from '{self.model_name}'.")
+        return cached
+
+    def embed_query(self, text: str) -> List[float]:
+        # Providers may embed queries differently from documents, so they get their own namespace
+        model = f"{self.model_name}#query"
+        vector = self.cache.get_many(model, [text])[0]
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self.cache.put_many(model, [text], [vector])
+        return vector
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Returns the process-wide embedding cache, opening it on first use."""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
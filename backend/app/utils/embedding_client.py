@@ -0,0 +1,224 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Dict, List, Optional, TypeVar
+from langchain_core.embeddings import Embeddings
+
+log = logging.getLogger(__name__)
+
+# Number of texts sent to the provider in one request
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+# Maximum number of requests in flight for one embed call
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+# Sustained request rate allowed per embedding model, shared by the whole process (0 disables the limit)
+EMBED_RATE_LIMIT_RPS = float(os.getenv("EMBED_RATE_LIMIT_RPS", "10"))
+EMBED_RATE_LIMIT_BURST = int(os.getenv("EMBED_RATE_LIMIT_BURST", "10"))
+# Retries with exponential backoff for rate-limit (429) and server (5xx) errors
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_RETRY_BASE_DELAY = float(os.getenv("EMBED_RETRY_BASE_DELAY", "1.0"))
+EMBED_RETRY_MAX_DELAY = 30.0
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Provider phrases for transient errors, for errors that carry no status code. Bare numbers are not matched:
+# a "500" in a message is as likely a token count or chunk size as a status.
+_RETRYABLE_MESSAGE = re.compile(
+    r"resource.?exhausted|unavailable|rate.?limit|quota|deadline exceeded|too many requests", re.IGNORECASE
+)
+
+_T = TypeVar("_T")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Decides whether a provider error is transient. Providers surface HTTP status codes in
+    different attributes, on the error, its response or the error it wraps (the Gemini
+    client re-raises API errors with the original as the cause), so all of them are checked.
+    The message is only searched for the providers' phrases for transient errors.
+    """
+    errors = [error]
+    if error.__cause__ is not None:
+        errors.append(error.__cause__)
+    for candidate in errors + [getattr(e, "response", None) for e in errors]:
+        for attribute in ("status_code", "code", "status"):
+            value = getattr(candidate, attribute, None)
+            if isinstance(value, int) and value in _RETRYABLE_STATUS:
+                return True
+    return bool(_RETRYABLE_MESSAGE.search(str(error)))
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket. Waiting happens with asyncio.sleep outside the lock,
+    so one bucket can be shared by coroutines running on different event loops.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Takes a token, possibly going into debt, and returns how long the caller must wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class EmbeddingMetrics:
+    """Thread-safe throughput, latency and retry counters for an embedding client."""
+    # Only the most recent request latencies are kept for the percentiles
+    MAX_SAMPLES = 10000
+
+    def __init__(self):
+        self.requests = 0
+        self.texts = 0
+        self.retries = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+        self._latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def record_request(self, text_count: int, latency: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.texts += text_count
+            self._latencies.append(latency)
+            if len(self._latencies) > self.MAX_SAMPLES:
+                del self._latencies[:len(self._latencies) - self.MAX_SAMPLES]
+
+    def record_call(self, duration: float) -> None:
+        """Records the wall-clock time of one embed call, which may span many concurrent requests."""
+        with self._lock:
+            self.busy_seconds += duration
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+            def percentile(p: float) -> float:
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else 0.0
+
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "retries": self.retries,
+                "failures": self.failures,
+                "texts_per_second": round(self.texts / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+                "latency_p50_ms": percentile(0.50),
+                "latency_p95_ms": percentile(0.95),
+                "latency_p99_ms": percentile(0.99),
+            }
+
+
+_rate_limiters: Dict[str, TokenBucket] = {}
+_rate_limiters_lock = threading.Lock()
+
+def _get_rate_limiter(model_name: str) -> TokenBucket:
+    """Returns the process-wide token bucket for an embedding model."""
+    with _rate_limiters_lock:
+        if model_name not in _rate_limiters:
+            _rate_limiters[model_name] = TokenBucket(EMBED_RATE_LIMIT_RPS, EMBED_RATE_LIMIT_BURST)
+        return _rate_limiters[model_name]
+
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+def _run_sync(coroutine: Awaitable[_T]) -> _T:
+    """
+    Runs a coroutine to completion from synchronous code. A single background event loop
+    is shared by all clients, so callers in plain threads (LangGraph nodes, the ingestion
+    pipeline) and callers inside a running loop are all supported.
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="embedding-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coroutine, _background_loop).result()
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Wraps an embedding provider: texts are split into batches that are sent over a bounded
+    pool of concurrent requests, paced by a per-model token bucket, and retried with
+    exponential backoff on rate-limit and server errors.
+    """
+    def __init__(
+        self,
+        provider: Embeddings,
+        model_name: str,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_concurrency: int = EMBED_MAX_CONCURRENCY,
+        max_retries: int = EMBED_MAX_RETRIES,
+    ):
+        self.provider = provider
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.rate_limiter = _get_rate_limiter(model_name)
+        self.metrics = EmbeddingMetrics()
+
+    async def _with_retries(self, call, text_count: int):
+        """Runs a blocking provider call in a thread, with rate limiting and retries."""
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(call)
+                self.metrics.record_request(text_count, time.perf_counter() - started)
+                return result
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    self.metrics.record_failure()
+                    raise
+                self.metrics.record_retry()
+                delay = min(EMBED_RETRY_MAX_DELAY, EMBED_RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0)
+                log.warning(f"Embedding request failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._with_retries(lambda: self.provider.embed_documents(batch), len(batch))
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        self.metrics.record_call(time.perf_counter() - started)
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._with_retries(lambda: self.provider.embed_query(text), 1)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return _run_sync(self.aembed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return _run_sync(self.aembed_query(text))
@@ -0,0 +1,109 @@
+import os
+import mmap
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Union
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Maximum number of files kept mapped across all sessions
+FILE_CACHE_SIZE = int(os.getenv("FILE_CACHE_SIZE", "256"))
+
+
+class CachedFile:
+    """
+    A file mapped into memory with the offset of every line, so any line range can be
+    decoded without reading or decoding the rest of the file. Line numbers are 1-based.
+    """
+    def __init__(self, data: Union[mmap.mmap, bytes], mtime_ns: int):
+        self.data = data
+        self.mtime_ns = mtime_ns
+        self.size = len(data)
+        # Offsets of the first byte of every line
+        newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10) if self.size else np.empty(0, dtype=np.int64)
+        self.line_starts = np.concatenate(([0], newlines + 1))
+        if self.size and self.line_starts[-1] == self.size:
+            # A final newline does not start another line
+            self.line_starts = self.line_starts[:-1]
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts) if self.size else 0
+
+    def lines(self, start_line: int, end_line: int) -> List[str]:
+        """Returns lines `start_line` to `end_line` inclusive, clamped to the file."""
+        start_line, end_line = max(1, start_line), min(end_line, self.line_count)
+        if start_line > end_line:
+            return []
+        start = int(self.line_starts[start_line - 1])
+        end = int(self.line_starts[end_line]) if end_line < self.line_count else self.size
+        text = self.data[start:end].decode("utf-8", errors="replace")
+        return [line.rstrip("\r") for line in text.split("\n")[:end_line - start_line + 1]]
+
+    def text(self) -> str:
+        return self.data[:].decode("utf-8", errors="replace")
+
+
+class _Key(NamedTuple):
+    session_id: str
+    path: str
+
+
+class FileContentCache:
+    """
+    An LRU of memory-mapped session files, shared by the file tools so that agents reading
+    the same files in one plan do not go back to disk. Entries are validated against the
+    file's modification time on every lookup and dropped per session when it is deleted.
+    Mappings are released when the last reader drops them, never while one is using them.
+    """
+    def __init__(self, max_entries: int = FILE_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._files: "OrderedDict[_Key, CachedFile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str, full_path: str) -> CachedFile:
+        """
+        Returns the mapped file at `full_path`, mapping it on a miss or when it changed.
+
+        Raises:
+            OSError: If the file cannot be opened, e.g. FileNotFoundError or IsADirectoryError.
+        """
+        key = _Key(session_id, full_path)
+        mtime_ns = os.stat(full_path).st_mtime_ns
+        with self._lock:
+            cached = self._files.get(key)
+            if cached is not None and cached.mtime_ns == mtime_ns:
+                self._files.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        with open(full_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        cached = CachedFile(data, mtime_ns)
+        with self._lock:
+            self._files[key] = cached
+            self._files.move_to_end(key)
+            while len(self._files) > self.max_entries:
+                self._files.popitem(last=False)
+        return cached
+
+    def invalidate_session(self, session_id: str) -> None:
+        """Drops every cached file of a session."""
+        with self._lock:
+            for key in [key for key in self._files if key.session_id == session_id]:
+                del self._files[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of cached files and the hit/miss counters."""
+        with self._lock:
+            return {"cached_files": len(self._files), "hits": self.hits, "misses": self.misses}
+
+
+# Process-wide cache shared by all file tools
+file_cache = FileContentCache()
@@ -0,0 +1,193 @@
+import os
+import re
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Paths that are almost never worth indexing: dependencies, build output, caches and lockfiles.
+# Uses .gitignore syntax; extra patterns can be added with INGEST_IGNORE_PATTERNS (comma-separated).
+DEFAULT_IGNORE_PATTERNS = [
+    ".git/", "node_modules/", "bower_components/", "vendor/", "third_party/",
+    "venv/", ".venv/", "__pycache__/", ".tox/", ".mypy_cache/", ".pytest_cache/",
+    "dist/", "build/", "out/", "target/", "bin/", "obj/", ".next/", ".nuxt/", "coverage/", "htmlcov/",
+    "*.min.js", "*.min.css", "*.bundle.js", "*.chunk.js", "*.map",
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "composer.lock", "Pipfile.lock", "poetry.lock",
+]
+INGEST_IGNORE_PATTERNS = [p.strip() for p in os.getenv("INGEST_IGNORE_PATTERNS", "").split(",") if p.strip()]
+
+# Files larger than this are skipped; data formats get a tighter cap since large ones are rarely code
+INGEST_MAX_FILE_BYTES = int(os.getenv("INGEST_MAX_FILE_BYTES", str(1024 * 1024)))
+INGEST_MAX_DATA_FILE_BYTES = int(os.getenv("INGEST_MAX_DATA_FILE_BYTES", str(256 * 1024)))
+DATA_FILE_EXTENSIONS = (".json", ".yaml", ".yml")
+
+# Content heuristics only look at the start of a file
+SNIFF_BYTES = 8192
+MINIFIED_MAX_LINE_LENGTH = 1000
+MINIFIED_AVG_LINE_LENGTH = 300
+GENERATED_MARKERS = re.compile(
+    r"@generated|do not edit|auto-?generated", re.IGNORECASE
+)
+
+# Reasons reported in the skipped-file statistics
+IGNORED = "ignored"
+GITIGNORED = "gitignored"
+TOO_LARGE = "too_large"
+BINARY = "binary"
+MINIFIED = "minified"
+GENERATED = "generated"
+
+
+class _Rule:
+    """A single compiled .gitignore pattern, relative to the directory that declared it."""
+    def __init__(self, pattern: str, base: str):
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # A pattern with a leading or inner slash is relative to its base; otherwise it matches at any depth
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        self.base = base
+        self.regex = re.compile(("" if anchored else r"(?:.*/)?") + _glob_to_regex(pattern) + r"$")
+
+    def matches(self, relative_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not relative_path.startswith(self.base + "/"):
+                return False
+            relative_path = relative_path[len(self.base) + 1:]
+        return bool(self.regex.match(relative_path))
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translates a .gitignore glob (with ** support) to a regular expression."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += r"(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += r".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += r"[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += r"[^/]"
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+class FilterStats:
+    """Thread-safe counters of the files skipped during ingestion, by reason."""
+    def __init__(self):
+        self.skipped: Counter = Counter()
+        self.skipped_dirs: Counter = Counter()
+        self.skipped_bytes = 0
+        self.examples: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, reason: str, path: str, size: int = 0) -> None:
+        with self._lock:
+            self.skipped[reason] += 1
+            self.skipped_bytes += size
+            examples = self.examples.setdefault(reason, [])
+            if len(examples) < 5:
+                examples.append(path)
+
+    def record_dir(self, reason: str, path: str) -> None:
+        """Records a whole directory that was pruned without looking at the files inside it."""
+        with self._lock:
+            self.skipped_dirs[reason] += 1
+            examples = self.examples.setdefault(reason, [])
+            if len(examples) < 5:
+                examples.append(path + "/")
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "total": sum(self.skipped.values()),
+                "bytes": self.skipped_bytes,
+                "by_reason": dict(self.skipped),
+                "directories": dict(self.skipped_dirs),
+                "examples": {reason: list(paths) for reason, paths in self.examples.items()},
+            }
+
+
+class FileFilter:
+    """
+    Decides which files of a codebase are worth chunking and embedding.
+    Path rules (the built-in ignore list, INGEST_IGNORE_PATTERNS and every .gitignore
+    in the tree) and size caps are checked before a file is read; cheap content
+    heuristics for binary, minified and generated files are checked after.
+    """
+    def __init__(self, extra_patterns: Optional[List[str]] = None):
+        self._rules: List[Tuple[str, _Rule]] = [
+            (IGNORED, _Rule(p, "")) for p in DEFAULT_IGNORE_PATTERNS + INGEST_IGNORE_PATTERNS + (extra_patterns or [])
+        ]
+
+    def add_gitignore(self, content: str, base: str = "") -> None:
+        """Adds the rules of a .gitignore file found in the directory `base` (relative, '/'-separated)."""
+        for line in content.splitlines():
+            line = line.rstrip()
+            if line and not line.startswith("#"):
+                self._rules.append((GITIGNORED, _Rule(line, base)))
+
+    def load_gitignore(self, repo_path: str, relative_dir: str) -> None:
+        """Adds the rules of `<relative_dir>/.gitignore` if the file exists."""
+        gitignore_path = os.path.join(repo_path, relative_dir, ".gitignore")
+        if os.path.isfile(gitignore_path):
+            with open(gitignore_path, "r", encoding="utf-8", errors="ignore") as f:
+                self.add_gitignore(f.read(), _to_posix(relative_dir))
+
+    def path_reason(self, relative_path: str, is_dir: bool = False) -> Optional[str]:
+        """Returns why a path is excluded by the ignore rules, or None if it is included. Last match wins."""
+        relative_path = _to_posix(relative_path)
+        reason = None
+        for rule_reason, rule in self._rules:
+            if rule.matches(relative_path, is_dir):
+                reason = None if rule.negate else rule_reason
+        return reason
+
+    def tree_reason(self, relative_path: str) -> Optional[str]:
+        """
+        Like path_reason, but also checks every parent directory of a file, for callers
+        that see flat paths (such as archive members) instead of walking the tree.
+        """
+        parts = _to_posix(relative_path).split("/")
+        for depth in range(1, len(parts)):
+            reason = self.path_reason("/".join(parts[:depth]), is_dir=True)
+            if reason:
+                return reason
+        return self.path_reason(relative_path)
+
+    def size_reason(self, relative_path: str, size: int) -> Optional[str]:
+        limit = INGEST_MAX_DATA_FILE_BYTES if relative_path.endswith(DATA_FILE_EXTENSIONS) else INGEST_MAX_FILE_BYTES
+        return TOO_LARGE if size > limit else None
+
+    @staticmethod
+    def content_reason(content: str) -> Optional[str]:
+        """Cheap heuristics on the start of a file's content to detect binary, minified or generated files."""
+        head = content[:SNIFF_BYTES]
+        if "\x00" in head:
+            return BINARY
+        lines = head.splitlines() or [""]
+        if max(len(line) for line in lines) > MINIFIED_MAX_LINE_LENGTH and len(head) / len(lines) > MINIFIED_AVG_LINE_LENGTH:
+            return MINIFIED
+        if GENERATED_MARKERS.search("\n".join(lines[:10])):
+            return GENERATED
+        return None
+
+
+def _to_posix(path: str) -> str:
+    path = path.replace(os.sep, "/")
+    return "" if path == "." else path
@@ -1,10 +1,21 @@
 import os
 import zipfile
 import logging
-from typing import List, Optional
+import functools
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, TypeVar
 import git
+import numpy as np
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from app.utils.git_mirror import GIT_CACHE_DIR, checkout_from_mirror, shallow_clone
+from app.utils.file_filters import FileFilter, FilterStats
+from app.utils.symbol_index import FileSymbols, extract_symbols
+from app.utils.trigram_index import file_trigrams
+from app.utils.session_indexes import SessionIndexes
 
 log = logging.getLogger(__name__)
 
@@ -13,6 +24,33 @@ SUPPORTED_EXTENSIONS = [
     ".py", ".java", ".js", ".ts", ".html", ".css", ".md", ".json", ".yaml", ".yml", ".c", ".cpp", ".cs"
 ]
 
+# Number of files each ingestion worker reads and chunks per task
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+# Limits applied to uploaded archives to protect memory and disk from zip bombs
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "100000"))
+ZIP_MAX_TOTAL_BYTES = int(os.getenv("ZIP_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+ZIP_MAX_COMPRESSION_RATIO = int(os.getenv("ZIP_MAX_COMPRESSION_RATIO", "100"))
+ZIP_READ_BLOCK_SIZE = 64 * 1024
+
+# Lazily created per process, so every ingestion worker builds its own splitter once
+_code_splitter = None
+
+class LoadedFile(NamedTuple):
+    """A file read from the codebase together with the chunks it was split into."""
+    path: str
+    chunks: List[Document]
+    # Set instead of chunks when the content heuristics decided the file is not worth indexing
+    skip_reason: Optional[str] = None
+    # Definitions, references and imports, and the content's trigrams, when search indexes are built
+    symbols: Optional[FileSymbols] = None
+    trigrams: Optional[np.ndarray] = None
+
+class ArchiveLimitError(ValueError):
+    """Raised when an uploaded archive exceeds the configured size, member or compression limits."""
+
+_Batch = TypeVar("_Batch")
+
 def extract_zip(zip_path: str, extract_to: str) -> None:
     """
     Extracts the contents of a zip file to a specified directory.
@@ -30,75 +68,323 @@ def extract_zip(zip_path: str, extract_to: str) -> None:
         log.error(f"Failed to extract zip file: {e}", exc_info=True)
         raise
 
-def load_and_chunk_codebase(repo_path: str) -> List[Document]:
+def _is_supported(path: str) -> bool:
+    return any(path.endswith(ext) for ext in SUPPORTED_EXTENSIONS)
+
+def _read_zip_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, dest_path: str, budget: int) -> int:
+    """
+    Streams a single member out of an archive into `dest_path`, enforcing the remaining
+    size budget and the compression ratio on the bytes actually produced, since the
+    sizes declared in the archive headers cannot be trusted. Returns the bytes written.
+    """
+    written = 0
+    max_size = min(budget, max(info.compress_size, 1) * ZIP_MAX_COMPRESSION_RATIO)
+    with zip_ref.open(info) as src, open(dest_path, "wb") as dest:
+        while block := src.read(ZIP_READ_BLOCK_SIZE):
+            written += len(block)
+            if written > max_size:
+                if written > budget:
+                    raise ArchiveLimitError(f"Archive exceeds the maximum uncompressed size of {ZIP_MAX_TOTAL_BYTES} bytes.")
+                raise ArchiveLimitError(f"Member '{info.filename}' exceeds the maximum compression ratio of {ZIP_MAX_COMPRESSION_RATIO}.")
+            dest.write(block)
+    return written
+
+def extract_zip_stream(fileobj, extract_to: str, stats: Optional[FilterStats] = None) -> List[str]:
+    """
+    Extracts an uploaded archive in a single streaming pass, skipping the members excluded
+    by the ignore rules, so a ZIP session has the same files on disk as a cloned one:
+    the file tree, the file manifest and the agent tools see README, configuration and
+    other unsupported files too. Which files are indexed is decided afterwards, by
+    iter_codebase_chunks over `extract_to`, and no file content is kept in memory.
+
+    Args:
+        fileobj: A seekable binary file object containing the zip archive.
+        extract_to (str): The directory where the files should be written.
+        stats (Optional[FilterStats]): Collects statistics about supported files excluded by the ignore rules.
+
+    Returns:
+        List[str]: The relative path of each extracted file, sorted.
+
+    Raises:
+        ArchiveLimitError: If the archive exceeds the member count, total size or compression ratio limits.
+    """
+    log.info(f"Streaming files from uploaded archive into '{extract_to}'...")
+    root = os.path.abspath(extract_to)
+    stats = stats or FilterStats()
+    file_filter = FileFilter()
+    extracted = []
+    total_bytes = 0
+    with zipfile.ZipFile(fileobj, 'r') as zip_ref:
+        members = zip_ref.infolist()
+        if len(members) > ZIP_MAX_MEMBERS:
+            raise ArchiveLimitError(f"Archive has {len(members)} members, more than the limit of {ZIP_MAX_MEMBERS}.")
+        # Load every .gitignore first, so the rules apply to members that precede them in the archive
+        for info in members:
+            if os.path.basename(info.filename) == ".gitignore" and info.file_size <= ZIP_READ_BLOCK_SIZE:
+                gitignore = zip_ref.read(info).decode("utf-8", errors="ignore")
+                file_filter.add_gitignore(gitignore, os.path.dirname(info.filename).strip("/"))
+        for info in sorted(members, key=lambda m: m.filename):
+            if info.is_dir():
+                continue
+            reason = file_filter.tree_reason(info.filename)
+            if reason:
+                if _is_supported(info.filename):
+                    stats.record(reason, info.filename, info.file_size)
+                continue
+            # Security: never write outside the session's directory
+            dest_path = os.path.abspath(os.path.join(root, info.filename))
+            if not dest_path.startswith(root + os.sep):
+                log.warning(f"Skipping archive member outside the extraction directory: {info.filename}")
+                continue
+            if info.file_size > ZIP_MAX_COMPRESSION_RATIO * max(info.compress_size, 1):
+                raise ArchiveLimitError(f"Member '{info.filename}' exceeds the maximum compression ratio of {ZIP_MAX_COMPRESSION_RATIO}.")
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            total_bytes += _read_zip_member(zip_ref, info, dest_path, ZIP_MAX_TOTAL_BYTES - total_bytes)
+            extracted.append(os.path.relpath(dest_path, root))
+    log.info(f"Extracted {len(extracted)} files ({total_bytes} bytes) from the archive. Skipped: {stats.to_dict()}")
+    return extracted
+
+def _get_worker_count(workers: Optional[int] = None) -> int:
+    """Resolves the number of ingestion worker processes from the argument or the environment."""
+    if workers is None:
+        workers = int(os.getenv("INGEST_WORKERS", "0")) or os.cpu_count() or 1
+    return max(1, workers)
+
+def _get_code_splitter() -> RecursiveCharacterTextSplitter:
+    """Returns the text splitter for code, creating it once per process."""
+    global _code_splitter
+    if _code_splitter is None:
+        _code_splitter = RecursiveCharacterTextSplitter.from_language(
+            language="python", # A generic choice, adaptable for many languages
+            chunk_size=2000,
+            chunk_overlap=200,
+            # The character offset of each chunk locates it in its file, see _add_line_ranges
+            add_start_index=True
+        )
+    return _code_splitter
+
+def _discover_files(repo_path: str, stats: FilterStats) -> List[str]:
+    """
+    Walks a directory and returns the relative paths of all supported code files that pass
+    the ignore rules and size caps. Ignored directories are pruned without being walked.
+    Directories and files are visited in sorted order so the result is deterministic.
+    """
+    file_filter = FileFilter()
+    relative_paths = []
+    for root, dirs, files in os.walk(repo_path):
+        relative_root = os.path.relpath(root, repo_path)
+        file_filter.load_gitignore(repo_path, relative_root)
+        kept_dirs = []
+        for directory in sorted(dirs):
+            relative_dir = os.path.normpath(os.path.join(relative_root, directory))
+            reason = file_filter.path_reason(relative_dir, is_dir=True)
+            if reason:
+                stats.record_dir(reason, relative_dir)
+            else:
+                kept_dirs.append(directory)
+        dirs[:] = kept_dirs
+        for file in sorted(files):
+            if not _is_supported(file):
+                continue
+            relative_path = os.path.normpath(os.path.join(relative_root, file))
+            reason = file_filter.path_reason(relative_path)
+            if not reason:
+                size = os.path.getsize(os.path.join(root, file))
+                reason = file_filter.size_reason(relative_path, size)
+            if reason:
+                stats.record(reason, relative_path)
+                continue
+            relative_paths.append(relative_path)
+    return relative_paths
+
+def _split_file(relative_path: str, content: str, with_indexes: bool = False) -> LoadedFile:
+    """Splits the content of a single file into chunks, unless it looks binary, minified or generated."""
+    reason = FileFilter.content_reason(content)
+    if reason:
+        return LoadedFile(path=relative_path, chunks=[], skip_reason=reason)
+    # We store the relative path in the metadata for easy identification
+    doc = Document(page_content=content, metadata={"source": relative_path})
+    chunks = _add_line_ranges(content, _get_code_splitter().split_documents([doc]))
+    if not with_indexes:
+        return LoadedFile(path=relative_path, chunks=chunks)
+    return LoadedFile(
+        path=relative_path, chunks=chunks, symbols=extract_symbols(relative_path, content), trigrams=file_trigrams(content)
+    )
+
+def _add_line_ranges(content: str, chunks: List[Document]) -> List[Document]:
+    """
+    Adds the 1-based `start_line` and `end_line` of every chunk to its metadata, next to the
+    `start_index` character offset set by the splitter, so retrieved chunks can be cited by
+    line and overlapping chunks of a file can be merged.
+    """
+    # Chunks come in file order, so lines are counted incrementally from the previous chunk
+    position, line = 0, 1
+    for chunk in chunks:
+        start = chunk.metadata.get("start_index", -1)
+        if start < position:
+            continue
+        line += content.count("\n", position, start)
+        position = start
+        chunk.metadata["start_line"] = line
+        chunk.metadata["end_line"] = line + chunk.page_content.count("\n")
+    return chunks
+
+def _load_file_batch(repo_path: str, with_indexes: bool, relative_paths: List[str]) -> List[LoadedFile]:
+    """
+    Reads and chunks a batch of files. This runs inside the ingestion worker processes,
+    so it must stay a module-level function.
+    """
+    loaded = []
+    for relative_path in relative_paths:
+        file_path = os.path.join(repo_path, relative_path)
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+        except Exception as e:
+            log.warning(f"Could not read file {file_path}: {e}")
+            continue
+        loaded.append(_split_file(relative_path, content, with_indexes))
+    return loaded
+
+def _map_batches(
+    func: Callable[[_Batch], List[LoadedFile]], batches: List[_Batch], workers: int
+) -> Iterator[LoadedFile]:
+    """
+    Runs `func` over every batch on a pool of worker processes and yields the results in
+    batch order, keeping only a bounded number of batches in flight.
+    """
+    # Small inputs are not worth the cost of starting worker processes
+    if workers == 1 or len(batches) <= 1:
+        for batch in batches:
+            yield from func(batch)
+        return
+
+    # Spawned (not forked) workers are safe to start from a threaded server process
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        pending = deque()
+        batch_iter = iter(batches)
+        for batch in itertools.islice(batch_iter, workers * 2):
+            pending.append(executor.submit(func, batch))
+        while pending:
+            # Results are consumed in submission order, which keeps the output deterministic
+            loaded = pending.popleft().result()
+            next_batch = next(batch_iter, None)
+            if next_batch is not None:
+                pending.append(executor.submit(func, next_batch))
+            yield from loaded
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _make_batches(items: List[_Batch]) -> List[List[_Batch]]:
+    return [items[i:i + INGEST_BATCH_SIZE] for i in range(0, len(items), INGEST_BATCH_SIZE)]
+
+def iter_codebase_files(
+    repo_path: str, workers: Optional[int] = None, stats: Optional[FilterStats] = None, with_indexes: bool = False
+) -> Iterator[LoadedFile]:
+    """
+    Reads and chunks every supported file under a directory, sharding the work across a
+    pool of worker processes. Files are yielded in the same sorted order regardless of
+    the number of workers, and only a bounded number of batches is kept in flight.
+
+    Args:
+        repo_path (str): The path to the extracted codebase directory.
+        workers (Optional[int]): Number of worker processes. Defaults to INGEST_WORKERS or the CPU count.
+        stats (Optional[FilterStats]): Collects statistics about files excluded by path or size.
+        with_indexes (bool): Also extract what the search indexes need: symbols and trigrams.
+
+    Yields:
+        LoadedFile: The relative path of each file together with its chunks.
+    """
+    relative_paths = _discover_files(repo_path, stats or FilterStats())
+    workers = _get_worker_count(workers)
+    batches = _make_batches(relative_paths)
+    log.info(f"Found {len(relative_paths)} supported files in '{repo_path}' ({len(batches)} batches, {workers} workers).")
+    yield from _map_batches(functools.partial(_load_file_batch, repo_path, with_indexes), batches, workers)
+
+def _flatten_chunks(
+    loaded_files: Iterable[LoadedFile], stats: FilterStats, indexes: Optional[SessionIndexes] = None
+) -> Iterator[Document]:
+    """Yields the chunks of each loaded file in order, feeds the search indexes and logs the totals."""
+    file_count = 0
+    chunk_count = 0
+    for loaded_file in loaded_files:
+        if loaded_file.skip_reason:
+            stats.record(loaded_file.skip_reason, loaded_file.path)
+            continue
+        file_count += 1
+        chunk_count += len(loaded_file.chunks)
+        if indexes is not None and loaded_file.symbols is not None:
+            indexes.add_file(loaded_file.path, loaded_file.symbols, loaded_file.trigrams)
+        log.debug(f"Loaded file: {loaded_file.path}")
+        yield from loaded_file.chunks
+    log.info(f"Finished chunking. Total documents: {file_count}, Total chunks: {chunk_count}, Skipped: {stats.to_dict()}")
+
+def iter_codebase_chunks(
+    repo_path: str,
+    workers: Optional[int] = None,
+    stats: Optional[FilterStats] = None,
+    indexes: Optional[SessionIndexes] = None,
+) -> Iterator[Document]:
+    """
+    Walks through a directory and lazily yields the chunks of every supported code file
+    that is not excluded by the ignore rules, size caps or content heuristics.
+
+    Args:
+        repo_path (str): The path to the extracted codebase directory.
+        workers (Optional[int]): Number of worker processes. Defaults to INGEST_WORKERS or the CPU count.
+        stats (Optional[FilterStats]): Collects statistics about skipped files.
+        indexes (Optional[SessionIndexes]): Filled with the symbols and trigrams of every indexed file.
+
+    Yields:
+        Document: Each chunk of code, in deterministic file order.
+    """
+    log.info(f"Loading and chunking codebase from path: {repo_path}")
+    stats = stats or FilterStats()
+    loaded_files = iter_codebase_files(repo_path, workers=workers, stats=stats, with_indexes=indexes is not None)
+    yield from _flatten_chunks(loaded_files, stats, indexes)
+
+def load_and_chunk_codebase(repo_path: str, workers: Optional[int] = None) -> List[Document]:
     """
     Walks through a directory, loads supported code files, and splits them into chunks.
 
     Args:
         repo_path (str): The path to the extracted codebase directory.
+        workers (Optional[int]): Number of worker processes. Defaults to INGEST_WORKERS or the CPU count.
 
     Returns:
         List[Document]: A list of Document objects, each representing a chunk of code.
     """
-    log.info(f"Loading and chunking codebase from path: {repo_path}")
-    documents = []
-    
-    for root, _, files in os.walk(repo_path):
-        for file in files:
-            if any(file.endswith(ext) for ext in SUPPORTED_EXTENSIONS):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    # Create a single document for the whole file content
-                    # We store the relative path in the metadata for easy identification
-                    relative_path = os.path.relpath(file_path, repo_path)
-                    doc = Document(page_content=content, metadata={"source": relative_path})
-                    documents.append(doc)
-                    log.debug(f"Loaded file: {relative_path}")
-                except Exception as e:
-                    log.warning(f"Could not read file {file_path}: {e}")
-
-    # Initialize a text splitter for code
-    code_splitter = RecursiveCharacterTextSplitter.from_language(
-        language="python", # A generic choice, adaptable for many languages
-        chunk_size=2000,
-        chunk_overlap=200
-    )
-    
-    chunked_documents = code_splitter.split_documents(documents)
-    log.info(f"Finished chunking. Total documents: {len(documents)}, Total chunks: {len(chunked_documents)}")
-    
-    return chunked_documents
+    return list(iter_codebase_chunks(repo_path, workers=workers))
 
-def clone_github_repo(repo_url: str, clone_to: str, token: Optional[str] = None) -> None:
+def clone_github_repo(repo_url: str, clone_to: str, token: Optional[str] = None, ref: Optional[str] = None) -> None:
     """
     Clones a GitHub repository to a specified local path.
     If a token is provided, it handles private repositories.
 
+    Only the requested commit is fetched (shallow, single-branch, blob-filtered). When
+    GIT_CACHE_DIR is set, the checkout is served from a local bare mirror of the
+    repository, so repeat sessions only fetch what changed upstream.
+
     Args:
         repo_url (str): The standard URL of the GitHub repository.
         clone_to (str): The local directory to clone the repository into.
         token (Optional[str]): A GitHub Personal Access Token for private repos.
+        ref (Optional[str]): A branch, tag or commit SHA. Defaults to the default branch.
     """
-    clone_url = repo_url
-    
     if token:
         log.info(f"Cloning private GitHub repository using a token...")
-        # Construct the authenticated URL: https://<token>@github.com/user/repo.git
-        # This is a secure way to pass the token for a single git operation.
-        if "github.com" in repo_url:
-            # Safely split the URL to inject the token
-            url_parts = repo_url.split("github.com/")
-            clone_url = f"{url_parts[0]}{token}@github.com/{url_parts[1]}"
-        else:
+        # The token is sent as an HTTP header scoped to github.com, never embedded in the URL
+        if "github.com" not in repo_url:
             raise ValueError("The provided URL does not appear to be a standard GitHub URL.")
     else:
         log.info(f"Cloning public GitHub repository from '{repo_url}'...")
 
     try:
-        git.Repo.clone_from(clone_url, clone_to)
+        if GIT_CACHE_DIR:
+            checkout_from_mirror(repo_url, clone_to, token=token, ref=ref)
+        else:
+            shallow_clone(repo_url, clone_to, token=token, ref=ref)
         log.info("Successfully cloned repository.")
     except git.exc.GitCommandError as e:
         log.error(f"Failed to clone repository: {e}", exc_info=True)
@@ -107,7 +393,9 @@ def clone_github_repo(repo_url: str, clone_to: str, token: Optional[str] = None)
              raise RuntimeError(f"Authentication failed. Please ensure your Personal Access Token is correct and has 'repo' access.")
         if "not found" in error_message:
              raise RuntimeError(f"Repository not found. Please check the URL and your token's permissions.")
+        if ref and "couldn't find remote ref" in error_message:
+             raise RuntimeError(f"Branch, tag or commit '{ref}' was not found in the repository.")
         raise RuntimeError(f"Failed to clone repository. Please check the URL and that it's a valid repository.")
     except Exception as e:
         log.error(f"An unexpected error occurred during cloning: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
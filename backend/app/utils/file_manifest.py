@@ -0,0 +1,150 @@
+import os
+import bisect
+import json
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.utils.index_cache import load_cached
+from app.utils.trigram_index import glob_match
+
+log = logging.getLogger(__name__)
+
+# File name of the manifest inside a session's vector store directory
+FILE_MANIFEST_FILE = "file_manifest.json"
+
+# Language of a file by extension, as reported by list_files
+LANGUAGES = {
+    ".py": "python", ".pyi": "python", ".ipynb": "jupyter",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".java": "java", ".kt": "kotlin", ".scala": "scala", ".go": "go", ".rs": "rust", ".rb": "ruby", ".php": "php",
+    ".c": "c", ".h": "c", ".cpp": "cpp", ".cc": "cpp", ".hpp": "cpp", ".cs": "csharp", ".swift": "swift",
+    ".html": "html", ".css": "css", ".scss": "scss", ".vue": "vue", ".svelte": "svelte",
+    ".md": "markdown", ".rst": "rst", ".txt": "text",
+    ".json": "json", ".yaml": "yaml", ".yml": "yaml", ".toml": "toml", ".ini": "ini", ".cfg": "ini", ".xml": "xml",
+    ".sh": "shell", ".bash": "shell", ".sql": "sql", ".dockerfile": "docker",
+}
+_LANGUAGES_BY_NAME = {"Dockerfile": "docker", "Makefile": "make"}
+
+
+def language_of(path: str) -> str:
+    """Returns the language of a file from its name, or an empty string if it is not recognised."""
+    name = os.path.basename(path)
+    return _LANGUAGES_BY_NAME.get(name) or LANGUAGES.get(os.path.splitext(name)[1].lower(), "")
+
+
+class ManifestEntry(NamedTuple):
+    """One file of a session: its '/'-separated path relative to the code root, size in bytes and language."""
+    path: str
+    size: int
+    language: str
+
+
+class Listing(NamedTuple):
+    """The result of listing a directory: matched files and the directories summarised beyond the depth limit."""
+    files: List[ManifestEntry]
+    directories: List[Tuple[str, int, int]]
+
+
+class FileManifest:
+    """
+    Every file of a session's code, sorted by path, with its size and language. It is
+    built once at ingest and kept in memory, so a whole subtree can be listed, filtered
+    by glob and summarised without touching the disk: the files under a directory are a
+    contiguous range of the sorted paths.
+    """
+    def __init__(self, entries: List[ManifestEntry]):
+        self.entries = sorted(entries)
+        self._paths = [entry.path for entry in self.entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def build(cls, root: str) -> "FileManifest":
+        """
+        Walks a session's code directory. Git metadata is left out, both the `.git` directory of a
+        clone and the `.git` file that points a mirror worktree at its repository; every other
+        file is listed, indexed or not.
+        """
+        entries: List[ManifestEntry] = []
+        for current, dirs, files in os.walk(root):
+            relative_root = os.path.relpath(current, root)
+            dirs[:] = [d for d in dirs if d != ".git"]
+            for name in files:
+                if name == ".git":
+                    continue
+                full_path = os.path.join(current, name)
+                try:
+                    size = os.path.getsize(full_path)
+                except OSError:
+                    continue
+                path = os.path.normpath(os.path.join(relative_root, name)).replace(os.sep, "/")
+                entries.append(ManifestEntry(path, size, language_of(name)))
+        return cls(entries)
+
+    def is_dir(self, directory: str) -> bool:
+        """Returns True if the manifest has files under a directory ('' or '.' is the root)."""
+        start, end = self._range(directory)
+        return end > start
+
+    def list(self, directory: str = "", depth: Optional[int] = 1, glob: Optional[str] = None) -> Listing:
+        """
+        Lists the files under a directory.
+
+        Args:
+            directory (str): The directory to list, relative to the code root.
+            depth (Optional[int]): How many levels to descend (1 lists only the directory itself);
+                deeper directories are summarised with their file count and size. None is unlimited.
+            glob (Optional[str]): Only list files whose path relative to `directory` matches this glob;
+                matching files are listed at any depth.
+        """
+        prefix = _prefix(directory)
+        start, end = self._range(directory)
+        files: List[ManifestEntry] = []
+        summarised: Dict[str, List[int]] = {}
+        for entry in self.entries[start:end]:
+            relative = entry.path[len(prefix):]
+            if glob is not None:
+                if glob_match(relative, glob):
+                    files.append(entry)
+                continue
+            parts = relative.split("/")
+            if depth is None or len(parts) <= depth:
+                files.append(entry)
+            else:
+                summary = summarised.setdefault(prefix + "/".join(parts[:depth]), [0, 0])
+                summary[0] += 1
+                summary[1] += entry.size
+        return Listing(files, [(path, count, size) for path, (count, size) in summarised.items()])
+
+    def _range(self, directory: str) -> Tuple[int, int]:
+        prefix = _prefix(directory)
+        if not prefix:
+            return 0, len(self._paths)
+        # Every path under the directory sorts between "dir/" and "dir/" followed by the highest character
+        return bisect.bisect_left(self._paths, prefix), bisect.bisect_left(self._paths, prefix + "\U0010ffff")
+
+    def save(self, directory: str) -> str:
+        """Writes the manifest into a session directory and returns the file path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, FILE_MANIFEST_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"files": [list(entry) for entry in self.entries]}, f, separators=(",", ":"))
+        log.info(f"Saved file manifest with {len(self.entries)} files to '{path}'.")
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "FileManifest":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls([ManifestEntry(*values) for values in json.load(f)["files"]])
+
+
+def _prefix(directory: str) -> str:
+    directory = directory.replace("\\", "/").strip("/")
+    directory = os.path.normpath(directory).replace(os.sep, "/") if directory else ""
+    return "" if directory in ("", ".") else directory + "/"
+
+
+def load_file_manifest(directory: str) -> Optional[FileManifest]:
+    """Returns the file manifest of a session directory, or None for sessions indexed before manifests existed."""
+    return load_cached(os.path.join(directory, FILE_MANIFEST_FILE), FileManifest.load)
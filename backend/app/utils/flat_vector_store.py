@@ -0,0 +1,211 @@
+import os
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+log = logging.getLogger(__name__)
+
+# Directory of the flat index inside a session's vector store directory
+FLAT_INDEX_DIR = "flat_index"
+# Storage type of the vectors: float16 halves the size of float32 with no visible loss in ranking,
+# int8 quarters it using one scale per vector
+FLAT_INDEX_DTYPE = os.getenv("FLAT_INDEX_DTYPE", "float16")
+# Rows scored per block, which bounds the float32 working memory of a search
+SEARCH_BLOCK_ROWS = 65536
+# Indexes whose float32 form fits in this many bytes are decoded once, on their first search,
+# instead of on every search; converting from float16/int8 costs ~10x more than the dot products
+FLAT_INDEX_DECODE_MAX_BYTES = int(os.getenv("FLAT_INDEX_DECODE_MAX_BYTES", str(64 * 1024 ** 2)))
+
+_DTYPES = {"float16": np.float16, "int8": np.int8}
+_READ_ONLY_MESSAGE = "FlatVectorStore is read-only; build it with FlatIndexWriter"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class FlatIndexWriter:
+    """
+    Appends embedded chunks to a flat index: L2-normalised vectors in a raw binary file,
+    documents and metadata as JSON lines, and the byte offset of every line so single
+    documents can be read back without loading the file. meta.json is written last and
+    marks the index as complete.
+    """
+    def __init__(self, directory: str, dtype: str = FLAT_INDEX_DTYPE):
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unsupported FLAT_INDEX_DTYPE '{dtype}'. Use one of: {', '.join(_DTYPES)}.")
+        self.directory = os.path.join(directory, FLAT_INDEX_DIR)
+        os.makedirs(self.directory, exist_ok=True)
+        self.dtype = dtype
+        self.dim: Optional[int] = None
+        self.ids: List[str] = []
+        self._offsets: List[int] = []
+        self._vectors = open(os.path.join(self.directory, "vectors.bin"), "wb")
+        self._scales = open(os.path.join(self.directory, "scales.bin"), "wb") if dtype == "int8" else None
+        self._documents = open(os.path.join(self.directory, "documents.jsonl"), "wb")
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[dict], embeddings: Sequence[Sequence[float]]) -> None:
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension changed from {self.dim} to {vectors.shape[1]}.")
+
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._vectors.write(np.round(vectors / scales[:, None]).astype(np.int8).tobytes())
+            self._scales.write(scales.astype(np.float32).tobytes())
+        else:
+            self._vectors.write(vectors.astype(np.float16).tobytes())
+
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            self._offsets.append(self._documents.tell())
+            self._documents.write(json.dumps({"text": text, "metadata": metadata}).encode("utf-8") + b"\n")
+        self.ids.extend(ids)
+
+    def close(self) -> None:
+        """Flushes everything and writes the index metadata."""
+        for f in (self._vectors, self._scales, self._documents):
+            if f:
+                f.close()
+        np.save(os.path.join(self.directory, "offsets.npy"), np.asarray(self._offsets, dtype=np.int64))
+        with open(os.path.join(self.directory, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump(self.ids, f)
+        with open(os.path.join(self.directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"count": len(self.ids), "dim": self.dim or 0, "dtype": self.dtype}, f)
+        log.info(f"Wrote flat index with {len(self.ids)} vectors ({self.dtype}) to '{self.directory}'.")
+
+    def abort(self) -> None:
+        for f in (self._vectors, self._scales, self._documents):
+            if f:
+                f.close()
+
+
+class FlatVectorStore(VectorStore):
+    """
+    A read-only vector store over a flat index written by FlatIndexWriter. Vectors are
+    memory-mapped, so opening the store reads almost nothing, and search is an exact,
+    vectorised brute-force cosine top-k, which for a few thousand chunks is faster than
+    an approximate index. It mirrors the parts of the Chroma store the retrievers use:
+    similarity_search (with distances, lower is better) and get(ids=...).
+
+    The LangChain write methods (add_texts, add_documents, from_texts) raise TypeError;
+    a session is re-indexed by writing a new index with FlatIndexWriter.
+    """
+    def __init__(self, directory: str, embedding_function: Embeddings):
+        self.directory = os.path.join(directory, FLAT_INDEX_DIR)
+        self._embedding_function = embedding_function
+        with open(os.path.join(self.directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(self.directory, "ids.json"), "r", encoding="utf-8") as f:
+            self.ids: List[str] = json.load(f)
+        self.count, self.dim, self.dtype = meta["count"], meta["dim"], meta["dtype"]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self._offsets = np.load(os.path.join(self.directory, "offsets.npy"), mmap_mode="r")
+        self._vectors = self._scales = None
+        self._decoded: Optional[np.ndarray] = None
+        if self.count:
+            self._vectors = np.memmap(
+                os.path.join(self.directory, "vectors.bin"), dtype=_DTYPES[self.dtype], mode="r", shape=(self.count, self.dim)
+            )
+            if self.dtype == "int8":
+                self._scales = np.memmap(os.path.join(self.directory, "scales.bin"), dtype=np.float32, mode="r", shape=(self.count,))
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        """Returns True if a complete flat index is stored in a session directory."""
+        return os.path.exists(os.path.join(directory, FLAT_INDEX_DIR, "meta.json"))
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda distance: 1.0 - distance
+
+    def _top_k(self, query_vector: Sequence[float], k: int) -> List[Tuple[int, float]]:
+        if not self.count:
+            return []
+        query = _normalize(np.asarray([query_vector], dtype=np.float32))[0]
+        if self._decoded is None and self.count * self.dim * 4 <= FLAT_INDEX_DECODE_MAX_BYTES:
+            decoded = np.asarray(self._vectors, dtype=np.float32)
+            if self._scales is not None:
+                decoded *= np.asarray(self._scales)[:, None]
+            # Assigned only once complete, since parallel agent nodes may search concurrently
+            self._decoded = decoded
+        if self._decoded is not None:
+            scores = self._decoded @ query
+        else:
+            scores = np.empty(self.count, dtype=np.float32)
+            for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+                block = np.asarray(self._vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+                scores[start:start + len(block)] = block @ query
+            if self._scales is not None:
+                scores *= self._scales
+        k = min(k, self.count)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(row), float(1.0 - scores[row])) for row in best]
+
+    def _read_documents(self, rows: Iterable[int]) -> List[Document]:
+        documents = []
+        with open(os.path.join(self.directory, "documents.jsonl"), "rb") as f:
+            for row in rows:
+                f.seek(int(self._offsets[row]))
+                record = json.loads(f.readline())
+                documents.append(Document(page_content=record["text"], metadata=record["metadata"] or {}, id=self.ids[row]))
+        return documents
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        best = self._top_k(embedding, k)
+        return list(zip(self._read_documents(row for row, _ in best), (distance for _, distance in best)))
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k)]
+
+    def _similarity_search_with_relevance_scores(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return [(document, 1.0 - distance) for document, distance in self.similarity_search_with_score(query, k)]
+
+    def get(self, ids: Optional[Sequence[str]] = None, include: Optional[Sequence[str]] = None, **kwargs: Any) -> Dict[str, list]:
+        """Returns stored documents by id, in the same shape as Chroma's `get`."""
+        rows = [self._rows[chunk_id] for chunk_id in (ids if ids is not None else self.ids) if chunk_id in self._rows]
+        documents = self._read_documents(rows)
+        return {
+            "ids": [self.ids[row] for row in rows],
+            "documents": [document.page_content for document in documents],
+            "metadatas": [document.metadata for document in documents],
+        }
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        return self._read_documents(self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        """
+        Always raises: the index is written once at ingest and never changes afterwards.
+
+        Raises:
+            TypeError: FlatVectorStore is read-only.
+        """
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs: Any) -> "FlatVectorStore":
+        """
+        Always raises: build the index with FlatIndexWriter and open it with FlatVectorStore(directory, embedding_function).
+
+        Raises:
+            TypeError: FlatVectorStore is read-only.
+        """
+        raise TypeError(_READ_ONLY_MESSAGE)
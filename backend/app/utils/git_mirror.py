@@ -0,0 +1,171 @@
+import os
+import time
+import base64
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+import git
+
+log = logging.getLogger(__name__)
+
+# Directory holding the bare mirrors shared by all sessions; set it empty to disable the cache
+GIT_CACHE_DIR = os.getenv("GIT_CACHE_DIR", "git_cache")
+# History depth fetched for each clone (1 means only the requested commit)
+GIT_CLONE_DEPTH = int(os.getenv("GIT_CLONE_DEPTH", "1"))
+# File contents are fetched lazily, only for the commit that is actually checked out
+GIT_CLONE_FILTER = "blob:none"
+# Mirrors unused for this many seconds are deleted, then the least recently used ones while the cache
+# is larger than GIT_CACHE_MAX_BYTES (0 disables each); mirrors that live sessions check out from are kept
+GIT_CACHE_TTL = int(os.getenv("GIT_CACHE_TTL", str(14 * 24 * 3600)))
+GIT_CACHE_MAX_BYTES = int(os.getenv("GIT_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+
+# One lock per mirror, so concurrent sessions for the same repository don't fetch over each other
+_mirror_locks: Dict[str, threading.Lock] = {}
+_mirror_locks_guard = threading.Lock()
+
+def git_environment(token: Optional[str] = None) -> Dict[str, str]:
+    """
+    Builds the environment for git commands. A token is passed as an HTTP header through
+    environment-only config, so it never appears in a URL, a command line or a .git/config
+    that agents could read later.
+    """
+    env = {"GIT_TERMINAL_PROMPT": "0"}
+    if token:
+        credentials = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+        env.update({
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.https://github.com/.extraheader",
+            "GIT_CONFIG_VALUE_0": f"AUTHORIZATION: basic {credentials}",
+        })
+    return env
+
+def _mirror_path(repo_url: str, token: Optional[str]) -> str:
+    """
+    Mirrors are keyed by repository URL. Authenticated mirrors are also keyed by a hash of
+    the token, so private code is never served to a session that did not authenticate.
+    """
+    key = repo_url.strip().rstrip("/").removesuffix(".git").lower()
+    if token:
+        key += "\0" + hashlib.sha256(token.encode()).hexdigest()
+    return os.path.join(GIT_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest()[:32] + ".git")
+
+def _get_mirror_lock(mirror_path: str) -> threading.Lock:
+    with _mirror_locks_guard:
+        return _mirror_locks.setdefault(mirror_path, threading.Lock())
+
+def _fetch_commit(repo: git.Git, ref: Optional[str]) -> str:
+    """
+    Fetches `ref` (or the remote's default branch) from origin and returns its commit SHA.
+    A tag given as `ref` is fetched by name; other tags are not fetched, since each would
+    add a shallow commit and its trees.
+    """
+    repo.fetch("origin", ref or "HEAD", depth=GIT_CLONE_DEPTH, filter=GIT_CLONE_FILTER)
+    return repo.rev_parse("FETCH_HEAD^{commit}")
+
+def shallow_clone(repo_url: str, clone_to: str, token: Optional[str] = None, ref: Optional[str] = None) -> str:
+    """
+    Clones only the requested branch, tag or commit with a shallow, blob-filtered fetch.
+
+    Returns:
+        str: The SHA of the checked out commit.
+    """
+    repo = git.Repo.init(clone_to).git
+    with repo.custom_environment(**git_environment(token)):
+        repo.remote("add", "origin", repo_url)
+        sha = _fetch_commit(repo, ref)
+        repo.checkout("--detach", sha)
+    log.info(f"Shallow clone of '{repo_url}' checked out at {sha}.")
+    return sha
+
+def checkout_from_mirror(repo_url: str, clone_to: str, token: Optional[str] = None, ref: Optional[str] = None) -> str:
+    """
+    Checks out a repository from a local bare mirror, creating the mirror on first use.
+    Repeat sessions only fetch the objects that changed since the last fetch, and the
+    session directory is added as a lightweight worktree of the mirror.
+
+    Returns:
+        str: The SHA of the checked out commit.
+    """
+    mirror_path = _mirror_path(repo_url, token)
+    env = git_environment(token)
+    with _get_mirror_lock(mirror_path):
+        if not os.path.isdir(mirror_path):
+            log.info(f"Creating git mirror for '{repo_url}' at '{mirror_path}'...")
+            os.makedirs(GIT_CACHE_DIR, exist_ok=True)
+            git.Repo.init(mirror_path, bare=True)
+            mirror = git.Git(mirror_path)
+            mirror.remote("add", "origin", repo_url)
+        else:
+            log.info(f"Updating git mirror for '{repo_url}' at '{mirror_path}'...")
+            mirror = git.Git(mirror_path)
+            # Forget worktrees of sessions whose code directory has been deleted
+            mirror.worktree("prune")
+
+        with mirror.custom_environment(**env):
+            sha = _fetch_commit(mirror, ref)
+            # Missing file contents are fetched from origin during checkout, so this needs the credentials too
+            mirror.worktree("add", "--detach", os.path.abspath(clone_to), sha)
+        # The modification time of a mirror is its last use, for prune_git_cache
+        os.utime(mirror_path)
+    log.info(f"Checked out '{repo_url}' at {sha} from the git mirror.")
+    return sha
+
+def prune_git_cache(ttl: int = GIT_CACHE_TTL, max_bytes: int = GIT_CACHE_MAX_BYTES) -> List[str]:
+    """
+    Deletes mirrors unused for `ttl` seconds, then the least recently used mirrors until the
+    cache fits in `max_bytes`. Mirrors that are being fetched, or that still have worktrees
+    of live sessions, are kept.
+
+    Returns:
+        List[str]: The paths of the deleted mirrors.
+    """
+    if not GIT_CACHE_DIR or not os.path.isdir(GIT_CACHE_DIR):
+        return []
+    mirrors = []
+    for name in os.listdir(GIT_CACHE_DIR):
+        path = os.path.join(GIT_CACHE_DIR, name)
+        if name.endswith(".git") and os.path.isdir(path):
+            mirrors.append((os.path.getmtime(path), path, _directory_size(path)))
+    mirrors.sort()
+    total = sum(size for _, _, size in mirrors)
+    deadline = time.time() - ttl
+
+    removed: List[str] = []
+    for last_used, path, size in mirrors:
+        if not (ttl > 0 and last_used < deadline) and (max_bytes <= 0 or total <= max_bytes):
+            continue
+        lock = _get_mirror_lock(path)
+        if not lock.acquire(blocking=False):
+            continue
+        try:
+            if _has_worktrees(path):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            lock.release()
+        total -= size
+        removed.append(path)
+        log.info(f"Pruned git mirror '{path}' ({size // 1024 ** 2} MB).")
+    return removed
+
+def _has_worktrees(mirror_path: str) -> bool:
+    """Returns True if a session still checks out from the mirror, after forgetting the worktrees of deleted sessions."""
+    try:
+        git.Git(mirror_path).worktree("prune")
+    except git.GitCommandError as e:
+        log.warning(f"Could not prune worktrees of '{mirror_path}': {e}")
+        return True
+    worktrees = os.path.join(mirror_path, "worktrees")
+    return os.path.isdir(worktrees) and bool(os.listdir(worktrees))
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
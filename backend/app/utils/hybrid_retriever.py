@@ -0,0 +1,69 @@
+import os
+import re
+import logging
+from typing import Dict, List
+from pydantic import ConfigDict
+from langchain_core.vectorstores import VectorStore
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from app.utils.lexical_index import LexicalIndex
+
+log = logging.getLogger(__name__)
+
+# Number of chunks returned to the agent
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "5"))
+# Number of candidates taken from each of the vector and lexical rankings before fusing them
+RETRIEVER_CANDIDATES = int(os.getenv("RETRIEVER_CANDIDATES", "20"))
+# Reciprocal rank fusion constant; higher values flatten the advantage of top ranks
+RRF_K = 60
+
+# Queries made only of code identifiers, e.g. `clone_github_repo`, VectorStoreManager.get_retriever or parse_config()
+_IDENTIFIER_QUERY = re.compile(
+    r"^\s*(`?[A-Za-z_][\w.]*(?:\(\))?`?\s*)+$"
+)
+_CODE_LIKE = re.compile(r"_|[a-z][A-Z]|\.|\(\)|`")
+
+
+def is_identifier_query(query: str) -> bool:
+    """Returns True if every word of the query looks like a code identifier rather than prose."""
+    return bool(_IDENTIFIER_QUERY.match(query)) and all(_CODE_LIKE.search(word) for word in query.split())
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Combines dense retrieval from the session's vector store with the BM25 lexical index
+    using reciprocal rank fusion, so both paraphrased questions and exact identifiers
+    find their chunks. Identifier-only queries are answered from the lexical index
+    alone, without an embedding call, whenever it has a match.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vector_store: VectorStore
+    lexical_index: LexicalIndex
+    k: int = RETRIEVER_K
+    candidates: int = RETRIEVER_CANDIDATES
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        lexical = [chunk_id for chunk_id, _ in self.lexical_index.search(query, k=self.candidates)]
+        if lexical and is_identifier_query(query):
+            log.info(f"Answering identifier query '{query}' from the lexical index.")
+            return self._fetch(lexical[:self.k], {})
+
+        dense = self.vector_store.similarity_search(query, k=self.candidates)
+        documents = {document.id: document for document in dense}
+        scores: Dict[str, float] = {}
+        for ranking in ([document.id for document in dense], lexical):
+            for rank, chunk_id in enumerate(ranking):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        fused = sorted(scores, key=lambda chunk_id: -scores[chunk_id])[:self.k]
+        return self._fetch(fused, documents)
+
+    def _fetch(self, ids: List[str], known: Dict[str, Document]) -> List[Document]:
+        """Returns the documents for the given ids in order, reading the ones not already at hand from the store."""
+        missing = [chunk_id for chunk_id in ids if chunk_id not in known]
+        if missing:
+            results = self.vector_store.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, text, metadata in zip(results["ids"], results["documents"], results["metadatas"]):
+                known[chunk_id] = Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+        return [known[chunk_id] for chunk_id in ids if chunk_id in known]
@@ -0,0 +1,42 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple, TypeVar
+from app.utils.vector_store_cache import VECTOR_STORE_CACHE_SIZE
+
+log = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+_loaded: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+_loaded_lock = threading.Lock()
+
+def load_cached(path: str, loader: Callable[[str], _T]) -> Optional[_T]:
+    """
+    Returns the per-session index stored at `path`, or None if the file does not exist
+    (e.g. for sessions indexed before that index existed). Loaded indexes are kept in an
+    LRU as large as the vector store cache and reloaded when the file changes.
+
+    Args:
+        path (str): The index file.
+        loader (Callable[[str], _T]): Reads the index from the file on a miss.
+    """
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached and cached[0] == modified:
+            _loaded.move_to_end(path)
+            return cached[1]
+
+    index = loader(path)
+    with _loaded_lock:
+        _loaded[path] = (modified, index)
+        _loaded.move_to_end(path)
+        while len(_loaded) > VECTOR_STORE_CACHE_SIZE:
+            _loaded.popitem(last=False)
+    log.info(f"Loaded index '{path}'.")
+    return index
@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from app.utils.file_filters import FilterStats
+
+log = logging.getLogger(__name__)
+
+# Maximum number of repositories ingested at the same time
+INGEST_MAX_JOBS = int(os.getenv("INGEST_MAX_JOBS", "2"))
+# Number of finished jobs kept around so their status can still be queried
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "1000"))
+
+class IngestionJob:
+    """
+    Tracks the progress of a single background ingestion job.
+    All mutators are thread-safe, since the job is updated from a worker thread
+    while the status endpoint reads it from the event loop.
+    """
+    QUEUED = "queued"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.stage = self.QUEUED
+        self.files_processed = 0
+        self.chunks_processed = 0
+        self.chunks_indexed = 0
+        self.errors: List[str] = []
+        self.filter_stats = FilterStats()
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._last_source: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.stage in (self.COMPLETED, self.FAILED)
+
+    def set_stage(self, stage: str) -> None:
+        """Moves the job to a new stage (e.g. 'cloning', 'indexing')."""
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+            self.stage = stage
+        log.info(f"Ingestion job for session '{self.session_id}' entered stage '{stage}'.")
+
+    def record_chunk(self, source: str) -> None:
+        """Counts a produced chunk. Chunks arrive grouped by file, so a new source means a new file."""
+        with self._lock:
+            self.chunks_processed += 1
+            if source != self._last_source:
+                self.files_processed += 1
+                self._last_source = source
+
+    def record_indexed(self, count: int) -> None:
+        """Counts chunks that have been embedded and persisted to the vector store."""
+        with self._lock:
+            self.chunks_indexed += count
+
+    def add_error(self, message: str) -> None:
+        with self._lock:
+            self.errors.append(message)
+
+    def finish(self, error: Optional[str] = None) -> None:
+        """Marks the job as completed, or as failed if an error message is given."""
+        with self._lock:
+            if error:
+                self.errors.append(error)
+            self.stage = self.FAILED if error else self.COMPLETED
+            self.finished_at = time.time()
+
+    def to_dict(self) -> Dict:
+        """Returns a JSON-serialisable snapshot of the job's progress."""
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            return {
+                "session_id": self.session_id,
+                "stage": self.stage,
+                "files_processed": self.files_processed,
+                "chunks_processed": self.chunks_processed,
+                "chunks_indexed": self.chunks_indexed,
+                "elapsed_seconds": round(elapsed, 3),
+                "files_per_second": round(self.files_processed / elapsed, 2) if elapsed else 0.0,
+                "chunks_per_second": round(self.chunks_processed / elapsed, 2) if elapsed else 0.0,
+                "skipped_files": self.filter_stats.to_dict(),
+                "errors": list(self.errors),
+            }
+
+
+class IngestionJobManager:
+    """
+    Runs ingestion jobs on a bounded pool of worker threads so that cloning,
+    chunking and embedding never block the API's event loop.
+    """
+    def __init__(self, max_workers: int = INGEST_MAX_JOBS, history_size: int = INGEST_JOB_HISTORY):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._history_size = history_size
+        self._lock = threading.Lock()
+
+    def submit(self, session_id: str, work: Callable[[IngestionJob], None]) -> IngestionJob:
+        """
+        Queues a job for a session. `work` receives the job so it can report progress;
+        any exception it raises marks the job as failed.
+        """
+        job = IngestionJob(session_id)
+        with self._lock:
+            self._jobs[session_id] = job
+            self._prune()
+        self._executor.submit(self._run, job, work)
+        log.info(f"Queued ingestion job for session '{session_id}'.")
+        return job
+
+    def get(self, session_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(session_id)
+
+    def discard(self, session_id: str) -> None:
+        """Forgets the finished job of a session, e.g. because the session was deleted."""
+        with self._lock:
+            job = self._jobs.get(session_id)
+            if job is not None and job.is_finished:
+                del self._jobs[session_id]
+
+    def _run(self, job: IngestionJob, work: Callable[[IngestionJob], None]) -> None:
+        try:
+            work(job)
+            job.finish()
+            log.info(f"Ingestion job for session '{job.session_id}' completed: {job.to_dict()}")
+        except Exception as e:
+            log.error(f"Ingestion job for session '{job.session_id}' failed: {e}", exc_info=True)
+            job.finish(error=str(e))
+
+    def _prune(self) -> None:
+        """Drops the oldest finished jobs once the history grows beyond its limit."""
+        excess = len(self._jobs) - self._history_size
+        for session_id in [sid for sid, job in self._jobs.items() if job.is_finished][:max(0, excess)]:
+            del self._jobs[session_id]
+
+
+# Process-wide manager shared by all routes
+job_manager = IngestionJobManager()
@@ -0,0 +1,152 @@
+import os
+import queue
+import logging
+import threading
+from typing import Callable, Iterable, List, NamedTuple, Optional
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+log = logging.getLogger(__name__)
+
+# Number of chunks embedded and written per batch; the embedding client splits it into concurrent requests
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256"))
+# Number of threads embedding batches concurrently
+INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "2"))
+# Maximum number of batches buffered between two stages; this is what keeps memory flat
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+
+# Marks the end of a stage's output
+_DONE = object()
+
+class ChunkBatch(NamedTuple):
+    """A batch of chunks moving through the pipeline, with embeddings once the embed stage ran."""
+    ids: List[str]
+    texts: List[str]
+    metadatas: List[dict]
+    embeddings: Optional[List[List[float]]] = None
+
+# Persists one embedded batch, e.g. a Chroma collection's upsert
+BatchWriter = Callable[[ChunkBatch], None]
+
+
+class IngestionPipeline:
+    """
+    Streams chunks through three stages connected by bounded queues:
+
+        read/chunk (the caller's iterator) -> embed (worker threads) -> persist (one thread)
+
+    Batches are embedded while later files are still being read and chunked, and
+    written while the next batches are being embedded. Since every queue is bounded,
+    at most a few batches are held in memory no matter how large the repository is.
+    """
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        writer: BatchWriter,
+        batch_size: int = INGEST_EMBED_BATCH_SIZE,
+        embed_workers: int = INGEST_EMBED_WORKERS,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        on_batch_written: Optional[Callable[[int], None]] = None,
+    ):
+        self.embedding_function = embedding_function
+        self.writer = writer
+        self.batch_size = batch_size
+        self.embed_workers = max(1, embed_workers)
+        self.on_batch_written = on_batch_written
+        self._to_embed: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._to_write: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._failed = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def run(self, chunks: Iterable[Document]) -> int:
+        """
+        Runs the pipeline until every chunk is persisted.
+
+        Returns:
+            int: The number of chunks written.
+
+        Raises:
+            Exception: The first error raised by any stage.
+        """
+        embedders = [
+            threading.Thread(target=self._guard, args=(self._embed_stage,), name=f"ingest-embed-{i}", daemon=True)
+            for i in range(self.embed_workers)
+        ]
+        writer = threading.Thread(target=self._guard, args=(self._write_stage,), name="ingest-write", daemon=True)
+        for thread in embedders + [writer]:
+            thread.start()
+
+        chunk_count = 0
+        try:
+            # The read/chunk stage runs on the calling thread, pulling lazily from the chunk iterator
+            for batch in self._batches(chunks):
+                self._put(self._to_embed, batch)
+                chunk_count += len(batch.ids)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in embedders:
+                self._put(self._to_embed, _DONE, force=True)
+            for thread in embedders:
+                thread.join()
+            self._put(self._to_write, _DONE, force=True)
+            writer.join()
+
+        if self._errors:
+            raise self._errors[0]
+        log.info(f"Ingestion pipeline wrote {chunk_count} chunks.")
+        return chunk_count
+
+    def _batches(self, chunks: Iterable[Document]) -> Iterable[ChunkBatch]:
+        batch = ChunkBatch([], [], [])
+        for sequence, chunk in enumerate(chunks):
+            if self._failed.is_set():
+                return
+            # Ids follow the deterministic chunk order, so re-ingesting a repository is reproducible
+            batch.ids.append(str(sequence))
+            batch.texts.append(chunk.page_content)
+            batch.metadatas.append(chunk.metadata)
+            if len(batch.ids) == self.batch_size:
+                yield batch
+                batch = ChunkBatch([], [], [])
+        if batch.ids:
+            yield batch
+
+    def _embed_stage(self) -> None:
+        while (batch := self._to_embed.get()) is not _DONE:
+            if self._failed.is_set():
+                continue
+            embeddings = self.embedding_function.embed_documents(batch.texts)
+            self._put(self._to_write, batch._replace(embeddings=embeddings))
+
+    def _write_stage(self) -> None:
+        while (batch := self._to_write.get()) is not _DONE:
+            if self._failed.is_set():
+                continue
+            self.writer(batch)
+            if self.on_batch_written:
+                self.on_batch_written(len(batch.ids))
+
+    def _guard(self, stage: Callable[[], None]) -> None:
+        """Runs a stage; on error, records it and keeps draining so no producer blocks forever."""
+        try:
+            stage()
+        except BaseException as e:
+            self._fail(e)
+            stage()
+
+    def _fail(self, error: BaseException) -> None:
+        log.error(f"Ingestion pipeline failed: {error}", exc_info=error)
+        self._errors.append(error)
+        self._failed.set()
+
+    def _put(self, target: "queue.Queue", item, force: bool = False) -> None:
+        """Puts an item on a bounded queue, giving up early (unless forced) once the pipeline has failed."""
+        while True:
+            if self._failed.is_set() and not force:
+                return
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
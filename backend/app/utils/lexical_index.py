@@ -0,0 +1,116 @@
+import os
+import re
+import json
+import math
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.utils.index_cache import load_cached
+
+log = logging.getLogger(__name__)
+
+# File name of the lexical index inside a session's vector store directory
+LEXICAL_INDEX_FILE = "lexical_index.json"
+# BM25 term-frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Identifiers and numbers; identifiers are also indexed by their camelCase / snake_case parts
+_TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_SUBTOKEN_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits code or a query into lower-cased terms. Each identifier yields itself plus its
+    sub-tokens, so `clone_github_repo` matches exactly and `github repo` still matches it.
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text):
+        terms.append(token.lower())
+        parts = _SUBTOKEN_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts)
+    return terms
+
+
+class LexicalIndex:
+    """
+    An in-memory inverted index with BM25 scoring over the chunks of one session. It is
+    built incrementally while chunks are written to the vector store, persisted as JSON
+    next to it, and answers term queries with a few dictionary lookups and no embedding call.
+    """
+    def __init__(self):
+        self.ids: List[str] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._idf: Optional[Dict[str, float]] = None
+        self._avg_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add_documents(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Indexes a batch of chunks under their vector store ids."""
+        for chunk_id, text in zip(ids, texts):
+            doc = len(self.ids)
+            terms = Counter(tokenize(text))
+            self.ids.append(chunk_id)
+            self.doc_lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, []).append((doc, frequency))
+        self._idf = None
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Returns up to `k` (chunk id, BM25 score) pairs, best first. Chunks that share no
+        term with the query are never returned.
+        """
+        if not self.ids:
+            return []
+        if self._idf is None:
+            self._prepare()
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc, frequency in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc] / self._avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.ids[doc], score) for doc, score in best]
+
+    def _prepare(self) -> None:
+        count = len(self.ids)
+        self._avg_length = (sum(self.doc_lengths) / count) or 1.0
+        self._idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5)) for term, docs in self.postings.items()
+        }
+
+    def save(self, directory: str) -> str:
+        """Writes the index into a session directory and returns the file path."""
+        path = os.path.join(directory, LEXICAL_INDEX_FILE)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "doc_lengths": self.doc_lengths, "postings": self.postings}, f, separators=(",", ":"))
+        # Readers never see a half-written index
+        os.replace(temporary_path, path)
+        log.info(f"Saved lexical index with {len(self.ids)} chunks and {len(self.postings)} terms to '{path}'.")
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls()
+        index.ids = data["ids"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {term: [tuple(posting) for posting in docs] for term, docs in data["postings"].items()}
+        index._prepare()
+        return index
+
+
+def load_lexical_index(directory: str) -> Optional[LexicalIndex]:
+    """Returns the lexical index of a session directory, or None for sessions indexed before lexical indexes existed."""
+    return load_cached(os.path.join(directory, LEXICAL_INDEX_FILE), LexicalIndex.load)
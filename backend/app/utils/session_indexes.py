@@ -0,0 +1,25 @@
+import logging
+import numpy as np
+from app.utils.symbol_index import FileSymbols, SymbolIndex
+from app.utils.trigram_index import TrigramIndexBuilder
+
+log = logging.getLogger(__name__)
+
+class SessionIndexes:
+    """
+    The per-session search indexes that are built from the same pass over the files that
+    produces the chunks: the symbol index behind find_symbol and the trigram index
+    behind search_code. They are saved next to the session's vector store.
+    """
+    def __init__(self):
+        self.symbols = SymbolIndex()
+        self.trigrams = TrigramIndexBuilder()
+
+    def add_file(self, path: str, symbols: FileSymbols, trigrams: np.ndarray) -> None:
+        self.symbols.add_file(path, symbols)
+        self.trigrams.add_file(path, trigrams)
+
+    def save(self, directory: str) -> None:
+        self.symbols.save(directory)
+        self.trigrams.save(directory)
+        log.info(f"Saved search indexes for {len(self.trigrams.paths)} files to '{directory}'.")
@@ -0,0 +1,373 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set
+from app.utils.vector_store_cache import directory_size, vector_store_cache
+from app.utils.ingestion_jobs import job_manager
+from app.utils.shared_chroma import drop_shared_collection, shared_collection_size
+from app.utils.file_cache import file_cache
+from app.utils.git_mirror import prune_git_cache
+
+log = logging.getLogger(__name__)
+
+# Directories where each session's indexes and extracted code are stored
+SESSIONS_DIR = "sessions"
+SESSIONS_CODE_DIR = "sessions_code"
+# Seconds after their last use at which sessions are deleted (0 disables expiry)
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+# Disk quota of a single session in bytes, indexes and code together (0 disables the quota)
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(2 * 1024 ** 3)))
+# Disk quota of all sessions together; the least recently used are deleted beyond it (0 disables the quota)
+SESSIONS_MAX_TOTAL_BYTES = int(os.getenv("SESSIONS_MAX_TOTAL_BYTES", str(20 * 1024 ** 3)))
+# Seconds between two garbage collection passes of the background thread
+SESSION_GC_INTERVAL = float(os.getenv("SESSION_GC_INTERVAL", "300"))
+# Last-access times are written to the session directory at most this often, so they survive restarts
+_TOUCH_PERSIST_INTERVAL = 60.0
+
+
+class SessionQuotaError(Exception):
+    """Raised when a session uses more disk space than SESSION_MAX_BYTES."""
+    pass
+
+
+class SessionInfo:
+    """Bookkeeping for one session: when it was created and last used, its size on disk and its active leases."""
+    def __init__(self, session_id: str, created_at: float, last_accessed: float, size_bytes: int = 0):
+        self.session_id = session_id
+        self.created_at = created_at
+        self.last_accessed = last_accessed
+        self.size_bytes = size_bytes
+        self.leases = 0
+        # Set while the session is written to, so its size is measured again once it is released
+        self.size_stale = False
+        # Set when the session was purged while in use; it is deleted when its last lease is released
+        self.delete_pending = False
+        self._persisted_access = last_accessed
+
+    def to_dict(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "created_at": self.created_at,
+            "last_accessed": self.last_accessed,
+            "size_bytes": self.size_bytes,
+            "active_leases": self.leases,
+            "delete_pending": self.delete_pending,
+        }
+
+
+class SessionRegistry:
+    """
+    Tracks every session's creation time, last access and size on disk, and deletes
+    sessions that expired or exceed the disk quotas: first those unused for longer than
+    `ttl`, then those larger than `max_session_bytes`, then the least recently used ones
+    until all sessions fit in `max_total_bytes`.
+
+    Work on a session (an ingestion job, a chat turn) holds a lease on it. Leased sessions
+    are never collected, and a session purged while leased is hidden from new leases and
+    deleted as soon as its last lease is released, so in-flight requests never see their
+    files disappear.
+
+    Sessions from before a restart are discovered from their directories; their last
+    access is kept in the directory's modification time.
+    """
+    def __init__(
+        self,
+        sessions_dir: str = SESSIONS_DIR,
+        code_dir: str = SESSIONS_CODE_DIR,
+        ttl: float = SESSION_TTL,
+        max_session_bytes: int = SESSION_MAX_BYTES,
+        max_total_bytes: int = SESSIONS_MAX_TOTAL_BYTES,
+    ):
+        self.sessions_dir = sessions_dir
+        self.code_dir = code_dir
+        self.ttl = ttl
+        self.max_session_bytes = max_session_bytes
+        self.max_total_bytes = max_total_bytes
+        self._sessions: Dict[str, SessionInfo] = {}
+        self._deleting: Set[str] = set()
+        self._lock = threading.Lock()
+        self._counters = {"expired": 0, "over_quota": 0, "evicted": 0, "purged": 0, "git_mirrors_pruned": 0}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._deletion_listeners: List[Callable[[str], None]] = []
+
+    def add_deletion_listener(self, listener: Callable[[str], None]) -> None:
+        """Registers a callback that receives the id of every deleted session, for caches outside app.utils."""
+        self._deletion_listeners.append(listener)
+
+    def _paths(self, session_id: str) -> List[str]:
+        return [os.path.join(self.sessions_dir, session_id), os.path.join(self.code_dir, session_id)]
+
+    def create(self, session_id: str) -> SessionInfo:
+        """Registers a new session and returns it with a lease held, which the ingestion job releases."""
+        now = time.time()
+        with self._lock:
+            info = self._sessions[session_id] = SessionInfo(session_id, now, now)
+            info.leases = 1
+            info.size_stale = True
+            return info
+
+    def acquire(self, session_id: str) -> SessionInfo:
+        """
+        Takes a lease on a session and records the access.
+
+        Raises:
+            FileNotFoundError: If the session does not exist or is being deleted.
+        """
+        with self._lock:
+            info = self._get(session_id)
+            if info is None or info.delete_pending:
+                raise FileNotFoundError(f"Session {session_id} does not exist.")
+            info.leases += 1
+            self._touch(info)
+            return info
+
+    def exists(self, session_id: str) -> bool:
+        """Returns True if a session exists and is not being deleted, without taking a lease or recording an access."""
+        with self._lock:
+            info = self._get(session_id)
+            return info is not None and not info.delete_pending
+
+    def release(self, session_id: str) -> None:
+        """Releases a lease, measuring the session if it was written to and deleting it if it was purged meanwhile."""
+        with self._lock:
+            info = self._sessions.get(session_id)
+            if info is None:
+                return
+            info.leases = max(0, info.leases - 1)
+            if info.leases:
+                return
+            if info.delete_pending:
+                self._begin_delete(info)
+                self._counters["purged"] += 1
+                delete = True
+            else:
+                delete = False
+                measure = info.size_stale
+        if delete:
+            self._remove_files(session_id)
+        elif measure:
+            self._measure(info)
+
+    @contextmanager
+    def lease(self, session_id: str) -> Iterator[SessionInfo]:
+        """Holds a lease on a session for the duration of a `with` block."""
+        info = self.acquire(session_id)
+        try:
+            yield info
+        finally:
+            self.release(session_id)
+
+    def touch(self, session_id: str) -> None:
+        """Records an access to a session without leasing it."""
+        with self._lock:
+            info = self._get(session_id)
+            if info is not None:
+                self._touch(info)
+
+    def check_quota(self, session_id: str) -> None:
+        """
+        Measures a session and checks it against the per-session quota.
+
+        Raises:
+            SessionQuotaError: If the session is larger than `max_session_bytes`.
+        """
+        with self._lock:
+            info = self._get(session_id)
+        if info is None:
+            return
+        size = self._measure(info)
+        if self.max_session_bytes > 0 and size > self.max_session_bytes:
+            raise SessionQuotaError(
+                f"Session uses {size / 1024 ** 2:.0f} MB of disk space, more than the "
+                f"{self.max_session_bytes / 1024 ** 2:.0f} MB allowed per session."
+            )
+
+    def delete(self, session_id: str) -> Optional[str]:
+        """
+        Purges a session. Returns 'deleted', 'pending' if it is in use and will be deleted
+        once released, or None if the session does not exist.
+        """
+        with self._lock:
+            info = self._get(session_id)
+            if info is None:
+                return None
+            if info.leases:
+                info.delete_pending = True
+                log.info(f"Session '{session_id}' is in use; it will be deleted when released.")
+                return "pending"
+            self._begin_delete(info)
+            self._counters["purged"] += 1
+        self._remove_files(session_id)
+        return "deleted"
+
+    def list(self) -> List[Dict]:
+        """Returns every known session, most recently used first."""
+        self._discover()
+        with self._lock:
+            sessions = sorted(self._sessions.values(), key=lambda info: -info.last_accessed)
+            return [info.to_dict() for info in sessions]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "total_bytes": sum(info.size_bytes for info in self._sessions.values()),
+                "active_sessions": sum(1 for info in self._sessions.values() if info.leases),
+                "ttl_seconds": self.ttl,
+                "max_session_bytes": self.max_session_bytes,
+                "max_total_bytes": self.max_total_bytes,
+                **self._counters,
+            }
+
+    def collect(self) -> Dict[str, List[str]]:
+        """
+        Runs one garbage collection pass and returns the ids of the deleted sessions by reason.
+        Sessions with an active lease are skipped. The pass also prunes the git mirror cache.
+        """
+        self._discover()
+        for info in list(self._sessions.values()):
+            if info.size_stale:
+                self._measure(info)
+
+        deleted: Dict[str, List[str]] = {"expired": [], "over_quota": [], "evicted": []}
+        with self._lock:
+            idle = sorted((info for info in self._sessions.values() if not info.leases), key=lambda info: info.last_accessed)
+            deadline = time.time() - self.ttl
+            for info in idle:
+                if self.ttl > 0 and info.last_accessed < deadline:
+                    deleted["expired"].append(info.session_id)
+                elif self.max_session_bytes > 0 and info.size_bytes > self.max_session_bytes:
+                    deleted["over_quota"].append(info.session_id)
+            doomed = set(deleted["expired"] + deleted["over_quota"])
+            if self.max_total_bytes > 0:
+                total = sum(info.size_bytes for info in self._sessions.values() if info.session_id not in doomed)
+                for info in idle:
+                    if total <= self.max_total_bytes:
+                        break
+                    if info.session_id not in doomed:
+                        deleted["evicted"].append(info.session_id)
+                        total -= info.size_bytes
+            for reason, session_ids in deleted.items():
+                self._counters[reason] += len(session_ids)
+                for session_id in session_ids:
+                    self._begin_delete(self._sessions[session_id])
+
+        for reason, session_ids in deleted.items():
+            for session_id in session_ids:
+                log.info(f"Garbage collecting session '{session_id}' ({reason.replace('_', ' ')}).")
+                self._remove_files(session_id)
+
+        # Git mirrors sit outside the sessions' quotas; they are pruned once no session checks out from them
+        pruned = prune_git_cache()
+        with self._lock:
+            self._counters["git_mirrors_pruned"] += len(pruned)
+        return deleted
+
+    def start(self, interval: float = SESSION_GC_INTERVAL) -> None:
+        """Starts the background garbage collector, which runs a pass every `interval` seconds."""
+        if self._thread is not None or interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="session-gc", daemon=True)
+        self._thread.start()
+        log.info(f"Started session garbage collector (every {interval:.0f}s).")
+
+    def stop(self) -> None:
+        """Stops the background garbage collector."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                deleted = self.collect()
+                if any(deleted.values()):
+                    log.info(f"Session garbage collection finished: {self.stats()}")
+            except Exception as e:
+                log.error(f"Session garbage collection failed: {e}", exc_info=True)
+
+    # --- Internals; except for _measure and _remove_files, the caller holds self._lock ---
+
+    def _get(self, session_id: str) -> Optional[SessionInfo]:
+        """Returns a session, registering it from disk if it was created before a restart."""
+        info = self._sessions.get(session_id)
+        if info is None and session_id not in self._deleting:
+            info = self._load(session_id)
+        return info
+
+    def _load(self, session_id: str) -> Optional[SessionInfo]:
+        stats = [os.stat(path) for path in self._paths(session_id) if os.path.isdir(path)]
+        if not stats:
+            return None
+        info = SessionInfo(
+            session_id,
+            created_at=min(stat.st_ctime for stat in stats),
+            last_accessed=max(stat.st_mtime for stat in stats),
+        )
+        info.size_stale = True
+        self._sessions[session_id] = info
+        return info
+
+    def _discover(self) -> None:
+        """Registers sessions found on disk and forgets idle ones whose directories were removed."""
+        on_disk: Set[str] = set()
+        for directory in (self.sessions_dir, self.code_dir):
+            if os.path.isdir(directory):
+                on_disk.update(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+        with self._lock:
+            for session_id in on_disk - self._sessions.keys() - self._deleting:
+                self._load(session_id)
+            for session_id in self._sessions.keys() - on_disk:
+                if not self._sessions[session_id].leases:
+                    del self._sessions[session_id]
+
+    def _touch(self, info: SessionInfo) -> None:
+        info.last_accessed = time.time()
+        if info.last_accessed - info._persisted_access >= _TOUCH_PERSIST_INTERVAL:
+            info._persisted_access = info.last_accessed
+            for path in self._paths(info.session_id):
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+
+    def _measure(self, info: SessionInfo) -> int:
+        size = sum(directory_size(path) for path in self._paths(info.session_id))
+        # Vectors of the chroma_shared engine live outside the session's directories
+        size += shared_collection_size(os.path.join(self.sessions_dir, info.session_id))
+        with self._lock:
+            info.size_bytes = size
+            # A leased session may still be growing, so it is measured again when released
+            info.size_stale = bool(info.leases)
+        return size
+
+    def _begin_delete(self, info: SessionInfo) -> None:
+        del self._sessions[info.session_id]
+        self._deleting.add(info.session_id)
+
+    def _remove_files(self, session_id: str) -> None:
+        """Closes the session's open stores and deletes its directories and shared collection."""
+        try:
+            vector_store_cache.invalidate(session_id)
+            drop_shared_collection(os.path.join(self.sessions_dir, session_id))
+            file_cache.invalidate_session(session_id)
+            job_manager.discard(session_id)
+            for listener in self._deletion_listeners:
+                listener(session_id)
+            for path in self._paths(session_id):
+                shutil.rmtree(path, ignore_errors=True)
+            log.info(f"Deleted session '{session_id}'.")
+        finally:
+            with self._lock:
+                self._deleting.discard(session_id)
+
+
+# Process-wide registry shared by all routes
+session_registry = SessionRegistry()
@@ -0,0 +1,146 @@
+import os
+import re
+import json
+import logging
+import threading
+from typing import List, Optional
+import chromadb
+from chromadb.config import Settings
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+log = logging.getLogger(__name__)
+
+# Directory of the Chroma database shared by all sessions of the "chroma_shared" engine
+SHARED_CHROMA_DIR = os.getenv("SHARED_CHROMA_DIR", "chroma_shared")
+# Written into a session's directory once its collection is complete; names the collection and its size
+SHARED_COLLECTION_MARKER = "shared_collection.json"
+
+_client: Optional[chromadb.ClientAPI] = None
+_client_lock = threading.Lock()
+
+
+def get_shared_client() -> chromadb.ClientAPI:
+    """
+    Returns the process-wide Chroma client, opening it on first use. It stays open for
+    the lifetime of the process: one SQLite database and one set of file handles serve
+    every session, however many are live.
+
+    The client keeps the HNSW indexes of the collections it used loaded, least recently
+    used first out, up to one fifth of the open file limit (RLIMIT_NOFILE) of the process.
+    Chroma's Rust bindings ignore the segment cache settings, so that limit is the only
+    bound on how many collections stay in memory.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = chromadb.PersistentClient(path=SHARED_CHROMA_DIR, settings=Settings(anonymized_telemetry=False))
+            cache_size = getattr(getattr(_client, "_server", None), "hnsw_cache_size", "unknown")
+            log.info(f"Opened shared Chroma database at '{SHARED_CHROMA_DIR}' (keeps up to {cache_size} collection indexes loaded).")
+        return _client
+
+
+def close_shared_client() -> None:
+    """Closes the shared client, e.g. on shutdown."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def collection_name(session_id: str) -> str:
+    """Returns the name of a session's collection, restricted to the characters Chroma accepts."""
+    return "session-" + re.sub(r"[^A-Za-z0-9_-]", "-", session_id)
+
+
+def _read_marker(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, SHARED_COLLECTION_MARKER), "r", encoding="utf-8") as f:
+            marker = json.load(f)
+        return marker if "collection" in marker else None
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def is_shared_collection(directory: str) -> bool:
+    """Returns True if the session stored in `directory` keeps its vectors in the shared database."""
+    return os.path.exists(os.path.join(directory, SHARED_COLLECTION_MARKER))
+
+
+def open_shared_store(directory: str, embedding_function: Embeddings) -> Chroma:
+    """Opens the collection of the session stored in `directory` on the shared client."""
+    return Chroma(client=get_shared_client(), collection_name=_read_marker(directory)["collection"], embedding_function=embedding_function)
+
+
+def shared_collection_size(directory: str) -> int:
+    """
+    Returns the bytes the collection of the session stored in `directory` adds to the shared
+    database, as recorded by the writer: vectors, documents and metadata. Returns 0 for
+    sessions that do not use the shared database.
+    """
+    marker = _read_marker(directory)
+    return int(marker.get("size_bytes", 0)) if marker else 0
+
+
+def drop_shared_collection(directory: str) -> bool:
+    """
+    Deletes the shared collection of the session stored in `directory`. Returns True if it had one.
+
+    A session whose ingestion failed after its collection was written but before its marker
+    was may still own a collection, so without a marker the session's own collection name
+    is tried, as long as the shared database exists at all.
+    """
+    marker = _read_marker(directory)
+    if marker is None:
+        if not os.path.isdir(SHARED_CHROMA_DIR):
+            return False
+        name = collection_name(os.path.basename(os.path.normpath(directory)))
+        try:
+            get_shared_client().get_collection(name)
+        except Exception:
+            return False
+    else:
+        name = marker["collection"]
+    try:
+        get_shared_client().delete_collection(name)
+        log.info(f"Dropped shared collection '{name}'.")
+    except Exception as e:
+        log.warning(f"Failed to drop shared collection '{name}': {e}")
+    return True
+
+
+class SharedChromaWriter:
+    """
+    Writes embedded chunks to a session's collection in the shared database. A collection
+    left by an earlier ingestion of the session is replaced, and the marker that makes
+    the session open from the shared database is written only once the collection is complete.
+    """
+    def __init__(self, directory: str, session_id: str):
+        self.directory = directory
+        self.name = collection_name(session_id)
+        self.client = get_shared_client()
+        try:
+            self.client.delete_collection(self.name)
+        except Exception:
+            pass
+        self.collection = self.client.create_collection(self.name)
+        # Bytes written to the collection, stored in the marker so the session quotas count them
+        self.size_bytes = 0
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[dict], embeddings: List[List[float]]) -> None:
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+        self.size_bytes += sum(4 * len(embedding) for embedding in embeddings)
+        self.size_bytes += sum(len(text.encode("utf-8")) for text in texts)
+        self.size_bytes += sum(len(json.dumps(metadata)) for metadata in metadatas)
+
+    def close(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, SHARED_COLLECTION_MARKER), "w", encoding="utf-8") as f:
+            json.dump({"collection": self.name, "size_bytes": self.size_bytes}, f)
+
+    def abort(self) -> None:
+        try:
+            self.client.delete_collection(self.name)
+        except Exception as e:
+            log.warning(f"Failed to drop incomplete shared collection '{self.name}': {e}")
@@ -0,0 +1,407 @@
+import os
+import re
+import ast
+import json
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from app.utils.index_cache import load_cached
+
+log = logging.getLogger(__name__)
+
+# File name of the symbol index inside a session's vector store directory
+SYMBOL_INDEX_FILE = "symbol_index.json"
+# Lines recorded per referenced name and file, and per name across the repository
+MAX_REFERENCE_LINES_PER_FILE = 5
+MAX_REFERENCES_PER_NAME = 200
+# Lines scanned after a definition to find its closing brace
+MAX_BLOCK_LINES = 5000
+
+_CODE_EXTENSIONS = {".py", ".java", ".js", ".ts", ".c", ".cpp", ".cs"}
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+# Names too short or too common to be worth recording as references
+_MIN_REFERENCE_LENGTH = 3
+
+
+class Symbol(NamedTuple):
+    """A definition found in the codebase. Line numbers are 1-based and inclusive."""
+    name: str
+    kind: str
+    path: str
+    start_line: int
+    end_line: int
+    parent: Optional[str] = None
+    signature: str = ""
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.parent}.{self.name}" if self.parent else self.name
+
+
+class FileSymbols(NamedTuple):
+    """Everything the symbol index records about one file."""
+    definitions: List[Symbol]
+    # Referenced identifier -> lines it appears on
+    references: Dict[str, List[int]]
+    imports: List[str]
+
+
+# --- Python ---
+
+def _python_symbols(path: str, content: str, lines: List[str]) -> Optional[FileSymbols]:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+
+    definitions: List[Symbol] = []
+    imports: List[str] = []
+
+    def visit(body: Iterable[ast.stmt], parents: List[str], in_class: bool) -> None:
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                is_class = isinstance(node, ast.ClassDef)
+                kind = "class" if is_class else ("method" if in_class else "function")
+                start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+                definitions.append(Symbol(
+                    node.name, kind, path, start, node.end_lineno or node.lineno,
+                    ".".join(parents) or None, lines[node.lineno - 1].strip()[:200],
+                ))
+                visit(node.body, parents + [node.name], is_class)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)) and not parents:
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        definitions.append(Symbol(
+                            target.id, "variable", path, node.lineno, node.end_lineno or node.lineno,
+                            None, lines[node.lineno - 1].strip()[:200],
+                        ))
+            elif isinstance(node, (ast.If, ast.Try, ast.With, ast.For, ast.While)):
+                # Definitions guarded by `if TYPE_CHECKING:`, `try: import ...` and similar
+                for field in ("body", "orelse", "finalbody", "handlers"):
+                    nested = getattr(node, field, [])
+                    for child in nested:
+                        visit(child.body if isinstance(child, ast.ExceptHandler) else [child], parents, in_class)
+
+    visit(tree.body, [], False)
+
+    references: Dict[str, List[int]] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            _add_reference(references, node.id, node.lineno)
+        elif isinstance(node, ast.Attribute):
+            _add_reference(references, node.attr, node.lineno)
+        elif isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = "." * node.level + (node.module or "")
+            imports.extend(f"{module}.{alias.name}" if module else alias.name for alias in node.names)
+            for alias in node.names:
+                _add_reference(references, alias.name, node.lineno)
+    return FileSymbols(definitions, references, imports)
+
+
+# --- Brace languages (Java, JavaScript/TypeScript, C/C++, C#) ---
+
+_JS_PATTERNS = [
+    ("class", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)")),
+    ("interface", re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?interface\s+([A-Za-z_$][\w$]*)")),
+    ("enum", re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?(?:const\s+)?enum\s+([A-Za-z_$][\w$]*)")),
+    ("type", re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?type\s+([A-Za-z_$][\w$]*)\s*(?:<[^=]*>)?\s*=")),
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)")),
+    ("function", re.compile(
+        r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*(?:async\s+)?"
+        r"(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[A-Za-z_$][\w$]*\s*=>)"
+    )),
+    ("method", re.compile(
+        r"^\s+(?:(?:public|private|protected|static|async|readonly|override|get|set)\s+)*"
+        r"\*?([A-Za-z_$][\w$]*)\s*(?:<[^>]*>)?\([^;]*\)\s*(?::\s*[^{;]+)?\{\s*$"
+    )),
+]
+
+_JAVA_LIKE_MODIFIERS = (
+    r"(?:(?:public|private|protected|internal|static|final|abstract|sealed|partial|virtual|override|"
+    r"async|synchronized|native|default|extern|unsafe|readonly|new)\s+)*"
+)
+_JAVA_LIKE_PATTERNS = [
+    ("class", re.compile(r"^\s*" + _JAVA_LIKE_MODIFIERS + r"(?:class|record)\s+([A-Za-z_]\w*)")),
+    ("interface", re.compile(r"^\s*" + _JAVA_LIKE_MODIFIERS + r"(?:interface|@interface)\s+([A-Za-z_]\w*)")),
+    ("enum", re.compile(r"^\s*" + _JAVA_LIKE_MODIFIERS + r"enum\s+([A-Za-z_]\w*)")),
+    ("struct", re.compile(r"^\s*" + _JAVA_LIKE_MODIFIERS + r"struct\s+([A-Za-z_]\w*)")),
+    ("namespace", re.compile(r"^\s*namespace\s+([A-Za-z_][\w.]*)")),
+    ("method", re.compile(
+        r"^\s*" + _JAVA_LIKE_MODIFIERS + r"(?:<[^>]+>\s+)?[\w<>\[\],.?]+(?:\s*<[^>]*>)?\s+([A-Za-z_]\w*)\s*\([^;]*$"
+    )),
+    # Constructors have no return type
+    ("method", re.compile(r"^\s*(?:public|private|protected|internal)\s+([A-Z]\w*)\s*\([^;]*$")),
+]
+
+_C_PATTERNS = [
+    ("class", re.compile(r"^\s*(?:template\s*<[^>]*>\s*)?class\s+([A-Za-z_]\w*)\s*(?:final\s*)?(?::[^;{]*)?\{?\s*$")),
+    ("struct", re.compile(r"^\s*(?:typedef\s+)?struct\s+([A-Za-z_]\w*)\s*(?::[^;{]*)?\{?\s*$")),
+    ("enum", re.compile(r"^\s*(?:typedef\s+)?enum\s+(?:class\s+)?([A-Za-z_]\w*)\s*(?::[^;{]*)?\{?\s*$")),
+    ("namespace", re.compile(r"^\s*namespace\s+([A-Za-z_]\w*)")),
+    ("macro", re.compile(r"^\s*#\s*define\s+([A-Za-z_]\w*)")),
+    ("function", re.compile(
+        r"^(?:[\w:*&<>,]+\s+)+[*&]*((?:[A-Za-z_]\w*::)*~?[A-Za-z_]\w*)\s*\([^;]*$"
+    )),
+]
+
+_LANGUAGE_PATTERNS = {
+    ".js": _JS_PATTERNS, ".ts": _JS_PATTERNS,
+    ".java": _JAVA_LIKE_PATTERNS, ".cs": _JAVA_LIKE_PATTERNS,
+    ".c": _C_PATTERNS, ".cpp": _C_PATTERNS,
+}
+
+# Words that the method patterns would otherwise mistake for names
+_KEYWORDS = frozenset(
+    "if else for while do switch case catch return new throw typeof sizeof function await yield import export "
+    "super this delete in of try finally synchronized using lock foreach".split()
+)
+_CONTAINER_KINDS = {"class", "interface", "enum", "struct", "namespace"}
+
+_IMPORT_PATTERNS = {
+    ".js": re.compile(r"""(?:import\s[^'"]*?from\s*|import\s*\(?\s*|require\s*\(\s*)['"]([^'"]+)['"]"""),
+    ".java": re.compile(r"^\s*import\s+(?:static\s+)?([\w.*]+)\s*;", re.MULTILINE),
+    ".cs": re.compile(r"^\s*using\s+(?:static\s+)?([\w.]+)\s*;", re.MULTILINE),
+    ".c": re.compile(r"^\s*#\s*include\s*[<\"]([^>\"]+)[>\"]", re.MULTILINE),
+}
+_IMPORT_PATTERNS[".ts"] = _IMPORT_PATTERNS[".js"]
+_IMPORT_PATTERNS[".cpp"] = _IMPORT_PATTERNS[".c"]
+
+# String literals and line comments, blanked out before counting braces
+_NOISE = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`|//.*$")
+
+
+def _block_end(lines: List[str], start: int) -> int:
+    """
+    Returns the (0-based) line closing the brace block that opens on or after `start`.
+    Declarations that end with `;` before any `{` are one line long.
+    """
+    depth = 0
+    opened = False
+    for index in range(start, min(len(lines), start + MAX_BLOCK_LINES)):
+        line = _NOISE.sub("", lines[index])
+        for char in line:
+            if char == "{":
+                depth += 1
+                opened = True
+            elif char == "}":
+                depth -= 1
+                if opened and depth <= 0:
+                    return index
+            elif char == ";" and not opened:
+                return index
+    return start
+
+
+def _brace_symbols(path: str, lines: List[str], extension: str) -> List[Symbol]:
+    found: List[Tuple[str, str, int, int]] = []
+    for index, line in enumerate(lines):
+        for kind, pattern in _LANGUAGE_PATTERNS[extension]:
+            match = pattern.match(line)
+            if not match:
+                continue
+            name = match.group(1)
+            if name.split("::")[-1] in _KEYWORDS:
+                continue
+            end = index if kind == "macro" else _block_end(lines, index)
+            found.append((name, kind, index, end))
+            break
+
+    # Parents are the innermost containers whose block encloses the definition
+    definitions = []
+    containers: List[Tuple[str, int]] = []
+    for name, kind, start, end in found:
+        while containers and containers[-1][1] < start:
+            containers.pop()
+        parent = ".".join(container for container, _ in containers) or None
+        if kind == "function" and parent and "::" not in name:
+            kind = "method"
+        if "::" in name:
+            # Out-of-class C++ definitions such as `Parser::parse`
+            qualifier, name = name.rsplit("::", 1)
+            parent = qualifier.replace("::", ".")
+            kind = "method"
+        if kind == "method" and not parent and extension in (".js", ".ts"):
+            kind = "function"
+        definitions.append(Symbol(name, kind, path, start + 1, end + 1, parent, lines[start].strip()[:200]))
+        if kind in _CONTAINER_KINDS and end > start:
+            containers.append((name, end))
+    return definitions
+
+
+# --- Markup and data files ---
+
+_MARKUP_PATTERNS = {
+    ".md": ("heading", re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$")),
+    ".css": ("selector", re.compile(r"^\s*([.#]?[A-Za-z_-][\w-]*)[^{;]*\{")),
+    ".html": ("id", re.compile(r"""\bid\s*=\s*['"]([^'"]+)['"]""")),
+    ".yaml": ("key", re.compile(r"^([A-Za-z_][\w.-]*)\s*:")),
+    ".yml": ("key", re.compile(r"^([A-Za-z_][\w.-]*)\s*:")),
+    ".json": ("key", re.compile(r"""^\s{0,4}"([^"]+)"\s*:""")),
+}
+
+
+def _markup_symbols(path: str, lines: List[str], extension: str) -> List[Symbol]:
+    kind, pattern = _MARKUP_PATTERNS[extension]
+    definitions = []
+    for index, line in enumerate(lines):
+        for match in pattern.finditer(line):
+            definitions.append(Symbol(match.group(1), kind, path, index + 1, index + 1, None, line.strip()[:200]))
+    return definitions
+
+
+def _add_reference(references: Dict[str, List[int]], name: str, line: int) -> None:
+    if len(name) < _MIN_REFERENCE_LENGTH or name in _KEYWORDS:
+        return
+    lines = references.setdefault(name, [])
+    if len(lines) < MAX_REFERENCE_LINES_PER_FILE and (not lines or lines[-1] != line):
+        lines.append(line)
+
+
+def extract_symbols(path: str, content: str) -> FileSymbols:
+    """
+    Extracts the definitions, referenced identifiers and imports of one file. Python is
+    parsed with `ast`; the other supported languages use line-based patterns plus brace
+    matching, which is approximate but needs no parser dependencies.
+
+    Args:
+        path (str): The file's path relative to the repository root.
+        content (str): The file's content.
+
+    Returns:
+        FileSymbols: The definitions, references and imports found in the file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    lines = content.splitlines()
+    if extension == ".py":
+        symbols = _python_symbols(path, content, lines)
+        if symbols is not None:
+            return symbols
+        # Files that do not parse (e.g. Python 2) still get their def/class lines
+        definitions = [
+            Symbol(match.group(2), match.group(1).replace("def", "function"), path, index + 1, index + 1, None, line.strip()[:200])
+            for index, line in enumerate(lines)
+            if (match := re.match(r"^\s*(?:async\s+)?(def|class)\s+([A-Za-z_]\w*)", line))
+        ]
+    elif extension in _LANGUAGE_PATTERNS:
+        definitions = _brace_symbols(path, lines, extension)
+    elif extension in _MARKUP_PATTERNS:
+        return FileSymbols(_markup_symbols(path, lines, extension), {}, [])
+    else:
+        return FileSymbols([], {}, [])
+
+    references: Dict[str, List[int]] = {}
+    if extension in _CODE_EXTENSIONS:
+        for index, line in enumerate(lines):
+            for name in _IDENTIFIER.findall(line):
+                _add_reference(references, name, index + 1)
+    import_pattern = _IMPORT_PATTERNS.get(extension)
+    imports = import_pattern.findall(content) if import_pattern else []
+    return FileSymbols(definitions, references, imports)
+
+
+class SymbolIndex:
+    """
+    Maps the functions, classes, methods and other definitions of a session's codebase to
+    their file and line range, together with where each defined name is referenced and
+    which files import what. Built at ingest from the per-file results of extract_symbols.
+    """
+    def __init__(self):
+        self.symbols: List[Symbol] = []
+        self.references: Dict[str, List[Tuple[str, int]]] = {}
+        self.imports: Dict[str, List[str]] = {}
+        self._by_name: Dict[str, List[int]] = {}
+        # Built on first use by file_symbols
+        self._by_path: Optional[Dict[str, List[Symbol]]] = None
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def add_file(self, path: str, file_symbols: FileSymbols) -> None:
+        """Adds the symbols of one file."""
+        self._by_path = None
+        for symbol in file_symbols.definitions:
+            self._by_name.setdefault(symbol.name, []).append(len(self.symbols))
+            self.symbols.append(symbol)
+        for name, lines in file_symbols.references.items():
+            references = self.references.setdefault(name, [])
+            if len(references) < MAX_REFERENCES_PER_NAME:
+                references.extend((path, line) for line in lines[:MAX_REFERENCES_PER_NAME - len(references)])
+        if file_symbols.imports:
+            self.imports[path] = file_symbols.imports
+
+    def find(self, name: str, kind: Optional[str] = None, limit: int = 20) -> List[Symbol]:
+        """
+        Looks a symbol up by name. `Class.method` style qualified names are supported.
+        Exact matches win; otherwise case-insensitive, then substring matches are returned.
+        """
+        name = name.strip().strip("`").removesuffix("()")
+        short_name = name.rsplit(".", 1)[-1]
+        candidates = [self.symbols[i] for i in self._by_name.get(short_name, [])]
+        if "." in name:
+            candidates = [s for s in candidates if s.qualified_name == name or s.qualified_name.endswith("." + name)]
+        if not candidates:
+            lowered = short_name.lower()
+            candidates = [s for s in self.symbols if s.name.lower() == lowered]
+            if not candidates:
+                candidates = [s for s in self.symbols if lowered in s.name.lower()]
+        if kind:
+            candidates = [s for s in candidates if s.kind == kind]
+        return candidates[:limit]
+
+    def file_symbols(self, path: str) -> List[Symbol]:
+        """Returns the definitions of one file in line order."""
+        if self._by_path is None:
+            self._by_path = {}
+            for symbol in self.symbols:
+                self._by_path.setdefault(symbol.path, []).append(symbol)
+        return sorted(self._by_path.get(path, []), key=lambda symbol: symbol.start_line)
+
+    def find_references(self, name: str) -> List[Tuple[str, int]]:
+        """Returns (path, line) pairs where a name is used, excluding the lines that define it."""
+        short_name = name.strip().strip("`").removesuffix("()").rsplit(".", 1)[-1]
+        definition_lines = {(s.path, s.start_line) for s in self.find(short_name) if s.name == short_name}
+        return [reference for reference in self.references.get(short_name, []) if reference not in definition_lines]
+
+    def find_importers(self, name: str) -> List[str]:
+        """Returns the files whose imports mention a module or name."""
+        short_name = name.strip().strip("`").removesuffix("()").rsplit(".", 1)[-1]
+        pattern = re.compile(r"(^|[./])" + re.escape(short_name) + r"($|[./])")
+        return [path for path, imports in self.imports.items() if any(pattern.search(module) for module in imports)]
+
+    def save(self, directory: str) -> str:
+        """
+        Writes the index into a session directory and returns the file path. Only
+        references to names defined somewhere in the codebase are kept.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, SYMBOL_INDEX_FILE)
+        references = {name: refs for name, refs in self.references.items() if name in self._by_name}
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"symbols": [list(symbol) for symbol in self.symbols], "references": references, "imports": self.imports},
+                f, separators=(",", ":"),
+            )
+        os.replace(temporary_path, path)
+        log.info(f"Saved symbol index with {len(self.symbols)} definitions to '{path}'.")
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "SymbolIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls()
+        for values in data["symbols"]:
+            symbol = Symbol(*values)
+            index._by_name.setdefault(symbol.name, []).append(len(index.symbols))
+            index.symbols.append(symbol)
+        index.references = {name: [tuple(ref) for ref in refs] for name, refs in data["references"].items()}
+        index.imports = data["imports"]
+        return index
+
+
+def load_symbol_index(directory: str) -> Optional[SymbolIndex]:
+    """Returns the symbol index of a session directory, or None for sessions indexed before symbol indexes existed."""
+    return load_cached(os.path.join(directory, SYMBOL_INDEX_FILE), SymbolIndex.load)
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import logging
+import fnmatch
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+import numpy as np
+from app.utils.index_cache import load_cached
+
+try:
+    import re._parser as sre_parse
+    from re._constants import LITERAL, SUBPATTERN, MAX_REPEAT, MIN_REPEAT, BRANCH, AT
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import LITERAL, SUBPATTERN, MAX_REPEAT, MIN_REPEAT, BRANCH, AT
+
+log = logging.getLogger(__name__)
+
+# Directory of the trigram index inside a session's vector store directory
+TRIGRAM_INDEX_DIR = "trigram_index"
+
+
+def file_trigrams(content: str) -> np.ndarray:
+    """
+    Returns the sorted, unique byte trigrams of a file's lower-cased UTF-8 content, each
+    packed into a uint32. Vectorised with NumPy, so it is cheap enough to run for every file.
+    """
+    data = np.frombuffer(content.lower().encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+    if len(data) < 3:
+        return np.empty(0, dtype=np.uint32)
+    return np.unique((data[:-2] << 16) | (data[1:-1] << 8) | data[2:])
+
+
+def _literal_trigrams(literal: str) -> np.ndarray:
+    return file_trigrams(literal) if len(literal.encode("utf-8")) >= 3 else np.empty(0, dtype=np.uint32)
+
+
+# --- Query planning ---
+
+class _Query(NamedTuple):
+    """Trigram requirements of a pattern: every literal in `all_of` must occur, or one of the `any_of` alternatives."""
+    all_of: List[str]
+    any_of: List["_Query"]
+
+
+def _plan(parsed) -> _Query:
+    """
+    Extracts literal strings that every match of a parsed regex must contain. Anything
+    that is not a plain literal (classes, wildcards, optional parts) ends the current
+    literal, so the plan is conservative: it never excludes a file that could match.
+    """
+    literals: List[str] = []
+    alternatives: List[_Query] = []
+    current: List[str] = []
+
+    def flush() -> None:
+        if current:
+            literals.append("".join(current))
+            current.clear()
+
+    for op, value in parsed:
+        if op == LITERAL:
+            current.append(chr(value))
+        elif op == AT:
+            # Anchors such as ^ and \b match no characters
+            continue
+        elif op == SUBPATTERN:
+            flush()
+            inner = _plan(value[-1])
+            literals.extend(inner.all_of)
+            alternatives.extend(inner.any_of)
+        elif op in (MAX_REPEAT, MIN_REPEAT) and value[0] >= 1:
+            flush()
+            inner = _plan(value[2])
+            literals.extend(inner.all_of)
+            alternatives.extend(inner.any_of)
+        elif op == BRANCH:
+            flush()
+            branches = [_plan(branch) for branch in value[1]]
+            alternatives.append(_Query([], branches))
+        else:
+            flush()
+    flush()
+    return _Query(literals, alternatives)
+
+
+class SearchMatch(NamedTuple):
+    """One matching line with its surrounding context. Line numbers are 1-based."""
+    path: str
+    line_number: int
+    line: str
+    before: List[str]
+    after: List[str]
+
+
+class TrigramIndex:
+    """
+    A trigram index over the files of one session, in the style of code search engines:
+    a regex is reduced to the literals every match must contain, their trigrams select
+    the candidate files from the posting lists, and only those files are scanned.
+
+    The index is stored as three NumPy arrays (sorted trigram keys, posting offsets and
+    file ids) that are memory-mapped on load, so opening it costs almost nothing.
+    """
+    def __init__(self, paths: Sequence[str], keys: np.ndarray, offsets: np.ndarray, postings: np.ndarray):
+        self.paths = list(paths)
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def candidates(self, pattern: str, flags: int = 0) -> np.ndarray:
+        """Returns the ids of the files that may contain a match of `pattern`, in path order."""
+        return self._evaluate(_plan(sre_parse.parse(pattern, flags)))
+
+    def _evaluate(self, query: _Query) -> np.ndarray:
+        result: Optional[np.ndarray] = None
+        for literal in query.all_of:
+            for trigram in _literal_trigrams(literal):
+                result = self._posting(trigram) if result is None else np.intersect1d(result, self._posting(trigram), assume_unique=True)
+                if not len(result):
+                    return result
+        for alternative in query.any_of:
+            branches = [self._evaluate(branch) for branch in alternative.any_of]
+            union = np.unique(np.concatenate(branches)) if branches else np.arange(len(self.paths), dtype=np.uint32)
+            result = union if result is None else np.intersect1d(result, union, assume_unique=True)
+        return np.arange(len(self.paths), dtype=np.uint32) if result is None else result
+
+    def _posting(self, trigram: int) -> np.ndarray:
+        position = np.searchsorted(self.keys, trigram)
+        if position == len(self.keys) or self.keys[position] != trigram:
+            return np.empty(0, dtype=np.uint32)
+        return np.asarray(self.postings[self.offsets[position]:self.offsets[position + 1]])
+
+    def search(
+        self,
+        root: str,
+        pattern: str,
+        ignore_case: bool = False,
+        path_glob: Optional[str] = None,
+        max_results: int = 50,
+        context_lines: int = 0,
+    ) -> Iterator[SearchMatch]:
+        """
+        Yields the lines matching a regular expression in the indexed files under `root`.
+
+        Args:
+            root (str): The session's code directory.
+            pattern (str): A Python regular expression, matched line by line.
+            ignore_case (bool): Match case-insensitively.
+            path_glob (Optional[str]): Only search files whose path matches this glob (e.g. 'src/**/*.py').
+            max_results (int): Stop after this many matching lines.
+            context_lines (int): Number of lines of context before and after each match.
+
+        Raises:
+            re.error: If the pattern is not a valid regular expression.
+        """
+        flags = re.IGNORECASE if ignore_case else 0
+        compiled = re.compile(pattern, flags)
+        found = 0
+        for file_id in self.candidates(pattern, flags):
+            path = self.paths[file_id]
+            if path_glob and not glob_match(path, path_glob):
+                continue
+            try:
+                with open(os.path.join(root, path), "r", encoding="utf-8", errors="ignore") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            for index, line in enumerate(lines):
+                if compiled.search(line):
+                    yield SearchMatch(
+                        path, index + 1, line,
+                        lines[max(0, index - context_lines):index], lines[index + 1:index + 1 + context_lines],
+                    )
+                    found += 1
+                    if found >= max_results:
+                        return
+
+    @classmethod
+    def load(cls, directory: str) -> "TrigramIndex":
+        with open(os.path.join(directory, "paths.json"), "r", encoding="utf-8") as f:
+            paths = json.load(f)
+        return cls(
+            paths,
+            np.load(os.path.join(directory, "keys.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "postings.npy"), mmap_mode="r"),
+        )
+
+
+def glob_match(path: str, path_glob: str) -> bool:
+    """Matches a path against a glob where `**/` may also match no directory at all."""
+    return fnmatch.fnmatch(path, path_glob) or fnmatch.fnmatch(path, path_glob.replace("**/", ""))
+
+
+class TrigramIndexBuilder:
+    """Collects the trigrams of each file during ingestion and writes the posting lists."""
+    def __init__(self):
+        self.paths: List[str] = []
+        self._trigrams: List[np.ndarray] = []
+
+    def add_file(self, path: str, trigrams: np.ndarray) -> None:
+        self.paths.append(path)
+        self._trigrams.append(trigrams)
+
+    def save(self, directory: str) -> str:
+        """Writes the index into a session directory and returns the index directory."""
+        index_dir = os.path.join(directory, TRIGRAM_INDEX_DIR)
+        os.makedirs(index_dir, exist_ok=True)
+        if self._trigrams:
+            trigrams = np.concatenate(self._trigrams)
+            file_ids = np.repeat(np.arange(len(self.paths), dtype=np.uint32), [len(t) for t in self._trigrams])
+        else:
+            trigrams = np.empty(0, dtype=np.uint32)
+            file_ids = np.empty(0, dtype=np.uint32)
+        # A stable sort keeps every posting list in file order
+        order = np.argsort(trigrams, kind="stable")
+        trigrams, file_ids = trigrams[order], file_ids[order]
+        keys, starts = np.unique(trigrams, return_index=True)
+        offsets = np.append(starts, len(trigrams)).astype(np.int64)
+
+        np.save(os.path.join(index_dir, "keys.npy"), keys)
+        np.save(os.path.join(index_dir, "offsets.npy"), offsets)
+        np.save(os.path.join(index_dir, "postings.npy"), file_ids)
+        with open(os.path.join(index_dir, "paths.json"), "w", encoding="utf-8") as f:
+            json.dump(self.paths, f)
+        log.info(f"Saved trigram index with {len(self.paths)} files and {len(keys)} trigrams to '{index_dir}'.")
+        return index_dir
+
+
+def load_trigram_index(directory: str) -> Optional[TrigramIndex]:
+    """Returns the trigram index of a session directory, or None for sessions indexed before trigram indexes existed."""
+    return load_cached(os.path.join(directory, TRIGRAM_INDEX_DIR, "paths.json"), lambda path: TrigramIndex.load(os.path.dirname(path)))
@@ -0,0 +1,313 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from app.llm.embedding_provider import embedding_config_key, get_embeddings
+from app.utils.embedding_cache import CachedEmbeddings, EMBEDDING_CACHE_MAX_BYTES
+from app.utils.embedding_client import BatchedEmbeddings
+from app.utils.flat_vector_store import FlatVectorStore
+from app.utils.shared_chroma import is_shared_collection, open_shared_store
+
+log = logging.getLogger(__name__)
+
+# Maximum number of session vector stores kept open at the same time
+VECTOR_STORE_CACHE_SIZE = int(os.getenv("VECTOR_STORE_CACHE_SIZE", "32"))
+# Seconds after which an unused vector store is closed
+VECTOR_STORE_CACHE_TTL = float(os.getenv("VECTOR_STORE_CACHE_TTL", "1800"))
+# Approximate memory budget of the open stores, measured by their size on disk (0 disables the cap)
+VECTOR_STORE_CACHE_MAX_BYTES = int(os.getenv("VECTOR_STORE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Name of the collection inside each session's Chroma database (LangChain's default)
+COLLECTION_NAME = "langchain"
+
+
+class EmbeddingHandle(NamedTuple):
+    """The embedding function used by vector stores, plus the client whose metrics it records (if any)."""
+    embedding_function: Embeddings
+    client: Optional[BatchedEmbeddings]
+    model_name: str
+
+
+_embedding_handles: Dict[Tuple[str, ...], EmbeddingHandle] = {}
+_embedding_handles_lock = threading.Lock()
+
+def get_embedding_handle() -> EmbeddingHandle:
+    """
+    Returns the process-wide embedding function for the configured backend, building it on
+    first use. Embeddings are not session specific, so every session shares one client,
+    its connection pool, its rate limiter and its cache.
+    """
+    key = embedding_config_key()
+    with _embedding_handles_lock:
+        if key not in _embedding_handles:
+            backend = get_embeddings()
+            if backend.is_local:
+                # In-process embeddings have no network latency or quota, so they are used directly
+                handle = EmbeddingHandle(backend.embeddings, None, backend.model_name)
+            else:
+                # Batched, concurrent, rate-limited and retried calls to the provider
+                client = BatchedEmbeddings(backend.embeddings, model_name=backend.model_name)
+                embedding_function = client
+                # Serve chunks that were already embedded by any session from the shared on-disk cache
+                if EMBEDDING_CACHE_MAX_BYTES > 0:
+                    embedding_function = CachedEmbeddings(client, model_name=backend.model_name)
+                handle = EmbeddingHandle(embedding_function, client, backend.model_name)
+            _embedding_handles[key] = handle
+            log.info(f"Opened embedding client for '{backend.model_name}'.")
+        return _embedding_handles[key]
+
+
+def directory_size(path: str) -> int:
+    """Returns the total size in bytes of the files under a directory."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class _OpenStore:
+    """An open vector store for one session, with the Chroma client it owns (None for flat indexes and shared collections)."""
+    def __init__(self, session_id: str, client: Optional[chromadb.ClientAPI], store: VectorStore, size_bytes: int):
+        self.session_id = session_id
+        self.client = client
+        self.store = store
+        self.size_bytes = size_bytes
+        self.last_used = time.monotonic()
+        # Callers using the store right now; a store dropped from the cache is closed when this reaches zero
+        self.leases = 0
+        self.retired = False
+
+
+class VectorStoreCache:
+    """
+    Keeps the vector stores of recently used sessions open, so agents do not reopen the
+    persistent directory on every chat turn. Stores are closed when they have not been
+    used for `ttl` seconds, and the least recently used ones are closed once more than
+    `max_entries` are open or their combined size exceeds `max_bytes`.
+
+    All methods are thread-safe. A store is opened outside the global lock, under a
+    per-session lock, so parallel agents of one session share a single open while other
+    sessions are served without waiting.
+
+    A store can be evicted while another thread is still querying it, so queries hold a
+    lease (see lease()): an evicted store that is leased leaves the cache at once, but its
+    client is closed only when the last lease is released.
+    """
+    def __init__(
+        self,
+        max_entries: int = VECTOR_STORE_CACHE_SIZE,
+        ttl: float = VECTOR_STORE_CACHE_TTL,
+        max_bytes: int = VECTOR_STORE_CACHE_MAX_BYTES,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._stores: "OrderedDict[str, _OpenStore]" = OrderedDict()
+        self._open_locks: Dict[str, threading.Lock] = {}
+        # Leased entries by the id of their store, including those already dropped from the cache
+        self._leased: Dict[int, _OpenStore] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0, "misses": 0, "opened": 0, "evicted": 0, "expired": 0, "invalidated": 0, "deferred_closes": 0,
+        }
+
+    def get(self, session_id: str, persist_directory: str, embedding_function: Embeddings) -> VectorStore:
+        """
+        Returns the open store of a session, opening it from `persist_directory` on a miss.
+        Sessions written as a flat index open as a FlatVectorStore, sessions in the shared
+        Chroma database as a collection of its client, and all others as their own Chroma database.
+
+        The store may be closed by a later eviction; to query it, use lease() instead.
+
+        Raises:
+            FileNotFoundError: If the session has no persisted vector store.
+        """
+        return self._get(session_id, persist_directory, embedding_function, leased=False)
+
+    def acquire(self, session_id: str, persist_directory: str, embedding_function: Embeddings) -> VectorStore:
+        """
+        Like get(), but also takes a lease on the store, which stays open until release() is
+        called for it, even if it is evicted meanwhile.
+
+        Raises:
+            FileNotFoundError: If the session has no persisted vector store.
+        """
+        return self._get(session_id, persist_directory, embedding_function, leased=True)
+
+    def release(self, store: VectorStore) -> None:
+        """Releases a lease taken by acquire(), closing the store if it left the cache meanwhile."""
+        with self._lock:
+            entry = self._leased.get(id(store))
+            if entry is None:
+                return
+            entry.leases -= 1
+            if entry.leases:
+                return
+            del self._leased[id(store)]
+            if entry.retired:
+                self._counters["deferred_closes"] += 1
+                self._close(entry.session_id, entry)
+
+    @contextmanager
+    def lease(self, session_id: str, persist_directory: str, embedding_function: Embeddings) -> Iterator[VectorStore]:
+        """Holds a lease on a session's store for the duration of a `with` block (see acquire())."""
+        store = self.acquire(session_id, persist_directory, embedding_function)
+        try:
+            yield store
+        finally:
+            self.release(store)
+
+    def _get(self, session_id: str, persist_directory: str, embedding_function: Embeddings, leased: bool) -> VectorStore:
+        with self._lock:
+            self._expire()
+            store = self._touch(session_id, leased)
+            if store is not None:
+                self._counters["hits"] += 1
+                return store
+            open_lock = self._open_locks.setdefault(session_id, threading.Lock())
+
+        with open_lock:
+            with self._lock:
+                # Another thread may have opened the store while this one waited
+                store = self._touch(session_id, leased)
+                if store is not None:
+                    self._counters["hits"] += 1
+                    return store
+                self._counters["misses"] += 1
+
+            if not os.path.isdir(persist_directory):
+                raise FileNotFoundError(f"Vector store for session {session_id} does not exist.")
+            if FlatVectorStore.exists(persist_directory):
+                client = None
+                store = FlatVectorStore(persist_directory, embedding_function)
+            elif is_shared_collection(persist_directory):
+                client = None
+                store = open_shared_store(persist_directory, embedding_function)
+            else:
+                client = chromadb.PersistentClient(path=persist_directory)
+                store = Chroma(client=client, collection_name=COLLECTION_NAME, embedding_function=embedding_function)
+            self._put(session_id, client, store, directory_size(persist_directory), leased)
+            log.info(f"Opened vector store for session '{session_id}'.")
+            return store
+
+    def put(self, session_id: str, client: Optional[chromadb.ClientAPI], store: VectorStore, size_bytes: int = 0) -> None:
+        """Registers an already open store for a session, closing the one it replaces."""
+        self._put(session_id, client, store, size_bytes, leased=False)
+
+    def _put(self, session_id: str, client: Optional[chromadb.ClientAPI], store: VectorStore, size_bytes: int, leased: bool) -> None:
+        with self._lock:
+            previous = self._stores.pop(session_id, None)
+            entry = self._stores[session_id] = _OpenStore(session_id, client, store, size_bytes)
+            if leased:
+                self._lease(entry)
+            self._counters["opened"] += 1
+            if previous is not None and (previous.client is None or previous.client is not client):
+                self._retire(session_id, previous)
+            self._evict()
+
+    def invalidate(self, session_id: str) -> bool:
+        """Closes a session's store, e.g. because it is being re-indexed or deleted. Returns True if one was open."""
+        with self._lock:
+            entry = self._stores.pop(session_id, None)
+            self._open_locks.pop(session_id, None)
+            if entry is None:
+                return False
+            self._counters["invalidated"] += 1
+            self._retire(session_id, entry)
+            return True
+
+    def clear(self) -> None:
+        """Closes every open store; leased ones are closed when released."""
+        with self._lock:
+            while self._stores:
+                session_id, entry = self._stores.popitem(last=False)
+                self._retire(session_id, entry)
+            self._open_locks.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number and size of the open stores, the leased ones, plus hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "open_stores": len(self._stores),
+                "open_bytes": sum(entry.size_bytes for entry in self._stores.values()),
+                "leased_stores": len(self._leased),
+                "retired_leased_stores": sum(entry.retired for entry in self._leased.values()),
+                **self._counters,
+            }
+
+    def _touch(self, session_id: str, leased: bool = False) -> Optional[VectorStore]:
+        entry = self._stores.get(session_id)
+        if entry is None:
+            return None
+        entry.last_used = time.monotonic()
+        self._stores.move_to_end(session_id)
+        if leased:
+            self._lease(entry)
+        return entry.store
+
+    def _lease(self, entry: _OpenStore) -> None:
+        entry.leases += 1
+        self._leased[id(entry.store)] = entry
+
+    def _retire(self, session_id: str, entry: _OpenStore) -> None:
+        """Closes an entry that left the cache, or defers that to its last release while it is leased."""
+        if entry.leases:
+            entry.retired = True
+            log.info(f"Vector store for session '{session_id}' is in use; it will be closed when released.")
+            return
+        self._close(session_id, entry)
+
+    def _expire(self) -> None:
+        if self.ttl <= 0:
+            return
+        deadline = time.monotonic() - self.ttl
+        # Entries are ordered by last use, so the expired ones are at the front
+        while self._stores:
+            session_id, entry = next(iter(self._stores.items()))
+            if entry.last_used > deadline:
+                break
+            del self._stores[session_id]
+            self._open_locks.pop(session_id, None)
+            self._counters["expired"] += 1
+            self._retire(session_id, entry)
+
+    def _evict(self) -> None:
+        def over_budget() -> bool:
+            if len(self._stores) > self.max_entries:
+                return True
+            total = sum(entry.size_bytes for entry in self._stores.values())
+            # The most recently used store always stays open, even if it alone exceeds the budget
+            return self.max_bytes > 0 and total > self.max_bytes and len(self._stores) > 1
+
+        while over_budget():
+            session_id, entry = self._stores.popitem(last=False)
+            self._open_locks.pop(session_id, None)
+            self._counters["evicted"] += 1
+            self._retire(session_id, entry)
+
+    @staticmethod
+    def _close(session_id: str, entry: _OpenStore) -> None:
+        if entry.client is None:
+            # Memory-mapped flat indexes are released with their last reference, and the shared
+            # client unloads the indexes of its least recently used collections beyond its cache size
+            log.info(f"Closed vector store for session '{session_id}'.")
+            return
+        try:
+            entry.client.close()
+            log.info(f"Closed vector store for session '{session_id}'.")
+        except Exception as e:
+            log.warning(f"Failed to close vector store for session '{session_id}': {e}")
+
+
+# Process-wide cache shared by all routes, tools and agents
+vector_store_cache = VectorStoreCache()
@@ -1,14 +1,41 @@
 import os
 import logging
-import asyncio # <-- 1. Import asyncio
-from typing import List
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Optional
+import chromadb
 from langchain_core.documents import Document
-from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
 from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from app.utils.ingestion_pipeline import IngestionPipeline, ChunkBatch
+from app.utils.flat_vector_store import FlatIndexWriter
+from app.utils.shared_chroma import SharedChromaWriter
+from app.utils.lexical_index import LexicalIndex, load_lexical_index
+from app.utils.hybrid_retriever import HybridRetriever, RETRIEVER_K
+from app.utils.vector_store_cache import COLLECTION_NAME, directory_size, get_embedding_handle, vector_store_cache
 
 log = logging.getLogger(__name__)
 SESSIONS_DIR = "sessions"
+# Storage engine of new vector stores: "chroma" (persistent Chroma database per session),
+# "chroma_shared" (one collection per session in a database shared by the whole process) or
+# "flat" (memory-mapped NumPy index, smaller and faster to open for typical repositories)
+VECTOR_STORE_ENGINE = os.getenv("VECTOR_STORE_ENGINE", "chroma").lower()
+
+
+class _ChromaWriter:
+    """Writes embedded chunks to the session's persistent Chroma collection."""
+    def __init__(self, directory: str):
+        self.client = chromadb.PersistentClient(path=directory)
+        self.collection = self.client.get_or_create_collection(COLLECTION_NAME)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[dict], embeddings: List[List[float]]) -> None:
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        self.client.close()
 
 class VectorStoreManager:
     """
@@ -24,58 +51,93 @@ class VectorStoreManager:
         self.session_id = session_id
         self.persist_directory = os.path.join(SESSIONS_DIR, self.session_id)
         
-        google_api_key = os.getenv("GOOGLE_API_KEY")
-        if not google_api_key:
-            raise ValueError("GOOGLE_API_KEY is not set. It is required for embeddings.")
-            
-        # --- THE DEFINITIVE FIX FOR PARALLELISM ---
-        # The GoogleGenerativeAIEmbeddings client requires an asyncio event loop to initialize,
-        # but LangGraph runs parallel nodes in standard threads which don't have one.
-        # This code block ensures an event loop is available in the current thread.
-        try:
-            # Check if an event loop is already running in this thread
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            # If not, create a new one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        # Now that an event loop is guaranteed to exist, we can safely initialize the client.
-        self.embedding_function = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=google_api_key
-        )
+        # Embedding clients are shared by all sessions and kept open between requests
+        embeddings = get_embedding_handle()
+        self.embedding_client = embeddings.client
+        self.embedding_function = embeddings.embedding_function
 
-        log.info(f"VectorStoreManager initialized for session '{session_id}' using Gemini embeddings.")
+        log.info(f"VectorStoreManager initialized for session '{session_id}' using '{embeddings.model_name}' embeddings.")
 
-    # ... (The rest of the file, create_vector_store and get_retriever, remains exactly the same)
-    def create_vector_store(self, documents: List[Document]) -> Chroma:
+    def create_vector_store(
+        self, documents: Iterable[Document], on_progress: Optional[Callable[[int], None]] = None
+    ) -> VectorStore:
+        """
+        Embeds and persists chunks through a streaming pipeline, so embedding batches are
+        written to the store (per VECTOR_STORE_ENGINE) while later
+        chunks are still being produced. `documents` may be
+        a lazy iterator; it is consumed once and never fully held in memory. A BM25 lexical
+        index of the same chunks is written next to the store.
+
+        Args:
+            documents (Iterable[Document]): The chunks to index.
+            on_progress (Optional[Callable[[int], None]]): Called with the size of each batch once it is persisted.
+        """
         log.info(f"Creating vector store for session '{self.session_id}'...")
-        if not documents:
+        # A handle opened before this (re-)ingestion would serve stale results
+        vector_store_cache.invalidate(self.session_id)
+        if VECTOR_STORE_ENGINE == "flat":
+            writer = FlatIndexWriter(self.persist_directory)
+        elif VECTOR_STORE_ENGINE == "chroma":
+            writer = _ChromaWriter(self.persist_directory)
+        elif VECTOR_STORE_ENGINE == "chroma_shared":
+            writer = SharedChromaWriter(self.persist_directory, self.session_id)
+        else:
+            raise ValueError(f"Unsupported VECTOR_STORE_ENGINE: {VECTOR_STORE_ENGINE}")
+        # Built alongside the vector store for exact identifier lookups
+        lexical_index = LexicalIndex()
+
+        def write_batch(batch: ChunkBatch) -> None:
+            writer.add(batch.ids, batch.texts, batch.metadatas, batch.embeddings)
+            lexical_index.add_documents(batch.ids, batch.texts)
+
+        pipeline = IngestionPipeline(self.embedding_function, write_batch, on_batch_written=on_progress)
+        try:
+            chunk_count = pipeline.run(documents)
+        except Exception:
+            writer.abort()
+            raise
+        writer.close()
+        if not chunk_count:
             log.warning("No documents provided to create vector store. It will be empty.")
-            vector_store = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embedding_function,
-            )
-            vector_store.persist()
+        lexical_index.save(self.persist_directory)
+        log.info(f"Successfully created and persisted vector store with {chunk_count} chunks.")
+        if self.embedding_client:
+            log.info(f"Embedding client metrics after indexing session '{self.session_id}': {self.embedding_client.metrics.snapshot()}")
+        # Keep the freshly written store open for the first chat turns
+        if isinstance(writer, _ChromaWriter):
+            vector_store = Chroma(client=writer.client, collection_name=COLLECTION_NAME, embedding_function=self.embedding_function)
+            vector_store_cache.put(self.session_id, writer.client, vector_store, directory_size(self.persist_directory))
             return vector_store
-        vector_store = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embedding_function,
-            persist_directory=self.persist_directory
-        )
-        log.info(f"Successfully created and persisted vector store with {len(documents)} chunks.")
-        return vector_store
+        return vector_store_cache.get(self.session_id, self.persist_directory, self.embedding_function)
 
-    def get_retriever(self) -> VectorStoreRetriever:
+    def get_retriever(self) -> BaseRetriever:
+        """
+        Returns a hybrid vector + BM25 retriever for the session, or a plain vector retriever
+        for sessions indexed before lexical indexes existed.
+        """
         log.info(f"Loading vector store for session '{self.session_id}' to create a retriever.")
         if not os.path.exists(self.persist_directory):
             log.error(f"Vector store not found for session '{self.session_id}' at path '{self.persist_directory}'")
             raise FileNotFoundError(f"Vector store for session {self.session_id} does not exist.")
-        vector_store = Chroma(
-            persist_directory=self.persist_directory,
-            embedding_function=self.embedding_function
-        )
-        retriever = vector_store.as_retriever(search_kwargs={"k": 5})
+        vector_store = vector_store_cache.get(self.session_id, self.persist_directory, self.embedding_function)
+        return self._build_retriever(vector_store)
+
+    @contextmanager
+    def lease_retriever(self) -> Iterator[BaseRetriever]:
+        """
+        Like get_retriever(), but keeps the vector store open until the `with` block exits,
+        even if the store cache evicts it meanwhile, so a query in flight is never cut off.
+        """
+        if not os.path.exists(self.persist_directory):
+            raise FileNotFoundError(f"Vector store for session {self.session_id} does not exist.")
+        with vector_store_cache.lease(self.session_id, self.persist_directory, self.embedding_function) as vector_store:
+            yield self._build_retriever(vector_store)
+
+    def _build_retriever(self, vector_store: VectorStore) -> BaseRetriever:
+        lexical_index = load_lexical_index(self.persist_directory)
+        if lexical_index is None:
+            retriever = vector_store.as_retriever(search_kwargs={"k": RETRIEVER_K})
+        else:
+            retriever = HybridRetriever(vector_store=vector_store, lexical_index=lexical_index)
         log.info("Successfully created retriever from vector store.")
         return retriever
\ No newline at end of file
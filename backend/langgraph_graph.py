@@ -1,18 +1,21 @@
 import logging
 import operator
-import json
-from typing import TypedDict, List, Annotated
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterator, TypedDict, List, Annotated, Tuple
 
-from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
+from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, ToolMessage
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 
-from app.llm import get_llm
-from app.agents import create_agent
-from app.agents.prompts import SUPERVISOR_PROMPT
+from app.agents import agent_cache, planner
 
 log = logging.getLogger(__name__)
 
+AGENT_NAMES = ["QA_Agent", "Debug_Agent", "Refactor_Agent", "Diagram_Agent"]
+# Characters of a tool result included in a tool_end event
+TOOL_OUTPUT_PREVIEW_CHARS = 300
+
 # --- 1. THE DEFINITIVE FIX FOR PARALLEL STATE ---
 
 def _join_agent_outputs(a: str, b: str) -> str:
@@ -28,18 +31,20 @@ class AgentState(TypedDict):
 
 # --- 2. Update agent_node to return a list for the reducer ---
 
-def agent_node(state: AgentState, agent_name: str) -> dict:
-    """A generic node that executes a single agent."""
+async def agent_node(state: AgentState, agent_name: str) -> dict:
+    """A generic node that executes a single agent. It awaits the agent's LLM and tool calls, so parallel agents and concurrent chats share the event loop."""
     session_id = state['session_id']
     log.info(f"Executing agent '{agent_name}' for session '{session_id}'")
-    agent_executor = create_agent(session_id, agent_name)
+    # Seen only by runs streamed with the "custom" mode (stream_graph_events)
+    get_stream_writer()({"event": "agent_start", "agent": agent_name})
+    agent_executor = await agent_cache.aget(session_id, agent_name)
     
     contextual_input = (
         f"Original user query: {state['messages'][0].content}\n\n"
         f"Context from previous step(s):\n{state['last_agent_output']}"
     )
 
-    response = agent_executor.invoke({
+    response = await agent_executor.ainvoke({
         "messages": [HumanMessage(content=contextual_input)]
     })
     
@@ -51,18 +56,13 @@ def agent_node(state: AgentState, agent_name: str) -> dict:
     return {"messages": [AIMessage(content=output)], "last_agent_output": output}
 # --- The rest of the file is correct and does NOT need to be changed ---
 
-def supervisor_node(state: AgentState) -> dict:
+async def supervisor_node(state: AgentState) -> dict:
     log.info("Supervisor/Planner running...")
-    llm = get_llm()
     last_human_message = state["messages"][-1].content
-    prompt = SUPERVISOR_PROMPT.format(messages=last_human_message)
-    supervisor_chain = llm | (lambda x: x.content.strip())
-    response = supervisor_chain.invoke(prompt)
-    log.info(f"Raw supervisor plan response: '{response}'")
-    try:
-        plan = json.loads(response.replace("'", '"'))
-        if not isinstance(plan, list): raise ValueError
-    except (json.JSONDecodeError, ValueError):
+    plan = await planner.aplan(last_human_message)
+    # The router consumes the plan in place, so streamed runs get a copy of it here
+    get_stream_writer()({"event": "plan", "plan": [list(step) for step in plan]})
+    if not plan:
         log.warning("Supervisor did not produce a valid plan. Ending run.")
         return {"plan": []}
     log.info(f"Supervisor created a plan: {plan}")
@@ -80,22 +80,21 @@ def create_graph() -> StateGraph:
     log.info("Creating LangGraph with parallel execution capabilities...")
     workflow = StateGraph(AgentState)
     workflow.add_node("supervisor", supervisor_node)
-    agent_names = ["QA_Agent", "Debug_Agent", "Refactor_Agent", "Diagram_Agent"]
-    for name in agent_names:
-        workflow.add_node(name, lambda state, name=name: agent_node(state, name))
+    for name in AGENT_NAMES:
+        workflow.add_node(name, partial(agent_node, agent_name=name))
     workflow.set_entry_point("supervisor")
-    workflow.add_conditional_edges("supervisor", plan_router, agent_names + [END])
-    for name in agent_names:
+    workflow.add_conditional_edges("supervisor", plan_router, AGENT_NAMES + [END])
+    for name in AGENT_NAMES:
         workflow.add_edge(name, "joiner")
     workflow.add_node("joiner", lambda state: {})
-    workflow.add_conditional_edges("joiner", plan_router, agent_names + [END])
+    workflow.add_conditional_edges("joiner", plan_router, AGENT_NAMES + [END])
     log.info("Parallel graph created successfully.")
     return workflow
 
 graph_app = create_graph().compile(checkpointer=MemorySaver())
 log.info("Graph compiled successfully.")
 
-def stream_graph(session_id: str, query: str):
+async def stream_graph(session_id: str, query: str) -> AsyncIterator[str]:
     log.info(f"Streaming graph for session '{session_id}' with query: '{query}'")
     graph_input = {
         "messages": [HumanMessage(content=query)], "session_id": session_id,
@@ -103,9 +102,8 @@ def stream_graph(session_id: str, query: str):
     }
     config = {"configurable": {"thread_id": session_id}}
     output_generated = False
-    for event in graph_app.stream(graph_input, config=config):
-        agent_names = ["QA_Agent", "Debug_Agent", "Refactor_Agent", "Diagram_Agent"]
-        for name in agent_names:
+    async for event in graph_app.astream(graph_input, config=config):
+        for name in AGENT_NAMES:
             if name in event:
                 node_output = event[name]
                 if messages := node_output.get("messages"):
@@ -114,4 +112,73 @@ def stream_graph(session_id: str, query: str):
                     break
     if not output_generated:
         log.warning("Graph execution finished with no agent output.")
-        yield "The request was processed, but no valid plan was created. Please try rephrasing."
\ No newline at end of file
+        yield "The request was processed, but no valid plan was created. Please try rephrasing."
+
+async def stream_graph_events(session_id: str, query: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Runs the graph and yields its progress as it happens, as dicts with an "event" key:
+
+    - plan: the supervisor's plan ("plan").
+    - agent_start / agent_end: an agent began, or finished with its final "output".
+    - token: a piece of an agent's LLM response ("agent", "text"), as the model produces it.
+    - tool_start / tool_end: an agent called a tool ("agent", "tool", "args"), or got its result ("output", shortened).
+    - notice: the run ended without any agent output ("text").
+
+    Tokens and tool events come from the agents' own graphs, streamed as subgraphs of this one.
+    """
+    log.info(f"Streaming graph events for session '{session_id}' with query: '{query}'")
+    graph_input = {
+        "messages": [HumanMessage(content=query)], "session_id": session_id,
+        "plan": [], "last_agent_output": [],
+    }
+    config = {"configurable": {"thread_id": session_id}}
+    output_generated = False
+    async for namespace, mode, chunk in graph_app.astream(
+        graph_input, config=config, stream_mode=["custom", "messages", "updates"], subgraphs=True
+    ):
+        agent = _agent_of(namespace)
+        if mode == "custom":
+            yield chunk
+        elif mode == "messages":
+            message, _ = chunk
+            text = _message_text(message) if agent and isinstance(message, AIMessage) else ""
+            if text:
+                yield {"event": "token", "agent": agent, "text": text}
+        elif not namespace:
+            for node, update in chunk.items():
+                if node in AGENT_NAMES:
+                    output_generated = True
+                    yield {"event": "agent_end", "agent": node, "output": update["messages"][-1].content}
+        elif agent:
+            for update in chunk.values():
+                for message in (update or {}).get("messages", []) if isinstance(update, dict) else []:
+                    for event in _tool_events(agent, message):
+                        yield event
+    if not output_generated:
+        log.warning("Graph execution finished with no agent output.")
+        yield {"event": "notice", "text": "The request was processed, but no valid plan was created. Please try rephrasing."}
+
+def _agent_of(namespace: Tuple[str, ...]) -> str:
+    """Returns the agent whose subgraph emitted an event; namespaces look like ('QA_Agent:<task id>', ...)."""
+    name = namespace[0].split(":")[0] if namespace else ""
+    return name if name in AGENT_NAMES else ""
+
+def _message_text(message: AIMessage) -> str:
+    """Returns the text of a message, whose content some providers split into typed blocks."""
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in message.content
+        if not isinstance(block, dict) or block.get("type") == "text"
+    )
+
+def _tool_events(agent: str, message: BaseMessage) -> Iterator[Dict[str, Any]]:
+    if isinstance(message, AIMessage):
+        for call in message.tool_calls:
+            yield {"event": "tool_start", "agent": agent, "tool": call["name"], "args": call["args"]}
+    elif isinstance(message, ToolMessage):
+        output = str(message.content)
+        if len(output) > TOOL_OUTPUT_PREVIEW_CHARS:
+            output = output[:TOOL_OUTPUT_PREVIEW_CHARS] + "..."
+        yield {"event": "tool_end", "agent": agent, "tool": message.name, "output": output}
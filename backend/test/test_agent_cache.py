@@ -0,0 +1,37 @@
+import importlib
+
+from app.agents import AgentCache
+
+# The package re-exports the `agent_cache` instance under the module's name
+agent_cache_module = importlib.import_module("app.agents.agent_cache")
+
+
+def test_agents_are_reused_per_session_type_and_llm_config(monkeypatch):
+    built = []
+    monkeypatch.setattr(agent_cache_module, "create_agent", lambda session_id, agent_type: built.append((session_id, agent_type)) or object())
+    config = {"key": ("openai", "aaa")}
+    monkeypatch.setattr(agent_cache_module, "llm_config_key", lambda: config["key"])
+    cache = AgentCache(max_entries=2)
+
+    first = cache.get("s1", "Debug")
+    assert cache.get("s1", "Debug") is first
+    assert cache.get("s1", "Refactor") is not first
+    assert len(built) == 2
+
+    # A different provider or API key builds a new agent
+    config["key"] = ("groq", "bbb")
+    assert cache.get("s1", "Debug") is not first
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evicted"], stats["cached_agents"]) == (1, 3, 1, 2)
+
+
+def test_deleted_sessions_drop_their_agents(monkeypatch):
+    monkeypatch.setattr(agent_cache_module, "create_agent", lambda session_id, agent_type: object())
+    monkeypatch.setattr(agent_cache_module, "llm_config_key", lambda: ("openai", "aaa"))
+    cache = AgentCache()
+    cache.get("s1", "Debug")
+    cache.get("s1", "Diagram")
+    cache.get("s2", "Debug")
+
+    assert cache.invalidate_session("s1") == 2
+    assert cache.stats()["cached_agents"] == 1
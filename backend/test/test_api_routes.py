@@ -1,7 +1,13 @@
+import os
+import asyncio
 import pytest
 from httpx import AsyncClient
 from unittest.mock import patch
 
+from app.utils.symbol_index import load_symbol_index
+from app.routes.chat import chat_with_agent_stream
+from app.utils.session_registry import SessionQuotaError, session_registry
+
 # Mark all tests in this file as asyncio tests
 pytestmark = pytest.mark.asyncio
 
@@ -58,6 +64,51 @@ async def test_chat_with_agent_success(test_client: AsyncClient, mock_llm_and_em
     assert response.text == "This is a mocked response."
 
 
+async def test_chat_stream_sends_events_as_they_happen(test_client: AsyncClient):
+    """The streaming chat endpoint forwards graph events as SSE and ends with the timing summary."""
+    session_id = "stream-session"
+    os.makedirs(f"sessions/{session_id}", exist_ok=True)
+
+    async def mock_events(*args, **kwargs):
+        yield {"event": "agent_start", "agent": "QA_Agent"}
+        yield {"event": "token", "agent": "QA_Agent", "text": "Hello"}
+        yield {"event": "agent_end", "agent": "QA_Agent", "output": "Hello"}
+
+    with patch('app.routes.chat.stream_graph_events', new=mock_events):
+        response = await test_client.post(f"/api/chat/{session_id}/stream", json={"query": "test query"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events == ["event: agent_start", "event: token", "event: agent_end", "event: done"]
+    assert 'data: {"agent": "QA_Agent", "text": "Hello"}' in response.text
+    assert '"first_token_ms": ' in response.text.split("event: done")[1]
+
+    missing = await test_client.post("/api/chat/non-existent-session/stream", json={"query": "test query"})
+    assert missing.status_code == 404
+
+
+async def test_chat_stream_leases_the_session_only_while_streaming(test_client: AsyncClient):
+    """A streaming response that is never iterated, e.g. after an early disconnect, holds no lease."""
+    session_id = "stream-lease-session"
+    os.makedirs(f"sessions/{session_id}", exist_ok=True)
+
+    def leases():
+        return {s["session_id"]: s["active_leases"] for s in session_registry.list()}[session_id]
+
+    response = await chat_with_agent_stream(session_id, "test query")
+    assert leases() == 0
+
+    async def mock_events(*args, **kwargs):
+        assert leases() == 1
+        yield {"event": "token", "agent": "QA_Agent", "text": "Hello"}
+
+    with patch('app.routes.chat.stream_graph_events', new=mock_events):
+        events = [event async for event in response.body_iterator]
+    assert events[-1].startswith("event: done")
+    assert leases() == 0
+
+
 async def test_chat_with_invalid_session(test_client: AsyncClient):
     """
     Test that the chat endpoint returns a 404 for a non-existent session.
@@ -75,4 +126,101 @@ async def test_chat_with_bad_request(test_client: AsyncClient):
     session_id = "some-session"
     # Missing the "query" key
     response = await test_client.post(f"/api/chat/{session_id}", json={"bad_key": "test query"})
-    assert response.status_code == 422 # Unprocessable Entity
\ No newline at end of file
+    assert response.status_code == 422 # Unprocessable Entity
+
+async def test_upload_zip_runs_in_background(test_client: AsyncClient, sample_codebase_zip: str):
+    """
+    Test that a ZIP upload returns immediately and that the ingestion job's
+    progress can be followed through the status endpoint.
+    """
+    with patch('app.routes.chat.VectorStoreManager') as mocked_vsm:
+        # Consume the lazy chunk stream the way the real vector store does
+        mocked_vsm.return_value.create_vector_store.side_effect = lambda chunks, on_progress=None: list(chunks)
+        with open(sample_codebase_zip, "rb") as f:
+            files = {"file": ("test_repo.zip", f, "application/zip")}
+            response = await test_client.post("/api/repo/upload_zip", files=files)
+
+        assert response.status_code == 202
+        session_id = response.json()["session_id"]
+
+        for _ in range(100):
+            status = (await test_client.get(f"/api/repo/{session_id}/status")).json()
+            if status["stage"] in ("completed", "failed"):
+                break
+            await asyncio.sleep(0.05)
+
+    assert status["stage"] == "completed", status
+    assert status["files_processed"] == 2
+    assert status["chunks_processed"] >= 2
+    mocked_vsm.return_value.create_vector_store.assert_called_once()
+    # The symbol index is built from the same pass over the files
+    symbols = load_symbol_index(os.path.join("sessions", session_id))
+    assert [symbol.path for symbol in symbols.find("helper_function")] == ["utils/helpers.py"]
+
+
+async def test_failed_ingestion_deletes_the_session_through_the_registry(test_client: AsyncClient, sample_codebase_zip: str):
+    """A job that fails, e.g. over its quota, deletes the session through the registry, which also closes its caches."""
+    def create_store(chunks, on_progress=None):
+        # The job may run before the upload response arrives, so the id comes from the manager
+        list(chunks)
+        os.makedirs(os.path.join("sessions", mocked_vsm.call_args.args[0]), exist_ok=True)
+
+    with patch('app.routes.chat.VectorStoreManager') as mocked_vsm, \
+            patch('app.routes.chat.session_registry.check_quota', side_effect=SessionQuotaError("over quota")), \
+            patch('app.utils.session_registry.vector_store_cache.invalidate') as invalidate:
+        mocked_vsm.return_value.create_vector_store.side_effect = create_store
+        with open(sample_codebase_zip, "rb") as f:
+            files = {"file": ("test_repo.zip", f, "application/zip")}
+            response = await test_client.post("/api/repo/upload_zip", files=files)
+        session_id = response.json()["session_id"]
+
+        for _ in range(100):
+            status = (await test_client.get(f"/api/repo/{session_id}/status")).json()
+            if status["stage"] in ("completed", "failed"):
+                break
+            await asyncio.sleep(0.05)
+
+    assert status["stage"] == "failed", status
+    assert status["errors"] == ["over quota"]
+    assert not os.path.exists(os.path.join("sessions", session_id))
+    assert not os.path.exists(os.path.join("sessions_code", session_id))
+    invalidate.assert_called_once_with(session_id)
+
+
+async def test_status_for_unknown_session(test_client: AsyncClient):
+    response = await test_client.get("/api/repo/unknown-session/status")
+    assert response.status_code == 404
+
+
+async def test_admin_lists_and_purges_sessions(test_client: AsyncClient, monkeypatch):
+    monkeypatch.setattr("app.routes.admin.ADMIN_TOKEN", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    session_id = "admin-session"
+    os.makedirs(f"sessions_code/{session_id}", exist_ok=True)
+    with open(f"sessions_code/{session_id}/main.py", "w") as f:
+        f.write("print('hello')\n")
+
+    listing = (await test_client.get("/api/admin/sessions", headers=headers)).json()
+    assert session_id in [session["session_id"] for session in listing["sessions"]]
+
+    response = await test_client.delete(f"/api/admin/sessions/{session_id}", headers=headers)
+    assert response.json() == {"session_id": session_id, "status": "deleted"}
+    assert not os.path.exists(f"sessions_code/{session_id}")
+    assert (await test_client.delete(f"/api/admin/sessions/{session_id}", headers=headers)).status_code == 404
+
+
+async def test_admin_endpoints_are_refused_without_a_configured_token(test_client: AsyncClient, monkeypatch):
+    session_id = "admin-refused-session"
+    os.makedirs(f"sessions_code/{session_id}", exist_ok=True)
+
+    monkeypatch.setattr("app.routes.admin.ADMIN_TOKEN", "")
+    for headers in ({}, {"X-Admin-Token": ""}):
+        assert (await test_client.get("/api/admin/sessions", headers=headers)).status_code == 404
+        assert (await test_client.delete(f"/api/admin/sessions/{session_id}", headers=headers)).status_code == 404
+        assert (await test_client.post("/api/admin/sessions/gc", headers=headers)).status_code == 404
+        assert (await test_client.get("/api/admin/cache", headers=headers)).status_code == 404
+
+    monkeypatch.setattr("app.routes.admin.ADMIN_TOKEN", "secret")
+    assert (await test_client.get("/api/admin/sessions")).status_code == 403
+    assert (await test_client.get("/api/admin/sessions", headers={"X-Admin-Token": "wrong"})).status_code == 403
+    assert os.path.isdir(f"sessions_code/{session_id}")
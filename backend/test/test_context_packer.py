@@ -0,0 +1,34 @@
+from langchain_core.documents import Document
+
+from app.utils.context_packer import count_tokens, pack_context
+from app.utils.file_handler import _split_file
+
+CONTENT = "".join(f"def handler_{i}(request):\n    return respond(request, status={i})\n\n" for i in range(120))
+
+
+def test_overlapping_chunks_are_merged_into_one_line_ranged_span():
+    chunks = _split_file("app/handlers.py", CONTENT).chunks
+    assert len(chunks) >= 3 and chunks[1].metadata["start_line"] < chunks[0].metadata["end_line"]
+    other = Document(page_content="x = 1", metadata={"source": "app/config.py", "start_index": 0, "start_line": 1, "end_line": 1})
+    # Ranked out of file order, with a duplicate and a chunk of another file in between
+    packed = pack_context([chunks[1], other, chunks[0], chunks[1], chunks[2]], budget=0)
+
+    assert [(span.source, span.start_line) for span in packed.spans] == [("app/handlers.py", 1), ("app/config.py", 1)]
+    merged = packed.spans[0]
+    lines = CONTENT.split("\n")
+    assert merged.text == "\n".join(lines[:merged.end_line])
+    assert merged.end_line == chunks[2].metadata["end_line"]
+    assert packed.text.startswith(f"### app/handlers.py (lines 1-{merged.end_line})\n```\ndef handler_0(request):")
+    assert packed.saved_tokens > 0
+
+
+def test_spans_beyond_the_budget_are_cut_to_whole_lines():
+    chunks = _split_file("app/handlers.py", CONTENT).chunks
+    far = chunks[-1]
+    packed = pack_context([chunks[0], far], budget=count_tokens(CONTENT[:2000]) // 2)
+
+    assert len(packed.spans) == 1
+    span = packed.spans[0]
+    assert span.start_line == 1 and span.end_line < chunks[0].metadata["end_line"]
+    assert span.text == "\n".join(CONTENT.split("\n")[:span.end_line])
+    assert packed.packed_tokens <= count_tokens(CONTENT[:2000]) // 2
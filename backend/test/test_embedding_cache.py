@@ -0,0 +1,48 @@
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+from app.utils.embedding_cache import EmbeddingCache, CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """A deterministic fake embedding model that records how many texts it embedded."""
+    def __init__(self):
+        self.embedded = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded += len(texts)
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def test_cached_embeddings_skip_known_chunks(tmp_path):
+    cache = EmbeddingCache(cache_dir=str(tmp_path), max_bytes=1024 * 1024)
+    provider = CountingEmbeddings()
+    embeddings = CachedEmbeddings(provider, model_name="fake-model", cache=cache)
+
+    first = embeddings.embed_documents(["def a(): pass", "def b(): pass", "def a(): pass"])
+    assert provider.embedded == 2
+
+    # A second session indexing the same code should not call the provider at all
+    second = CachedEmbeddings(provider, model_name="fake-model", cache=cache).embed_documents(["def b(): pass", "def a(): pass"])
+    assert provider.embedded == 2
+    assert second == [first[1], first[0]]
+    assert cache.stats()["hits"] == 2
+
+    # Vectors are only shared between sessions using the same embedding model
+    CachedEmbeddings(provider, model_name="other-model", cache=cache).embed_documents(["def a(): pass"])
+    assert provider.embedded == 3
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    vector_size = 3 * 4  # three float32 values
+    cache = EmbeddingCache(cache_dir=str(tmp_path), max_bytes=vector_size * 3)
+    cache.put_many("m", ["a", "b", "c"], [[1.0, 2.0, 3.0]] * 3)
+    cache.get_many("m", ["a"])  # "a" becomes the most recently used entry
+    cache.put_many("m", ["d"], [[4.0, 5.0, 6.0]])
+
+    assert cache.stats()["evictions"] >= 1
+    assert cache.get_many("m", ["a", "d"]) == [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+    assert cache.get_many("m", ["b"]) == [None]
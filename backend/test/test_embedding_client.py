@@ -0,0 +1,87 @@
+import time
+import asyncio
+import pytest
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+from app.utils.embedding_client import BatchedEmbeddings, TokenBucket, is_retryable
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FlakyEmbeddings(Embeddings):
+    """Fails the first `failures` requests with a 429, then embeds texts by their length."""
+    def __init__(self, failures: int = 0, error: Exception = RateLimitError("Too Many Requests")):
+        self.failures = failures
+        self.error = error
+        self.batches: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.batches.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def test_batches_preserve_order():
+    provider = FlakyEmbeddings()
+    client = BatchedEmbeddings(provider, model_name="test-order", batch_size=3, max_concurrency=4)
+    texts = ["a" * i for i in range(10)]
+
+    assert client.embed_documents(texts) == [[float(i)] for i in range(10)]
+    # Batches may complete in any order, but the vectors come back in input order
+    assert sorted(map(len, provider.batches)) == [1, 3, 3, 3]
+    assert client.metrics.snapshot()["requests"] == 4
+
+
+def test_retries_rate_limit_errors(monkeypatch):
+    monkeypatch.setattr("app.utils.embedding_client.EMBED_RETRY_BASE_DELAY", 0.001)
+    provider = FlakyEmbeddings(failures=2)
+    client = BatchedEmbeddings(provider, model_name="test-retry", max_retries=3)
+
+    assert client.embed_query("abc") == [3.0]
+    assert client.metrics.snapshot()["retries"] == 2
+
+
+def test_does_not_retry_client_errors():
+    provider = FlakyEmbeddings(failures=1, error=ValueError("invalid api key"))
+    client = BatchedEmbeddings(provider, model_name="test-no-retry", max_retries=3)
+
+    with pytest.raises(ValueError):
+        client.embed_documents(["abc"])
+    assert client.metrics.snapshot()["failures"] == 1
+
+
+def test_is_retryable_uses_status_codes_and_provider_phrases():
+    assert is_retryable(Exception("Error embedding content: 503 The service is currently unavailable."))
+    assert not is_retryable(Exception("400 API key not valid"))
+    # Numbers in a message are not statuses
+    assert not is_retryable(ValueError("Input of 500 tokens exceeds the 429 token chunk limit"))
+
+    class RateLimited(Exception):
+        status_code = 429
+
+    try:
+        try:
+            raise RateLimited("slow down")
+        except RateLimited as e:
+            raise RuntimeError("Error embedding content") from e
+    except RuntimeError as wrapped:
+        assert is_retryable(wrapped)
+
+
+def test_token_bucket_paces_requests():
+    async def take(bucket, count):
+        for _ in range(count):
+            await bucket.acquire()
+
+    bucket = TokenBucket(rate=100, capacity=1)
+    started = time.perf_counter()
+    asyncio.run(take(bucket, 11))
+    assert time.perf_counter() - started >= 0.09
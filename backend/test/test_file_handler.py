@@ -0,0 +1,106 @@
+import io
+import os
+import zipfile
+import pytest
+
+from app.utils import file_handler
+from app.utils.file_handler import (
+    load_and_chunk_codebase, iter_codebase_chunks, extract_zip_stream, ArchiveLimitError
+)
+from app.utils.file_filters import FilterStats
+
+
+@pytest.fixture(scope="function")
+def sample_codebase(tmp_path):
+    """Creates a small codebase on disk with nested directories and an unsupported file."""
+    for i in range(6):
+        package = tmp_path / f"pkg_{i}"
+        package.mkdir()
+        (package / "module.py").write_text("".join(f"def func_{i}_{j}():\n    return {j}\n\n" for j in range(80)))
+        (package / "notes.txt").write_text("not a supported file")
+    (tmp_path / "README.md").write_text("# Sample\n")
+    return str(tmp_path)
+
+
+def test_load_and_chunk_codebase_skips_unsupported_files(sample_codebase):
+    chunks = load_and_chunk_codebase(sample_codebase, workers=1)
+    sources = {chunk.metadata["source"] for chunk in chunks}
+    assert "README.md" in sources
+    assert os.path.join("pkg_0", "module.py") in sources
+    assert not any(source.endswith(".txt") for source in sources)
+
+
+def test_parallel_ingestion_is_deterministic(sample_codebase, monkeypatch):
+    """Sharding across worker processes must not change chunk order or metadata."""
+    monkeypatch.setattr(file_handler, "INGEST_BATCH_SIZE", 1)
+    sequential = load_and_chunk_codebase(sample_codebase, workers=1)
+    parallel = list(iter_codebase_chunks(sample_codebase, workers=2))
+
+    assert [(c.metadata, c.page_content) for c in parallel] == [(c.metadata, c.page_content) for c in sequential]
+
+
+def _make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_extract_zip_stream_writes_every_file_but_ignored_ones(tmp_path):
+    archive = _make_zip({
+        "src/app.py": "print('hi')\n",
+        "README": "Read me first\n",
+        "docs/logo.png": b"\x89PNG...",
+        "node_modules/lib/index.js": "module.exports = {}\n",
+        "../escape.py": "print('outside')\n",
+    })
+    stats = FilterStats()
+    extracted = extract_zip_stream(archive, str(tmp_path / "code"), stats)
+
+    # Unsupported files are extracted too, for the file tree and the agent tools; only chunking filters them
+    assert extracted == ["README", os.path.join("docs", "logo.png"), os.path.join("src", "app.py")]
+    assert not (tmp_path / "code" / "node_modules").exists()
+    assert not (tmp_path / "escape.py").exists()
+    assert stats.to_dict()["by_reason"] == {"ignored": 1}
+    assert [chunk.metadata["source"] for chunk in iter_codebase_chunks(str(tmp_path / "code"), workers=1)] == [
+        os.path.join("src", "app.py")
+    ]
+
+
+def test_extract_zip_stream_rejects_zip_bombs(tmp_path, monkeypatch):
+    bomb = _make_zip({"bomb.py": "0" * 1_000_000})
+    with pytest.raises(ArchiveLimitError):
+        extract_zip_stream(bomb, str(tmp_path))
+
+    monkeypatch.setattr(file_handler, "ZIP_MAX_TOTAL_BYTES", 10)
+    too_large = _make_zip({"big.py": "x = 1\n" * 10}, compression=zipfile.ZIP_STORED)
+    with pytest.raises(ArchiveLimitError):
+        extract_zip_stream(too_large, str(tmp_path))
+
+    monkeypatch.setattr(file_handler, "ZIP_MAX_MEMBERS", 1)
+    with pytest.raises(ArchiveLimitError):
+        extract_zip_stream(_make_zip({"a.py": "", "b.py": ""}), str(tmp_path))
+
+
+def test_ingestion_skips_ignored_generated_and_oversized_files(tmp_path):
+    (tmp_path / ".gitignore").write_text("secrets/\n*.local.py\n")
+    (tmp_path / "node_modules" / "lib").mkdir(parents=True)
+    (tmp_path / "node_modules" / "lib" / "index.js").write_text("module.exports = 1;\n")
+    (tmp_path / "secrets").mkdir()
+    (tmp_path / "secrets" / "keys.py").write_text("KEY = 'x'\n")
+    (tmp_path / "settings.local.py").write_text("DEBUG = True\n")
+    (tmp_path / "app.min.js").write_text("var a=1;" * 10)
+    (tmp_path / "bundle.js").write_text("var a=1;" * 2000)
+    (tmp_path / "schema_pb2.py").write_text("# Generated by the protocol buffer compiler.  DO NOT EDIT!\nX = 1\n")
+    (tmp_path / "package.json").write_text("{" + '"a": 1,' * 100_000 + "}")
+    (tmp_path / "app.py").write_text("def main():\n    return 1\n")
+
+    stats = FilterStats()
+    chunks = list(iter_codebase_chunks(str(tmp_path), workers=1, stats=stats))
+
+    assert {chunk.metadata["source"] for chunk in chunks} == {"app.py"}
+    report = stats.to_dict()
+    assert report["directories"] == {"ignored": 1, "gitignored": 1}
+    assert report["by_reason"] == {"gitignored": 1, "ignored": 1, "minified": 1, "generated": 1, "too_large": 1}
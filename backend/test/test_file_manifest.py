@@ -0,0 +1,63 @@
+import pytest
+
+from app.tools.list_files import ListFilesTool
+from app.utils.file_manifest import FileManifest
+
+
+@pytest.fixture
+def tool(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.tools.list_files.SESSIONS_CODE_DIR", str(tmp_path / "sessions_code"))
+    monkeypatch.setattr("app.tools.list_files.SESSIONS_DIR", str(tmp_path / "sessions"))
+    root = tmp_path / "sessions_code" / "s1"
+    files = {
+        "README.md": "# demo\n",
+        "src/app.py": "print('app')\n",
+        "src/api/routes.py": "x = 1\n",
+        "src/api/v1/users.py": "y = 2\n",
+        "src/api-docs/index.html": "<html></html>\n",
+        "tests/test_app.py": "def test(): pass\n",
+        ".git/HEAD": "ref: refs/heads/main\n",
+    }
+    for path, content in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content)
+    (tmp_path / "sessions" / "s1").mkdir(parents=True)
+    return ListFilesTool(session_id="s1")
+
+
+def test_lists_one_level_with_directory_summaries(tool, tmp_path):
+    assert tool.invoke({"directory": "."}).splitlines() == [
+        "README.md  7 B  markdown",
+        "src/ (4 files, 39 B)",
+        "tests/ (1 file, 17 B)",
+    ]
+    # The manifest is built once and kept next to the session's indexes
+    assert (tmp_path / "sessions" / "s1" / "file_manifest.json").exists()
+    assert tool.invoke({"directory": "src/api"}).splitlines() == [
+        "src/api/routes.py  6 B  python",
+        "src/api/v1/ (1 file, 6 B)",
+    ]
+    assert tool.invoke({"directory": "missing"}) == "Error: 'missing' is not a valid directory."
+    assert tool.invoke({"directory": "../s2"}).startswith("Error: Access denied")
+
+
+def test_recursive_glob_depth_and_truncation(tool):
+    assert tool.invoke({"directory": "src", "recursive": True, "max_depth": 2}).splitlines() == [
+        "src/api-docs/index.html  14 B  html",
+        "src/api/routes.py  6 B  python",
+        "src/api/v1/ (1 file, 6 B)",
+        "src/app.py  13 B  python",
+    ]
+    assert tool.invoke({"glob": "*.py"}).count("python") == 4
+    assert tool.invoke({"directory": "src", "glob": "api/**/*.py"}).splitlines() == [
+        "src/api/routes.py  6 B  python",
+        "src/api/v1/users.py  6 B  python",
+    ]
+    truncated = tool.invoke({"recursive": True, "max_entries": 2}).splitlines()
+    assert len(truncated) == 3 and truncated[-1].startswith("... 4 more entries not shown (6 files in total)")
+
+
+def test_worktree_git_file_is_left_out(tmp_path):
+    (tmp_path / ".git").write_text("gitdir: /srv/git_cache/abc/worktrees/s1\n")
+    (tmp_path / "main.py").write_text("print()\n")
+    assert [entry.path for entry in FileManifest.build(str(tmp_path)).entries] == ["main.py"]
@@ -0,0 +1,102 @@
+import os
+import time
+import threading
+import pytest
+
+from app.tools.file_reader import ReadFileTool
+from app.tools.read_files import ReadFilesTool
+from app.utils.file_cache import file_cache
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.tools.file_reader.SESSIONS_CODE_DIR", str(tmp_path / "sessions_code"))
+    monkeypatch.setattr("app.tools.file_reader.SESSIONS_DIR", str(tmp_path / "sessions"))
+    code_dir = tmp_path / "sessions_code" / "s1"
+    (code_dir / "pkg").mkdir(parents=True)
+    (code_dir / "pkg" / "small.py").write_text("import os\n\ndef main():\n    return os.getcwd()\n")
+    body = "".join(f"def function_{i}(value):\n    return value * {i}\n\n" for i in range(5000))
+    (code_dir / "pkg" / "big.py").write_text(body)
+    yield ReadFileTool(session_id="s1"), code_dir
+    file_cache.invalidate_session("s1")
+
+
+def test_line_ranges_and_cache_invalidation(session):
+    tool, code_dir = session
+    assert tool.invoke({"file_path": "pkg/small.py"}) == "import os\n\ndef main():\n    return os.getcwd()\n"
+    assert tool.invoke({"file_path": "pkg/small.py", "start_line": 3, "end_line": 4}) == (
+        "Lines 3-4 of 4 in 'pkg/small.py':\n    3 | def main():\n    4 |     return os.getcwd()"
+    )
+    hits = file_cache.stats()["hits"]
+    assert tool.invoke({"file_path": "pkg/small.py", "start_line": 4}).endswith("4 |     return os.getcwd()")
+    assert file_cache.stats()["hits"] == hits + 1
+
+    path = code_dir / "pkg" / "small.py"
+    path.write_text("print('changed')\n")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10 ** 9))
+    assert tool.invoke({"file_path": "pkg/small.py"}) == "print('changed')\n"
+
+    assert tool.invoke({"file_path": "../s2/secret.py"}).startswith("Error: Access denied")
+    assert tool.invoke({"file_path": "pkg/missing.py"}) == "Error: File 'pkg/missing.py' not found."
+
+    (code_dir / "pkg" / "__init__.py").write_text("")
+    assert tool.invoke({"file_path": "pkg/__init__.py"}) == ""
+    assert tool.invoke({"file_path": "pkg/__init__.py", "start_line": 1}) == "'pkg/__init__.py' is empty (0 lines)."
+    assert tool.invoke({"file_path": "pkg/__init__.py", "start_line": 1, "end_line": 20}) == "'pkg/__init__.py' is empty (0 lines)."
+
+
+@pytest.mark.asyncio
+async def test_oversized_file_returns_outline_and_head(session):
+    tool, _ = session
+    output = await tool.ainvoke({"file_path": "pkg/big.py"})
+
+    assert output.startswith("'pkg/big.py' is too large to read at once (15000 lines")
+    assert "  4-5  function function_1" in output
+    assert "... (4800 more definitions)" in output
+    assert "  150 | " in output and "  151 | " not in output
+    assert len(output) < 20000
+
+
+def test_read_files_returns_several_files_within_the_budget(session, monkeypatch):
+    tool, _ = session
+    files = ReadFilesTool(session_id="s1")
+    output = files.invoke({"files": [
+        {"file_path": "pkg/small.py"},
+        {"file_path": "pkg/big.py", "start_line": 4, "end_line": 5},
+        {"file_path": "../s2/secret.py"},
+        {"file_path": "pkg/small.py"},
+    ]})
+    assert output == (
+        "==== pkg/small.py ====\nimport os\n\ndef main():\n    return os.getcwd()\n\n\n"
+        "==== pkg/big.py ====\nLines 4-5 of 15000 in 'pkg/big.py':\n    4 | def function_1(value):\n    5 |     return value * 1\n"
+        "... (14995 more lines; continue from start_line=6)\n\n"
+        "==== ../s2/secret.py ====\nError: Access denied. You can only access files within the codebase."
+    )
+
+    monkeypatch.setattr("app.tools.read_files.READ_FILES_MAX_CHARS", 30)
+    output = files.invoke({"files": [{"file_path": "pkg/small.py"}, {"file_path": "pkg/big.py"}]})
+    assert output.startswith("==== pkg/small.py ====\nimport os\n\ndef main():\n... (cut to fit the response")
+    assert output.endswith("Not included, the response is full; read these separately: pkg/big.py")
+
+
+@pytest.mark.asyncio
+async def test_read_files_async_respects_the_concurrency_bound(session, monkeypatch):
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def slow_read(self, file_path, start_line=None, end_line=None):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return file_path
+
+    monkeypatch.setattr("app.tools.read_files.READ_FILES_CONCURRENCY", 2)
+    monkeypatch.setattr(ReadFileTool, "_run", slow_read)
+    output = await ReadFilesTool(session_id="s1").ainvoke({"files": [{"file_path": f"f{i}.py"} for i in range(8)]})
+
+    assert output.count("====\n") == 8
+    assert peak == 2
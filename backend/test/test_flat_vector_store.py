@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from app.llm.local_embeddings import HashingEmbeddings
+from app.utils.flat_vector_store import FlatIndexWriter, FlatVectorStore
+from app.utils.vector_store_manager import VectorStoreManager
+
+TEXTS = [
+    "def parse_config(path): return yaml.safe_load(open(path))",
+    "class HttpClient: def send_request(self, url): return requests.get(url)",
+    "def render_template(name, context): return env.get_template(name).render(context)",
+    "def clone_github_repo(repo_url, clone_to): Repo.clone_from(repo_url, clone_to)",
+    "def load_and_chunk_codebase(repo_path): return list(iter_codebase_chunks(repo_path))",
+]
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_flat_index_matches_exact_search(tmp_path, dtype):
+    embeddings = HashingEmbeddings(dim=64)
+    vectors = embeddings.embed_documents(TEXTS)
+    writer = FlatIndexWriter(str(tmp_path), dtype=dtype)
+    writer.add(["a", "b"], TEXTS[:2], [{"source": "a.py"}, {"source": "b.py"}], vectors[:2])
+    writer.add(["c", "d", "e"], TEXTS[2:], [{"source": f"{i}.py"} for i in "cde"], vectors[2:])
+    writer.close()
+
+    store = FlatVectorStore(str(tmp_path), embeddings)
+    for query in ("parse the config file", "send an http request", "clone a github repository"):
+        exact = np.argsort(-(np.array(vectors) @ np.array(embeddings.embed_query(query))))[:3]
+        results = store.similarity_search_with_score(query, k=3)
+        assert [document.id for document, _ in results] == ["abcde"[i] for i in exact]
+        assert all(0.0 <= distance <= 2.0 for _, distance in results)
+
+    fetched = store.get(ids=["d", "missing", "a"], include=["documents", "metadatas"])
+    assert fetched["ids"] == ["d", "a"]
+    assert fetched["documents"] == [TEXTS[3], TEXTS[0]]
+    assert fetched["metadatas"] == [{"source": "d.py"}, {"source": "a.py"}]
+
+    # The index is written once by FlatIndexWriter; the LangChain write methods refuse
+    with pytest.raises(TypeError, match="read-only"):
+        store.add_documents([Document(page_content="x")])
+    with pytest.raises(TypeError, match="read-only"):
+        FlatVectorStore.from_texts(["x"], embeddings)
+
+
+def test_manager_uses_flat_engine_behind_the_same_retriever(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "LOCAL")
+    monkeypatch.setattr("app.utils.vector_store_manager.SESSIONS_DIR", str(tmp_path))
+    documents = [Document(page_content=text, metadata={"source": f"{i}.py"}) for i, text in enumerate(TEXTS)]
+
+    results = {}
+    for engine in ("chroma", "flat"):
+        monkeypatch.setattr("app.utils.vector_store_manager.VECTOR_STORE_ENGINE", engine)
+        manager = VectorStoreManager(f"{engine}-session")
+        manager.create_vector_store(iter(documents))
+        retriever = manager.get_retriever()
+        results[engine] = [
+            [document.metadata["source"] for document in retriever.invoke(query)]
+            for query in ("where is the config parsed?", "clone_github_repo", "how are templates rendered?")
+        ]
+
+    assert FlatVectorStore.exists(str(tmp_path / "flat-session"))
+    assert results["flat"] == results["chroma"]
+    assert results["flat"][0][0] == "0.py"
@@ -0,0 +1,74 @@
+import os
+import shutil
+import git
+import pytest
+
+from app.utils import git_mirror
+from app.utils.git_mirror import checkout_from_mirror, shallow_clone
+
+
+@pytest.fixture(scope="function")
+def upstream_repo(tmp_path):
+    """Creates a local upstream repository that allows partial (blob-filtered) clones."""
+    repo = git.Repo.init(tmp_path / "upstream")
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Test")
+        config.set_value("user", "email", "test@example.com")
+        config.set_value("uploadpack", "allowFilter", "true")
+        config.set_value("uploadpack", "allowAnySHA1InWant", "true")
+    (tmp_path / "upstream" / "main.py").write_text("print('v1')\n")
+    repo.index.add(["main.py"])
+    first = repo.index.commit("first").hexsha
+    return repo, first
+
+
+def test_shallow_clone_checks_out_requested_commit(upstream_repo, tmp_path):
+    repo, first = upstream_repo
+    (tmp_path / "upstream" / "main.py").write_text("print('v2')\n")
+    repo.index.add(["main.py"])
+    repo.index.commit("second")
+
+    sha = shallow_clone(f"file://{repo.working_dir}", str(tmp_path / "clone"), ref=first)
+
+    assert sha == first
+    assert (tmp_path / "clone" / "main.py").read_text() == "print('v1')\n"
+    assert git.Repo(tmp_path / "clone").git.rev_list("--count", "HEAD") == "1"
+
+
+def test_mirror_is_reused_across_sessions(upstream_repo, tmp_path, monkeypatch):
+    repo, first = upstream_repo
+    monkeypatch.setattr(git_mirror, "GIT_CACHE_DIR", str(tmp_path / "cache"))
+    url = f"file://{repo.working_dir}"
+
+    assert checkout_from_mirror(url, str(tmp_path / "session_1")) == first
+    (tmp_path / "upstream" / "utils.py").write_text("x = 1\n")
+    repo.index.add(["utils.py"])
+    second = repo.index.commit("second").hexsha
+
+    # The second session fetches the new commit into the same mirror
+    assert checkout_from_mirror(url, str(tmp_path / "session_2")) == second
+    assert len(os.listdir(tmp_path / "cache")) == 1
+    assert (tmp_path / "session_2" / "utils.py").exists()
+    assert not (tmp_path / "session_1" / "utils.py").exists()
+
+
+def test_tags_are_fetched_only_by_name(upstream_repo, tmp_path):
+    repo, first = upstream_repo
+    repo.create_tag("v1", message="release 1")
+    (tmp_path / "upstream" / "main.py").write_text("print('v2')\n")
+    repo.index.add(["main.py"])
+    repo.create_tag("v2", ref=repo.index.commit("second").hexsha)
+
+    assert shallow_clone(f"file://{repo.working_dir}", str(tmp_path / "clone"), ref="v1") == first
+    assert git.Repo(tmp_path / "clone").git.tag() == ""
+
+
+def test_prune_keeps_mirrors_with_live_worktrees(upstream_repo, tmp_path, monkeypatch):
+    repo, _ = upstream_repo
+    monkeypatch.setattr(git_mirror, "GIT_CACHE_DIR", str(tmp_path / "cache"))
+    checkout_from_mirror(f"file://{repo.working_dir}", str(tmp_path / "session_1"))
+
+    assert git_mirror.prune_git_cache(ttl=0, max_bytes=1) == []
+    shutil.rmtree(tmp_path / "session_1")
+    assert len(git_mirror.prune_git_cache(ttl=0, max_bytes=1)) == 1
+    assert os.listdir(tmp_path / "cache") == []
@@ -0,0 +1,57 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.llm.local_embeddings import HashingEmbeddings
+from app.utils.lexical_index import LexicalIndex, load_lexical_index
+from app.utils.hybrid_retriever import HybridRetriever, is_identifier_query
+from app.utils.vector_store_manager import VectorStoreManager
+
+CHUNKS = [
+    ("config.py", "def parse_config(path):\n    return yaml.safe_load(open(path))"),
+    ("git.py", "def clone_github_repo(repo_url, clone_to):\n    Repo.clone_from(repo_url, clone_to)"),
+    ("routes.py", "def clone_repo(request):\n    clone_github_repo(request.repo_url, session_path)"),
+    ("views.py", "def render_template(name, context):\n    return env.get_template(name).render(context)"),
+]
+
+
+def test_lexical_index_ranks_exact_identifiers_and_round_trips(tmp_path):
+    index = LexicalIndex()
+    index.add_documents([str(i) for i in range(len(CHUNKS))], [text for _, text in CHUNKS])
+
+    results = index.search("clone_github_repo", k=5)
+    assert {chunk_id for chunk_id, _ in results} == {"1", "2"}
+    # Sub-tokens of identifiers are searchable too
+    assert index.search("github", k=1)[0][0] in {"1", "2"}
+    assert index.search("kubernetes") == []
+
+    index.save(str(tmp_path))
+    assert load_lexical_index(str(tmp_path)).search("clone_github_repo", k=5) == results
+    assert load_lexical_index(str(tmp_path / "missing")) is None
+
+
+def test_identifier_queries_are_detected():
+    assert is_identifier_query("clone_github_repo")
+    assert is_identifier_query("`VectorStoreManager.get_retriever`")
+    assert is_identifier_query("parse_config()")
+    assert not is_identifier_query("where is the config parsed?")
+    assert not is_identifier_query("config")
+
+
+def test_hybrid_retriever_answers_identifier_queries_without_embedding(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "LOCAL")
+    monkeypatch.setattr("app.utils.vector_store_manager.SESSIONS_DIR", str(tmp_path))
+    manager = VectorStoreManager("hybrid-session")
+    manager.create_vector_store(Document(page_content=text, metadata={"source": source}) for source, text in CHUNKS)
+
+    retriever = manager.get_retriever()
+    assert isinstance(retriever, HybridRetriever)
+    assert retriever.invoke("where is the config parsed?")[0].metadata["source"] == "config.py"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("identifier queries must not be embedded")
+
+    monkeypatch.setattr(HashingEmbeddings, "embed_query", fail)
+    sources = [document.metadata["source"] for document in retriever.invoke("clone_github_repo")]
+    assert set(sources) == {"git.py", "routes.py"}
+    with pytest.raises(AssertionError):
+        retriever.invoke("how are repositories cloned?")
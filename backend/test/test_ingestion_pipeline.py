@@ -0,0 +1,53 @@
+import threading
+import pytest
+from typing import List
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.utils.ingestion_pipeline import IngestionPipeline
+
+
+class FakeEmbeddings(Embeddings):
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [float(len(text))]
+
+
+def _chunks(count, produced=None):
+    for i in range(count):
+        if produced is not None:
+            produced.append(i)
+        yield Document(page_content="x" * i, metadata={"source": f"file_{i // 10}.py"})
+
+
+def test_pipeline_writes_every_chunk_with_bounded_buffering():
+    written = {}
+    produced = []
+    max_ahead = []
+    lock = threading.Lock()
+
+    def writer(batch):
+        with lock:
+            # How far the producer has run ahead of the writer
+            max_ahead.append(len(produced) - len(written))
+            for chunk_id, text, embedding in zip(batch.ids, batch.texts, batch.embeddings):
+                written[chunk_id] = (text, embedding)
+
+    pipeline = IngestionPipeline(FakeEmbeddings(), writer, batch_size=5, embed_workers=2, queue_size=2)
+    assert pipeline.run(_chunks(500, produced)) == 500
+
+    assert written["42"] == ("x" * 42, [42.0])
+    assert len(written) == 500
+    # Two queues of two batches, two batches being embedded, one being written, one being built
+    assert max(max_ahead) <= 5 * (2 + 2 + 2 + 1 + 1)
+
+
+def test_pipeline_propagates_stage_errors():
+    def failing_writer(batch):
+        raise RuntimeError("disk full")
+
+    pipeline = IngestionPipeline(FakeEmbeddings(), failing_writer, batch_size=5, queue_size=1)
+    with pytest.raises(RuntimeError, match="disk full"):
+        pipeline.run(_chunks(1000))
@@ -0,0 +1,27 @@
+import asyncio
+
+import httpx
+
+from app.llm import llm_provider
+
+
+def test_llm_clients_are_shared_per_provider_and_key(monkeypatch):
+    registry = llm_provider._LLMRegistry()
+    monkeypatch.setattr(llm_provider, "_registry", registry)
+    monkeypatch.setattr(llm_provider, "LLM_POOL_MAX_KEEPALIVE", 4)
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-1")
+
+    llm = llm_provider.get_llm()
+    assert llm_provider.get_llm() is llm
+    pool = llm.http_client._transport._pool
+    assert pool._max_keepalive_connections == 4
+
+    # A rotated key gets its own client; the old one stays usable for requests in flight
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-2")
+    assert llm_provider.get_llm() is not llm
+    assert llm_provider.llm_client_stats() == {"clients": 2, "hits": 1, "builds": 2}
+
+    asyncio.run(llm_provider.close_llm_clients())
+    assert llm.http_client.is_closed
+    assert llm_provider.llm_client_stats()["clients"] == 0
@@ -0,0 +1,49 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from app.llm.local_embeddings import HashingEmbeddings
+from app.utils.vector_store_manager import VectorStoreManager
+
+
+def test_hashing_embeddings_are_deterministic_and_normalised():
+    embeddings = HashingEmbeddings(dim=256)
+    texts = ["def parse_config(path):\n    return load(path)", "class HttpClient:\n    pass", ""]
+
+    first = np.array(embeddings.embed_documents(texts))
+    second = np.array(HashingEmbeddings(dim=256).embed_documents(texts))
+    assert first.shape == (3, 256)
+    assert np.array_equal(first, second)
+    assert np.allclose(np.linalg.norm(first[:2], axis=1), 1.0)
+    # Texts without any features map to the zero vector instead of NaNs
+    assert not first[2].any()
+
+
+def test_hashing_embeddings_rank_related_code_first():
+    embeddings = HashingEmbeddings()
+    documents = [
+        "def parse_config(path):\n    with open(path) as f:\n        return yaml.safe_load(f)",
+        "class HttpClient:\n    def send_request(self, url):\n        return requests.get(url)",
+        "def render_template(name, context):\n    return jinja.get_template(name).render(context)",
+    ]
+    vectors = np.array(embeddings.embed_documents(documents))
+
+    query = np.array(embeddings.embed_query("where is the config parsed?"))
+    assert int(np.argmax(vectors @ query)) == 0
+    query = np.array(embeddings.embed_query("HttpClient sendRequest"))
+    assert int(np.argmax(vectors @ query)) == 1
+
+
+def test_vector_store_round_trip_with_local_embeddings(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "LOCAL")
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.setattr("app.utils.vector_store_manager.SESSIONS_DIR", str(tmp_path))
+
+    manager = VectorStoreManager("local-session")
+    assert manager.embedding_client is None
+    manager.create_vector_store([
+        Document(page_content="def parse_config(path): ...", metadata={"source": "config.py"}),
+        Document(page_content="def render_template(name): ...", metadata={"source": "views.py"}),
+    ])
+
+    results = manager.get_retriever().invoke("parse config")
+    assert results[0].metadata["source"] == "config.py"
@@ -0,0 +1,69 @@
+import importlib
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.agents import Planner
+
+# The package re-exports the `planner` instance under the module's name
+planner_module = importlib.import_module("app.agents.planner")
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Find bugs in utils.py and then refactor it.", [["Debug_Agent"], ["Refactor_Agent"]]),
+    ("Summarize utils.py and generate a diagram for it.", [["QA_Agent", "Diagram_Agent"]]),
+    ("Find bugs in main.py and also give me a summary of the auth.py file.", [["QA_Agent", "Debug_Agent"]]),
+    ("What does the VectorStoreManager do?", [["QA_Agent"]]),
+    ("Thank you", []),
+])
+def test_common_queries_are_planned_without_the_llm(query, expected):
+    plan, confidence = planner_module.classify(query)
+    assert plan == expected
+    assert confidence >= planner_module.PLANNER_MIN_CONFIDENCE
+
+
+class _TextOnlyLLM:
+    """An LLM without structured output that answers with a plan in text."""
+    def __init__(self, answer: str):
+        self.answer = answer
+        self.calls = 0
+
+    def with_structured_output(self, schema):
+        raise NotImplementedError
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return AIMessage(content=self.answer)
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+def test_llm_plans_are_validated_and_cached(monkeypatch):
+    llm = _TextOnlyLLM("Plan: [['Debug_Agent', 'Debug_Agent'], [], ['Refactor_Agent']]")
+    monkeypatch.setattr(planner_module, "get_llm", lambda: llm)
+    planner = Planner()
+    query = "The login page returns 500 sometimes"
+
+    plan = planner.plan(query)
+    assert plan == [["Debug_Agent"], ["Refactor_Agent"]]
+    # The graph pops steps off the plan; that must not alter the cached copy
+    plan.pop(0)
+    assert planner.plan("  the login page   returns 500 sometimes") == [["Debug_Agent"], ["Refactor_Agent"]]
+    assert llm.calls == 1
+
+    llm.answer = "[['Security_Agent']]"
+    assert planner.plan("Audit the session handling") == []
+    stats = planner.stats()
+    assert (stats["cache_hits"], stats["llm_calls"], stats["llm_failures"]) == (1, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_async_planning_awaits_the_llm(monkeypatch):
+    llm = _TextOnlyLLM('[["QA_Agent", "Diagram_Agent"]]')
+    monkeypatch.setattr(planner_module, "get_llm", lambda: llm)
+    planner = Planner()
+
+    assert await planner.aplan("Walk through auth, no code changes") == [["QA_Agent", "Diagram_Agent"]]
+    assert await planner.aplan("Explain utils.py") == [["QA_Agent"]]
+    assert llm.calls == 1
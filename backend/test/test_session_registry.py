@@ -0,0 +1,54 @@
+import os
+import time
+import pytest
+
+from app.utils.session_registry import SessionRegistry, SessionQuotaError
+
+
+def _make_session(registry: SessionRegistry, session_id: str, size: int, age: float = 0.0) -> None:
+    for directory in (registry.sessions_dir, registry.code_dir):
+        os.makedirs(os.path.join(directory, session_id), exist_ok=True)
+    with open(os.path.join(registry.code_dir, session_id, "main.py"), "wb") as f:
+        f.write(b"x" * size)
+    accessed = time.time() - age
+    for directory in (registry.sessions_dir, registry.code_dir):
+        os.utime(os.path.join(directory, session_id), (accessed, accessed))
+
+
+def test_collect_expires_and_evicts_least_recently_used(tmp_path):
+    registry = SessionRegistry(
+        str(tmp_path / "sessions"), str(tmp_path / "sessions_code"),
+        ttl=3600, max_session_bytes=5000, max_total_bytes=2500,
+    )
+    _make_session(registry, "expired", 100, age=7200)
+    _make_session(registry, "too-big", 6000, age=10)
+    _make_session(registry, "old", 1000, age=300)
+    _make_session(registry, "recent", 1000, age=200)
+    _make_session(registry, "in-use", 1000, age=400)
+
+    with registry.lease("in-use"):
+        deleted = registry.collect()
+
+    assert deleted == {"expired": ["expired"], "over_quota": ["too-big"], "evicted": ["old"]}
+    assert sorted(session["session_id"] for session in registry.list()) == ["in-use", "recent"]
+    assert not os.path.exists(tmp_path / "sessions_code" / "old")
+
+    with pytest.raises(SessionQuotaError):
+        _make_session(registry, "new", 6000)
+        registry.check_quota("new")
+
+
+def test_purge_of_leased_session_waits_for_release(tmp_path):
+    registry = SessionRegistry(str(tmp_path / "sessions"), str(tmp_path / "sessions_code"))
+    _make_session(registry, "s1", 10)
+
+    with registry.lease("s1"):
+        assert registry.delete("s1") == "pending"
+        # The running request still has its files, but no new request can start
+        assert os.path.exists(tmp_path / "sessions_code" / "s1" / "main.py")
+        with pytest.raises(FileNotFoundError):
+            registry.acquire("s1")
+
+    assert not os.path.exists(tmp_path / "sessions_code" / "s1")
+    assert registry.delete("s1") is None
+    assert registry.stats()["purged"] == 1
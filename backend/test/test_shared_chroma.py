@@ -0,0 +1,56 @@
+import os
+import pytest
+from langchain_core.documents import Document
+
+from app.utils import shared_chroma
+from app.utils.session_registry import SessionRegistry
+from app.utils.vector_store_cache import vector_store_cache
+from app.utils.vector_store_manager import VectorStoreManager
+
+
+@pytest.fixture
+def shared_engine(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "LOCAL")
+    monkeypatch.setattr("app.utils.vector_store_manager.SESSIONS_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr("app.utils.vector_store_manager.VECTOR_STORE_ENGINE", "chroma_shared")
+    monkeypatch.setattr(shared_chroma, "SHARED_CHROMA_DIR", str(tmp_path / "chroma_shared"))
+    yield tmp_path
+    vector_store_cache.clear()
+    shared_chroma.close_shared_client()
+
+
+def test_sessions_share_one_client_with_a_collection_each(shared_engine):
+    client = None
+    for session_id, text in (("s1", "def parse_config(path): return yaml.safe_load(path)"), ("s2", "class HttpClient: pass")):
+        manager = VectorStoreManager(session_id)
+        manager.create_vector_store(iter([Document(page_content=text, metadata={"source": f"{session_id}.py"})]))
+        vector_store_cache.invalidate(session_id)
+        documents = manager.get_retriever().invoke("parse_config")
+        assert [document.metadata["source"] for document in documents] == [f"{session_id}.py"]
+        assert client is None or shared_chroma.get_shared_client() is client
+        client = shared_chroma.get_shared_client()
+
+    assert sorted(c.name for c in client.list_collections()) == ["session-s1", "session-s2"]
+
+    registry = SessionRegistry(str(shared_engine / "sessions"), str(shared_engine / "sessions_code"))
+    assert registry.delete("s1") == "deleted"
+    assert [c.name for c in client.list_collections()] == ["session-s2"]
+    assert not os.path.exists(shared_engine / "sessions" / "s1")
+
+
+def test_collection_counts_toward_the_quota_and_is_dropped_without_a_marker(shared_engine):
+    manager = VectorStoreManager("s1")
+    manager.create_vector_store(iter([Document(page_content="def main(): pass", metadata={"source": "main.py"})]))
+    session_dir = str(shared_engine / "sessions" / "s1")
+    registry = SessionRegistry(str(shared_engine / "sessions"), str(shared_engine / "sessions_code"))
+
+    # The collection's vectors are measured with the session, although they live in the shared database
+    on_disk = sum(os.path.getsize(os.path.join(session_dir, name)) for name in os.listdir(session_dir))
+    with registry.lease("s1"):
+        pass
+    assert registry.list()[0]["size_bytes"] > on_disk
+
+    # An ingestion that failed after writing the collection leaves no marker; the collection is still dropped
+    os.remove(os.path.join(session_dir, shared_chroma.SHARED_COLLECTION_MARKER))
+    assert registry.delete("s1") == "deleted"
+    assert shared_chroma.get_shared_client().list_collections() == []
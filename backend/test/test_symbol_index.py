@@ -0,0 +1,104 @@
+import os
+
+from app.utils.symbol_index import SymbolIndex, extract_symbols, load_symbol_index
+from app.tools.find_symbol import FindSymbolTool
+
+PYTHON_FILE = '''from app.utils.file_handler import clone_github_repo
+
+class RepoService:
+    @staticmethod
+    def clone(url):
+        return clone_github_repo(url, "/tmp")
+'''
+
+HANDLER_FILE = '''def clone_github_repo(repo_url, clone_to):
+    """Clones a repository."""
+    return None
+'''
+
+TS_FILE = '''import { request } from "./http";
+
+export class ApiClient {
+  async fetchUser(id: string): Promise<User> {
+    return request(`/users/${id}`);
+  }
+}
+
+export const parseUser = (raw) => {
+  return raw;
+};
+'''
+
+
+def test_extract_symbols_finds_definitions_with_line_ranges():
+    symbols = extract_symbols("service.py", PYTHON_FILE)
+    assert [(s.qualified_name, s.kind, s.start_line, s.end_line) for s in symbols.definitions] == [
+        ("RepoService", "class", 3, 6),
+        ("RepoService.clone", "method", 4, 6),
+    ]
+    assert symbols.imports == ["app.utils.file_handler.clone_github_repo"]
+    assert symbols.references["clone_github_repo"] == [1, 6]
+
+    symbols = extract_symbols("client.ts", TS_FILE)
+    assert [(s.qualified_name, s.kind, s.start_line, s.end_line) for s in symbols.definitions] == [
+        ("ApiClient", "class", 3, 7),
+        ("ApiClient.fetchUser", "method", 4, 6),
+        ("parseUser", "function", 9, 11),
+    ]
+    assert symbols.imports == ["./http"]
+
+
+def test_symbol_index_lookup_round_trips(tmp_path):
+    index = SymbolIndex()
+    index.add_file("service.py", extract_symbols("service.py", PYTHON_FILE))
+    index.add_file("app/utils/file_handler.py", extract_symbols("app/utils/file_handler.py", HANDLER_FILE))
+    index.save(str(tmp_path))
+
+    loaded = load_symbol_index(str(tmp_path))
+    assert [s.path for s in loaded.find("clone_github_repo")] == ["app/utils/file_handler.py"]
+    assert [s.qualified_name for s in loaded.find("RepoService.clone")] == ["RepoService.clone"]
+    assert [s.name for s in loaded.find("reposervice")] == ["RepoService"]
+    assert loaded.find("clone", kind="class") == []
+    # The definition line itself is not a reference
+    assert loaded.find_references("clone_github_repo") == [("service.py", 1), ("service.py", 6)]
+    assert loaded.find_importers("file_handler") == ["service.py"]
+
+
+def test_find_symbol_tool_returns_code_and_references(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.tools.find_symbol.SESSIONS_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr("app.tools.file_reader.SESSIONS_CODE_DIR", str(tmp_path / "code"))
+    code_dir = tmp_path / "code" / "s1"
+    os.makedirs(code_dir / "app" / "utils")
+    (code_dir / "service.py").write_text(PYTHON_FILE)
+    (code_dir / "app" / "utils" / "file_handler.py").write_text(HANDLER_FILE)
+    index = SymbolIndex()
+    for path in ("service.py", "app/utils/file_handler.py"):
+        index.add_file(path, extract_symbols(path, (code_dir / path).read_text()))
+    index.save(str(tmp_path / "sessions" / "s1"))
+
+    output = FindSymbolTool(session_id="s1").invoke({"name": "clone_github_repo"})
+    assert "[function] clone_github_repo — app/utils/file_handler.py:1-3" in output
+    assert '    2 |     """Clones a repository."""' in output
+    assert "Referenced at: service.py:1, service.py:6" in output
+
+    assert FindSymbolTool(session_id="s1").invoke({"name": "does_not_exist"}) == "No definition found for 'does_not_exist'."
+    assert FindSymbolTool(session_id="other").invoke({"name": "x"}).startswith("Error: No symbol index")
+
+
+def test_find_symbol_tool_never_reads_outside_the_session(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.tools.find_symbol.SESSIONS_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr("app.tools.file_reader.SESSIONS_CODE_DIR", str(tmp_path / "code"))
+    secret = "def leak():\n    return 'secret of another session'\n"
+    # A sibling session whose directory shares the prefix, and a symlink escaping the checkout
+    os.makedirs(tmp_path / "code" / "s1-other")
+    (tmp_path / "code" / "s1-other" / "leak.py").write_text(secret)
+    os.makedirs(tmp_path / "code" / "s1")
+    os.symlink(tmp_path / "code" / "s1-other" / "leak.py", tmp_path / "code" / "s1" / "link.py")
+    index = SymbolIndex()
+    for path in ("../s1-other/leak.py", "link.py"):
+        index.add_file(path, extract_symbols(path, secret))
+    index.save(str(tmp_path / "sessions" / "s1"))
+
+    output = FindSymbolTool(session_id="s1").invoke({"name": "leak"})
+    assert "Found 2 definition(s)" in output
+    assert "secret of another session" not in output
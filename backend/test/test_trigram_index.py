@@ -0,0 +1,59 @@
+import os
+
+from app.utils.file_handler import iter_codebase_chunks
+from app.utils.session_indexes import SessionIndexes
+from app.utils.trigram_index import load_trigram_index
+from app.tools.search_code import SearchCodeTool
+
+FILES = {
+    "app/git.py": "import git\n\ndef clone_github_repo(url, to):\n    return git.Repo.clone_from(url, to)\n",
+    "app/routes.py": "from app.git import clone_github_repo\n\ndef clone(request):\n    # Clone first\n    clone_github_repo(request.url, '/tmp')\n",
+    "web/client.js": "export function getConfig() {\n  return fetch('/config');\n}\n",
+    "README.md": "# Demo\nRun `clone_github_repo` to fetch a repository.\n",
+}
+
+
+def _index_repository(tmp_path):
+    code_dir = tmp_path / "code"
+    for path, content in FILES.items():
+        os.makedirs(code_dir / os.path.dirname(path), exist_ok=True)
+        (code_dir / path).write_text(content)
+    indexes = SessionIndexes()
+    list(iter_codebase_chunks(str(code_dir), workers=1, indexes=indexes))
+    indexes.save(str(tmp_path / "index"))
+    return code_dir, load_trigram_index(str(tmp_path / "index"))
+
+
+def test_trigram_index_prunes_candidates_and_searches(tmp_path):
+    code_dir, index = _index_repository(tmp_path)
+    paths = lambda ids: sorted(index.paths[i] for i in ids)
+
+    assert paths(index.candidates("clone_github_repo")) == ["README.md", "app/git.py", "app/routes.py"]
+    assert paths(index.candidates(r"def\s+get_?config")) == []
+    assert paths(index.candidates("getConfig|Repo\\.clone_from")) == ["app/git.py", "web/client.js"]
+    # Nothing can be pruned for a pattern without literals, so every file is a candidate
+    assert len(index.candidates(r"\w+\(")) == len(FILES)
+
+    matches = list(index.search(str(code_dir), r"clone_github_repo\(", path_glob="app/**/*.py"))
+    assert [(m.path, m.line_number) for m in matches] == [("app/git.py", 3), ("app/routes.py", 5)]
+    matches = list(index.search(str(code_dir), "clone first", ignore_case=True, context_lines=1))
+    assert [(m.path, m.before, m.after) for m in matches] == [
+        ("app/routes.py", ["def clone(request):"], ["    clone_github_repo(request.url, '/tmp')"])
+    ]
+    assert len(list(index.search(str(code_dir), "clone", max_results=2))) == 2
+
+
+def test_search_code_tool_formats_matches(tmp_path, monkeypatch):
+    _index_repository(tmp_path)
+    os.makedirs(tmp_path / "sessions")
+    os.rename(tmp_path / "index", tmp_path / "sessions" / "s1")
+    os.makedirs(tmp_path / "sessions_code")
+    os.rename(tmp_path / "code", tmp_path / "sessions_code" / "s1")
+    monkeypatch.setattr("app.tools.search_code.SESSIONS_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setattr("app.tools.search_code.SESSIONS_CODE_DIR", str(tmp_path / "sessions_code"))
+    tool = SearchCodeTool(session_id="s1")
+
+    output = tool.invoke({"pattern": "getConfig", "context_lines": 1})
+    assert output == "web/client.js:1: export function getConfig() {\nweb/client.js-2-   return fetch('/config');"
+    assert tool.invoke({"pattern": "missing_name"}) == "No matches found for 'missing_name'."
+    assert tool.invoke({"pattern": "clone_github_repo(("}).startswith("Error: Invalid regular expression")
@@ -0,0 +1,75 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import chromadb
+
+from app.llm.local_embeddings import HashingEmbeddings
+from app.utils.vector_store_cache import VectorStoreCache, COLLECTION_NAME
+
+
+def _make_store(path: str) -> str:
+    client = chromadb.PersistentClient(path=path)
+    client.get_or_create_collection(COLLECTION_NAME).upsert(ids=["0"], embeddings=[[1.0, 0.0]], documents=["x"])
+    client.close()
+    return path
+
+
+def test_parallel_lookups_open_a_store_once(tmp_path):
+    cache = VectorStoreCache(max_entries=4, ttl=60, max_bytes=0)
+    path = _make_store(str(tmp_path / "s1"))
+    embeddings = HashingEmbeddings(dim=2)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        stores = list(pool.map(lambda _: cache.get("s1", path, embeddings), range(16)))
+
+    assert all(store is stores[0] for store in stores)
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 15 and stats["open_stores"] == 1
+    cache.clear()
+
+
+def test_least_recently_used_and_idle_stores_are_closed(tmp_path):
+    cache = VectorStoreCache(max_entries=2, ttl=0.2, max_bytes=0)
+    embeddings = HashingEmbeddings(dim=2)
+    paths = {name: _make_store(str(tmp_path / name)) for name in ("a", "b", "c")}
+
+    cache.get("a", paths["a"], embeddings)
+    cache.get("b", paths["b"], embeddings)
+    cache.get("a", paths["a"], embeddings)
+    cache.get("c", paths["c"], embeddings)
+    # "b" was the least recently used store when "c" was opened
+    assert cache.stats()["evicted"] == 1
+    cache.get("a", paths["a"], embeddings)
+    assert cache.stats()["misses"] == 3
+
+    time.sleep(0.3)
+    cache.get("b", paths["b"], embeddings)
+    stats = cache.stats()
+    assert stats["expired"] == 2 and stats["open_stores"] == 1
+    cache.clear()
+
+
+def test_store_evicted_during_a_query_is_closed_once_the_query_ends(tmp_path):
+    cache = VectorStoreCache(max_entries=1, ttl=60, max_bytes=0)
+    embeddings = HashingEmbeddings(dim=2)
+    paths = {name: _make_store(str(tmp_path / name)) for name in ("a", "b")}
+    started, evicted = threading.Event(), threading.Event()
+
+    def query():
+        with cache.lease("a", paths["a"], embeddings) as store:
+            started.set()
+            evicted.wait(5)
+            return store.similarity_search_by_vector([1.0, 0.0], k=1)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(query)
+        started.wait(5)
+        # Opening "b" evicts "a" from the cache while the query still uses it
+        cache.get("b", paths["b"], embeddings)
+        assert cache.stats()["evicted"] == 1 and cache.stats()["retired_leased_stores"] == 1
+        evicted.set()
+        assert [document.page_content for document in future.result()] == ["x"]
+
+    stats = cache.stats()
+    assert stats["leased_stores"] == 0 and stats["deferred_closes"] == 1
+    cache.clear()
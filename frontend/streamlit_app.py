@@ -1,7 +1,9 @@
 import streamlit as st
 import requests
 import os
+import json
 import sys
+import time
 from dotenv import load_dotenv
 
 # Load environment variables from the .env file in the project root
@@ -39,6 +41,114 @@ if "messages" not in st.session_state:
 
 # --- Main Application Logic ---
 
+def wait_for_ingestion(session_id):
+    """
+    Polls the backend's status endpoint until the background ingestion job finishes.
+    Returns the final status payload.
+    """
+    progress = st.empty()
+    while True:
+        status = requests.get(f"{BACKEND_URL}/repo/{session_id}/status").json()
+        stage = status.get("stage", "unknown")
+        if stage in ("completed", "failed"):
+            progress.empty()
+            return status
+        progress.info(
+            f"Stage: **{stage}** — {status.get('files_processed', 0)} files, "
+            f"{status.get('chunks_processed', 0)} chunks read, {status.get('chunks_indexed', 0)} indexed "
+            f"({status.get('chunks_per_second', 0)} chunks/s), "
+            f"{status.get('skipped_files', {}).get('total', 0)} files skipped"
+        )
+        time.sleep(1)
+
+def start_session(response):
+    """Handles the response of an ingestion request and waits for the job to finish."""
+    if response.status_code not in (200, 202):
+        st.error(f"Error: {response.json().get('detail', 'Failed to process repository.')}")
+        return
+    data = response.json()
+    status = wait_for_ingestion(data["session_id"])
+    if status.get("stage") == "failed":
+        errors = "; ".join(status.get("errors", [])) or "Failed to process repository."
+        st.error(f"Error: {errors}")
+        return
+    st.session_state.session_id = data["session_id"]
+    st.session_state.messages = []
+    st.success("Analysis complete!")
+    st.rerun()
+
+def iter_sse(response):
+    """Yields (event, data) pairs from a Server-Sent Events response as they arrive."""
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+        elif not line and event:
+            yield event, json.loads("\n".join(data) or "{}")
+            event, data = None, []
+
+def stream_chat(session_id, prompt):
+    """
+    Sends a query to the streaming chat endpoint and renders the agents' work as it happens:
+    each agent's answer grows token by token under its own heading, with its tool calls
+    shown as status lines. Returns the final text for the chat history.
+    """
+    status = st.empty()
+    body = st.empty()
+    sections = {}  # agent -> text streamed so far, or its final output once finished
+    finished = set()
+    notices = []
+    last_render = 0.0
+
+    def render(force=False):
+        nonlocal last_render
+        # Redrawing markdown on every token is slow for long answers; redraw at most 20 times a second
+        if not force and time.monotonic() - last_render < 0.05:
+            return
+        parts = [text if agent in finished else f"### {agent} (working...)\n\n{text}" for agent, text in sections.items()]
+        body.markdown("\n\n---\n\n".join(parts + notices) or "...")
+        last_render = time.monotonic()
+
+    with requests.post(f"{BACKEND_URL}/chat/{session_id}/stream", json={"query": prompt}, stream=True, timeout=(10, None)) as response:
+        if response.status_code != 200:
+            message = f"Error: {response.json().get('detail', 'An unknown error occurred.')}"
+            st.error(message)
+            return message
+        for event, data in iter_sse(response):
+            if event == "plan" and data["plan"]:
+                status.caption("Plan: " + " → ".join(" + ".join(step) for step in data["plan"]))
+            elif event == "agent_start":
+                sections.setdefault(data["agent"], "")
+                status.caption(f"{data['agent']} started...")
+                render(force=True)
+            elif event == "token":
+                sections[data["agent"]] = sections.get(data["agent"], "") + data["text"]
+                render()
+            elif event == "tool_start":
+                status.caption(f"{data['agent']} is using `{data['tool']}` {json.dumps(data['args'])[:200]}")
+            elif event == "tool_end":
+                status.caption(f"{data['agent']} got the result of `{data['tool']}`")
+            elif event == "agent_end":
+                # The final output replaces the streamed text, which includes the agent's reasoning between tool calls
+                sections[data["agent"]] = data["output"]
+                finished.add(data["agent"])
+                render(force=True)
+            elif event == "notice":
+                notices.append(data["text"])
+            elif event == "error":
+                notices.append(f"Error: {data['detail']}")
+            elif event == "done":
+                if data.get("first_token_ms") is not None:
+                    status.caption(
+                        f"First token after {data['first_token_ms'] / 1000:.1f} s, finished after {data['total_ms'] / 1000:.1f} s"
+                    )
+                else:
+                    status.empty()
+    render(force=True)
+    return "\n\n---\n\n".join(list(sections.values()) + notices)
+
 def main():
     """Main function to run the Streamlit application."""
     st.title("🤖 Codebase Copilot")
@@ -57,6 +167,8 @@ def main():
             st.write("Analyze a public or private GitHub repository.")
             github_url = st.text_input("GitHub Repository URL", key="github_url_input", placeholder="https://github.com/user/repo")
             
+            ref = st.text_input("Branch, tag or commit (optional)", key="github_ref", placeholder="main")
+
             # Use a password field for the PAT for security
             pat = st.text_input("GitHub Personal Access Token (for private repos)", type="password", key="github_pat")
 
@@ -80,17 +192,9 @@ def main():
                     with st.spinner("Cloning and processing repository..."):
                         try:
                             # Include the token in the payload if it exists
-                            payload = {"repo_url": github_url, "token": pat if pat else None}
+                            payload = {"repo_url": github_url, "token": pat if pat else None, "ref": ref if ref else None}
                             response = requests.post(f"{BACKEND_URL}/repo/clone", json=payload)
-                            
-                            if response.status_code == 200:
-                                data = response.json()
-                                st.session_state.session_id = data["session_id"]
-                                st.session_state.messages = []
-                                st.success("Analysis complete!")
-                                st.rerun()
-                            else:
-                                st.error(f"Error: {response.json().get('detail', 'Failed to process repository.')}")
+                            start_session(response)
                         
                         except requests.exceptions.RequestException as e:
                             st.error("Connection Error: Could not connect to the backend.")
@@ -106,14 +210,7 @@ def main():
                         try:
                             files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "application/zip")}
                             response = requests.post(f"{BACKEND_URL}/repo/upload_zip", files=files)
-                            if response.status_code == 200:
-                                data = response.json()
-                                st.session_state.session_id = data["session_id"]
-                                st.session_state.messages = []
-                                st.success("Analysis complete!")
-                                st.rerun()
-                            else:
-                                st.error(f"Error: {response.json().get('detail', 'Failed to process repository.')}")
+                            start_session(response)
                         except requests.exceptions.RequestException as e:
                             st.error("Connection Error: Could not connect to the backend.")
     
@@ -129,19 +226,11 @@ def main():
             with st.chat_message("user"):
                 st.markdown(prompt)
             with st.chat_message("assistant"):
-                with st.spinner("The agent is thinking..."):
-                    try:
-                        data = {"query": prompt}
-                        response = requests.post(f"{BACKEND_URL}/chat/{st.session_state.session_id}", json=data)
-                        if response.status_code == 200:
-                            full_response = response.text
-                            st.markdown(full_response)
-                        else:
-                            full_response = f"Error: {response.json().get('detail', 'An unknown error occurred.')}"
-                            st.error(full_response)
-                    except requests.exceptions.RequestException as e:
-                        full_response = "Connection Error: Could not get a response from the backend."
-                        st.error(full_response)
+                try:
+                    full_response = stream_chat(st.session_state.session_id, prompt)
+                except requests.exceptions.RequestException as e:
+                    full_response = "Connection Error: Could not get a response from the backend."
+                    st.error(full_response)
             st.session_state.messages.append({"role": "assistant", "content": full_response})
     else:
         st.info("Start a new session from the sidebar to begin analyzing a codebase.")